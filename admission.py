@@ -0,0 +1,100 @@
+"""Zulassung zu den rechenintensiven Schritten (Kompetenzen und Zukunftswerte mit Plotly-Vorschau)
+
+Drückt eine ganze Klasse gleichzeitig auf „Los geht's!“, landen alle fast
+gleichzeitig in Schritt 2 und bauen Diagramme. Mit
+ZUKUNFTSNAVIGATOR_MAX_AKTIV=<n> sind höchstens n Sessions pro
+Server-Prozess gleichzeitig in Schritt 2 oder 5; die übrigen sehen einen
+schlanken Warteraum mit ihrer Position und kommen von selbst weiter, sobald
+ein Platz frei wird.
+
+Reihenfolge: Wer den Test früher begonnen hat, kommt zuerst dran (das
+Ticket beginnt mit der Startzeit der Session). So überholen Neuankömmlinge
+in Schritt 2 niemanden, der schon auf Schritt 5 wartet.
+
+Ein Platz wird frei, wenn die Session den Schritt verlässt, oder nach
+LEASE Sekunden ohne Lebenszeichen (Tab geschlossen). Ein offener Tab gibt
+alle HEARTBEAT Sekunden ein Lebenszeichen, auch wenn lange niemand einen
+Slider bewegt. Wartende, die
+POLL_TIMEOUT Sekunden nicht mehr nachgefragt haben, fallen aus der Schlange.
+"""
+import threading
+import time
+
+import metrics
+
+# Schritte, für die eine Zulassung nötig ist
+HEAVY_STEPS = (2, 5)
+LEASE = 300.0
+POLL_TIMEOUT = 10.0
+# So oft fragt der Warteraum nach (Sekunden)
+POLL_INTERVAL = 2.0
+# So oft meldet sich eine zugelassene Session (Sekunden, deutlich unter LEASE)
+HEARTBEAT = 60.0
+
+
+class Admission:
+    """Begrenzt die Anzahl Sessions in den schweren Schritten; Tickets sind (Startzeit, Token)"""
+
+    def __init__(self, capacity, lease=LEASE, poll_timeout=POLL_TIMEOUT, clock=time.monotonic):
+        if capacity < 1:
+            raise ValueError("capacity muss mindestens 1 sein")
+        self.capacity = capacity
+        self.lease = lease
+        self.poll_timeout = poll_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._active = {}  # Ticket → zuletzt gesehen
+        self._waiting = {}  # Ticket → (eingereiht, zuletzt gesehen)
+
+    def acquire(self, ticket):
+        """(True, 0), wenn die Session in den schweren Schritt darf, sonst (False, Position in der Schlange)"""
+        now = self._clock()
+        with self._lock:
+            if ticket in self._active:
+                self._active[ticket] = now
+                return True, 0
+            self._expire(now)
+            queued = self._waiting.get(ticket)
+            self._waiting[ticket] = (queued[0] if queued else now, now)
+            self._admit(now)
+            admitted = ticket in self._active
+            position = 0 if admitted else 1 + sum(1 for other in self._waiting if other < ticket)
+            self._publish()
+        return admitted, position
+
+    def touch(self, ticket):
+        """Lebenszeichen einer zugelassenen Session (z.B. aus einem Fragment)"""
+        with self._lock:
+            if ticket in self._active:
+                self._active[ticket] = self._clock()
+
+    def release(self, ticket):
+        """Gibt den Platz frei (oder verlässt die Schlange); der Nächste rückt nach"""
+        with self._lock:
+            if ticket not in self._active and ticket not in self._waiting:
+                return
+            self._active.pop(ticket, None)
+            self._waiting.pop(ticket, None)
+            self._admit(self._clock())
+            self._publish()
+
+    def status(self):
+        with self._lock:
+            return {'aktiv': len(self._active), 'wartend': len(self._waiting), 'plaetze': self.capacity}
+
+    def _expire(self, now):
+        for ticket in [t for t, seen in self._active.items() if now - seen > self.lease]:
+            del self._active[ticket]
+        for ticket in [t for t, (_, seen) in self._waiting.items() if now - seen > self.poll_timeout]:
+            del self._waiting[ticket]
+
+    def _admit(self, now):
+        while self._waiting and len(self._active) < self.capacity:
+            ticket = min(self._waiting)
+            queued, _ = self._waiting.pop(ticket)
+            self._active[ticket] = now
+            metrics.observe('zukunftsnavigator_warteraum_sekunden', now - queued)
+
+    def _publish(self):
+        metrics.set_gauge('zukunftsnavigator_warteraum_laenge', len(self._waiting))
+        metrics.set_gauge('zukunftsnavigator_schwere_schritte_aktiv', len(self._active))
@@ -0,0 +1,113 @@
+"""Kompakte Antworten einer Session
+
+Statt emoji-beschrifteter Dicts hält eine Session nur Indizes in den
+gemeinsamen Fragenkatalog (catalog.json): Bewertungen als bytes in
+Katalogreihenfolge (0 = nicht beantwortet), Motivationen als Bitmaske und
+Einzelauswahlen als Index (-1 = noch offen). Das alte player_data-Format
+bleibt über to_dict()/from_dict() für Exporte erhalten.
+"""
+from dataclasses import dataclass, fields, replace
+
+import catalog
+
+
+@dataclass(frozen=True, slots=True)
+class Answers:
+    name: str = ''
+    klasse: str = ''
+    alter: int = 15
+    schule: str = ''
+    situation: int = -1
+    kompetenzen: bytes = b''
+    motivationen: int = 0
+    weekend_choice: int = -1
+    arbeitsumgebung: int = -1
+    zukunftswerte: bytes = b''
+    presentation_style: int = -1
+    problem_solving: int = -1
+    strength: str = ''
+    development: str = ''
+
+    def update(self, **changes):
+        """Neue Antworten mit geänderten Feldern (die Instanz selbst ist unveränderlich)"""
+        return replace(self, **changes)
+
+    @property
+    def motivation_keys(self):
+        return [key for i, key in enumerate(catalog.get().motivationen.ids) if self.motivationen >> i & 1]
+
+    @property
+    def umgebung_key(self):
+        return catalog.get().arbeitsumgebung.ids[self.arbeitsumgebung] if self.arbeitsumgebung >= 0 else ''
+
+    def kompetenz_dict(self):
+        return {label: v for label, v in zip(catalog.get().kompetenzen.labels, self.kompetenzen) if v}
+
+    def werte_dict(self):
+        return {label: v for label, v in zip(catalog.get().zukunftswerte.labels, self.zukunftswerte) if v}
+
+    def to_dict(self):
+        """Alle bisher beantworteten Schritte im bisherigen player_data-Format"""
+        cat = catalog.get()
+        data = {}
+        if self.name:
+            data.update({
+                'name': self.name,
+                'klasse': self.klasse,
+                'alter': self.alter,
+                'schule': self.schule,
+                'situation': cat.situation.labels[self.situation] if self.situation >= 0 else '',
+            })
+        if self.kompetenzen:
+            data['kompetenzen'] = self.kompetenz_dict()
+        if self.weekend_choice >= 0:
+            data['motivationen'] = self.motivation_keys
+            data['weekend_choice'] = cat.weekend_choice.labels[self.weekend_choice]
+        if self.arbeitsumgebung >= 0:
+            data['arbeitsumgebung'] = self.umgebung_key
+        if self.zukunftswerte:
+            data['zukunftswerte'] = self.werte_dict()
+        if self.presentation_style >= 0:
+            data.update({
+                'presentation_style': cat.presentation_style.labels[self.presentation_style],
+                'problem_solving': cat.problem_solving.labels[self.problem_solving],
+                'strength': self.strength,
+                'development': self.development,
+            })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Liest einen player_data-Datensatz bzw. ein exportiertes Ergebnis ein"""
+        cat = catalog.get()
+        kompetenzen = data.get('kompetenzen') or {}
+        werte = data.get('zukunftswerte') or {}
+        motivationen = set(data.get('motivationen') or ())
+        return cls(
+            name=data.get('name', ''),
+            klasse=data.get('klasse', ''),
+            alter=data.get('alter', 15),
+            schule=data.get('schule', ''),
+            situation=cat.situation.label_position.get(data.get('situation'), -1),
+            kompetenzen=bytes(kompetenzen.get(label, 0) for label in cat.kompetenzen.labels) if kompetenzen else b'',
+            motivationen=sum(1 << i for i, key in enumerate(cat.motivationen.ids) if key in motivationen),
+            weekend_choice=cat.weekend_choice.label_position.get(data.get('weekend_choice'), -1),
+            arbeitsumgebung=cat.arbeitsumgebung.position.get(data.get('arbeitsumgebung'), -1),
+            zukunftswerte=bytes(werte.get(label, 0) for label in cat.zukunftswerte.labels) if werte else b'',
+            presentation_style=cat.presentation_style.label_position.get(data.get('presentation_style'), -1),
+            problem_solving=cat.problem_solving.label_position.get(data.get('problem_solving'), -1),
+            strength=data.get('strength', ''),
+            development=data.get('development', ''),
+        )
+
+    def to_compact(self):
+        """Flache, JSON-taugliche Liste in Feldreihenfolge"""
+        values = (getattr(self, f.name) for f in fields(self))
+        return [list(v) if isinstance(v, bytes) else v for v in values]
+
+    @classmethod
+    def from_compact(cls, values):
+        return cls(*(
+            bytes(v) if f.type is bytes else v
+            for f, v in zip(fields(cls), values)
+        ))
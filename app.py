@@ -1,9 +1,22 @@
+import secrets
+import time
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-import json
+
+import admission
+import answers
+import catalog
+import charts
+import lightcharts
+import metrics
+import percentiles
+import resources
+import results
+import scoring
+import sessions
+import store
+import traces
+import weights
 
 # Seitenkonfiguration
 st.set_page_config(
@@ -14,7 +27,8 @@ st.set_page_config(
 )
 
 # Custom CSS für besseres Design
-st.markdown("""
+with metrics.timer('zukunftsnavigator_abschnitt_sekunden', abschnitt='css'):
+    st.markdown("""
 <style>
     .main > div {
         padding-top: 2rem;
@@ -47,11 +61,46 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def restore_session():
+    """Lädt den gespeicherten Stand, wenn eine neue Verbindung ein Sitzungs-Token in der URL mitbringt"""
+    token = st.query_params.get(sessions.QUERY_PARAM)
+    if not token:
+        return
+    raw = resources.get_session_store().get(sessions.key(token))
+    state = sessions.loads(raw) if raw else None
+    if state:
+        st.session_state.update(state)
+        st.session_state.saved_state = session_fingerprint()
+
+def session_fingerprint():
+    return (
+        st.session_state.current_step,
+        st.session_state.answers,
+        st.session_state.quiz_completed,
+        st.session_state.get('result_id'),
+    )
+
+def save_session():
+    """Schreibt einen Schnappschuss, sobald sich Schritt oder Antworten geändert haben"""
+    state = session_fingerprint()
+    if state == st.session_state.get('saved_state'):
+        return
+    token = st.query_params.get(sessions.QUERY_PARAM)
+    if not token:
+        if st.session_state.current_step == 0:
+            return
+        token = sessions.new_token()
+        st.query_params[sessions.QUERY_PARAM] = token
+    resources.get_session_store().set(sessions.key(token), sessions.dumps(*state), ex=sessions.TTL)
+    st.session_state.saved_state = state
+
 # Initialisierung der Session State
+if 'answers' not in st.session_state:
+    restore_session()
 if 'current_step' not in st.session_state:
     st.session_state.current_step = 0
-if 'player_data' not in st.session_state:
-    st.session_state.player_data = {}
+if 'answers' not in st.session_state:
+    st.session_state.answers = answers.Answers()
 if 'quiz_completed' not in st.session_state:
     st.session_state.quiz_completed = False
 
@@ -104,6 +153,7 @@ def step_0_welcome():
 
 def step_1_personal_data():
     """Persönliche Daten erfassen"""
+    katalog = catalog.get()
     st.markdown('<div class="step-header"><h2>👤 Wer bist du?</h2></div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
@@ -119,18 +169,19 @@ def step_1_personal_data():
     st.markdown("### 🎯 Deine aktuelle Situation:")
     situation = st.selectbox(
         "Wie fühlst du dich bezüglich deiner Zukunft?",
-        ["😰 Sehr unsicher", "😟 Etwas unsicher", "😐 Neutral", "😊 Zuversichtlich", "🤩 Sehr optimistisch"]
+        range(len(katalog.situation)),
+        format_func=katalog.situation.labels.__getitem__
     )
     
     if st.button("Weiter ➡️", type="primary"):
         if name:  # Mindestens Name erforderlich
-            st.session_state.player_data.update({
-                'name': name or 'Anonym',
-                'klasse': klasse,
-                'alter': alter,
-                'schule': schule,
-                'situation': situation
-            })
+            st.session_state.answers = st.session_state.answers.update(
+                name=name or 'Anonym',
+                klasse=klasse,
+                alter=alter,
+                schule=schule,
+                situation=situation
+            )
             st.session_state.current_step = 2
             st.rerun()
         else:
@@ -143,162 +194,115 @@ def step_2_competencies():
     st.markdown("### 📊 Bewerte deine Fähigkeiten ehrlich von 1-5:")
     st.info("1 = Schwach, 2 = Ausbaufähig, 3 = Okay, 4 = Gut, 5 = Stark")
     
-    competencies = {
-        "🗣️ Deutsch sprechen & verstehen": "Diskutieren, präsentieren, Texte verstehen",
-        "✍️ Texte schreiben": "Aufsätze, E-Mails, kreativ schreiben", 
-        "🧮 Mathematik & Logik": "Rechnen, Probleme lösen, logisch denken",
-        "🔧 Praktisches Arbeiten": "Mit den Händen arbeiten, basteln, reparieren",
-        "💻 Technik verstehen": "Computer, Apps, technische Geräte",
-        "🤝 Teamwork & Kommunikation": "Mit anderen arbeiten, Konflikte lösen",
-        "🎨 Kreativität": "Gestalten, eigene Ideen entwickeln",
-        "🎯 Selbstständigkeit": "Ohne Anleitung arbeiten, Verantwortung übernehmen"
-    }
-    
-    ratings = {}
-    
-    for comp, desc in competencies.items():
-        with st.container():
-            st.markdown(f"**{comp}**")
-            st.caption(desc)
-            ratings[comp] = st.slider(
-                f"Bewertung für {comp}",
-                1, 5, 3,
-                key=f"comp_{comp}",
-                label_visibility="collapsed"
-            )
-            st.markdown("---")
-    
-    # Visualisierung der aktuellen Bewertungen
-    if any(ratings.values()):
-        st.markdown("### 📈 Dein aktuelles Profil:")
+    competency_form()
+    admission_heartbeat()
+
+@st.fragment
+@metrics.timed('zukunftsnavigator_abschnitt_sekunden', abschnitt='competency_form')
+@lightcharts.measured(abschnitt='competency_form')
+def competency_form():
+    """Slider und Profil-Vorschau; nur ein Absenden führt zu einem (Teil-)Rerun"""
+    keep_admission()
+    katalog = catalog.get()
+    with st.form("competency_form", border=False):
+        ratings = []
         
-        # Radar Chart
-        categories = list(ratings.keys())
-        values = list(ratings.values())
+        for comp_id, comp, desc in katalog.kompetenzen:
+            with st.container():
+                st.markdown(f"**{comp}**")
+                st.caption(desc)
+                ratings.append(st.slider(
+                    f"Bewertung für {comp}",
+                    1, 5, 3,
+                    key=f"comp_{comp_id}",
+                    label_visibility="collapsed"
+                ))
+                st.markdown("---")
         
-        fig = go.Figure()
-        fig.add_trace(go.Scatterpolar(
-            r=values,
-            theta=categories,
-            fill='toself',
-            name='Deine Kompetenzen',
-            line_color='rgb(102, 126, 234)'
-        ))
+        st.form_submit_button("📈 Profil aktualisieren")
         
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 5]
-                )),
-            showlegend=False,
-            height=400
-        )
+        # Visualisierung der aktuellen Bewertungen
+        if any(ratings):
+            st.markdown("### 📈 Dein aktuelles Profil:")
+            
+            # Radar Chart (Plotly oder leicht, siehe lightcharts)
+            lightcharts.radar(katalog.kompetenzen.labels, tuple(ratings))
         
-        st.plotly_chart(fig, use_container_width=True)
+        weiter = st.form_submit_button("Weiter ➡️", type="primary")
     
-    if st.button("Weiter ➡️", type="primary"):
-        st.session_state.player_data['kompetenzen'] = ratings
+    if weiter:
+        st.session_state.answers = st.session_state.answers.update(kompetenzen=bytes(ratings))
         st.session_state.current_step = 3
-        st.experimental_rerun()
+        st.rerun()
 
 def step_3_motivation():
     """Motivation erfassen"""
+    katalog = catalog.get()
     st.markdown('<div class="step-header"><h2>💪 Was motiviert dich?</h2></div>', unsafe_allow_html=True)
     
     st.markdown("### 🎯 Wähle alle Aussagen aus, die auf dich zutreffen:")
     
-    motivations = {
-        "🔨 Ich arbeite gerne mit meinen Händen": "praktisch",
-        "🧠 Ich mag komplexe Probleme und Theorien": "theoretisch", 
-        "🤝 Ich helfe gerne anderen Menschen": "sozial",
-        "🎨 Ich bin kreativ und gestalte gerne": "kreativ",
-        "🔬 Ich entdecke gerne Neues": "forschend",
-        "👑 Ich übernehme gerne Verantwortung": "führend",
-        "📋 Ich brauche klare Strukturen": "strukturiert",
-        "🌟 Ich liebe Abwechslung": "abwechslungsreich"
-    }
-    
-    selected_motivations = []
+    selected_motivations = 0
     
-    for motivation, key in motivations.items():
+    for i, (key, motivation, _) in enumerate(katalog.motivationen):
         if st.checkbox(motivation, key=f"mot_{key}"):
-            selected_motivations.append(key)
+            selected_motivations |= 1 << i
     
     st.markdown("### 🎮 Mini-Challenge:")
     st.markdown("**Stell dir vor, du hast einen freien Samstag. Was machst du?**")
     
     weekend_choice = st.radio(
         "Wähle eine Option:",
-        [
-            "📚 Lesen oder online lernen",
-            "🔨 Etwas reparieren oder basteln", 
-            "🎨 Kreativ werden (zeichnen, musik, etc.)",
-            "📱 Freunde anrufen oder treffen"
-        ]
+        range(len(katalog.weekend_choice)),
+        format_func=katalog.weekend_choice.labels.__getitem__
     )
     
     if st.button("Weiter ➡️", type="primary"):
-        st.session_state.player_data['motivationen'] = selected_motivations
-        st.session_state.player_data['weekend_choice'] = weekend_choice
+        st.session_state.answers = st.session_state.answers.update(
+            motivationen=selected_motivations,
+            weekend_choice=weekend_choice
+        )
         st.session_state.current_step = 4
-        st.experimental_rerun()
+        st.rerun()
 
 def step_4_environment():
     """Arbeitsumgebung wählen"""
+    katalog = catalog.get()
     st.markdown('<div class="step-header"><h2>🏢 Deine ideale Arbeitsumgebung</h2></div>', unsafe_allow_html=True)
     
     st.markdown("### 🎯 In welcher Umgebung fühlst du dich am wohlsten?")
     
-    environments = {
-        "🔧 Werkstatt/Labor": {
-            "desc": "Praktisch arbeiten, experimentieren, bauen",
-            "key": "werkstatt"
-        },
-        "💼 Büro/Schule": {
-            "desc": "Planen, analysieren, lernen, schreiben", 
-            "key": "buero"
-        },
-        "👥 Mit Menschen": {
-            "desc": "Beraten, unterrichten, verkaufen, helfen",
-            "key": "menschen"
-        },
-        "🌱 Draussen/Natur": {
-            "desc": "Im Freien arbeiten, mit Tieren/Pflanzen",
-            "key": "natur"
-        }
-    }
-    
     # Visuelle Auswahl mit Karten
     cols = st.columns(2)
     selected_env = None
     
-    for i, (env, data) in enumerate(environments.items()):
+    for i, (key, env, desc) in enumerate(katalog.arbeitsumgebung):
         with cols[i % 2]:
             if st.button(
-                f"{env}\n\n{data['desc']}", 
-                key=f"env_{data['key']}",
+                f"{env}\n\n{desc}", 
+                key=f"env_{key}",
                 use_container_width=True
             ):
-                selected_env = data['key']
+                selected_env = i
     
     # Fallback: Radio Buttons
-    if not selected_env:
+    if selected_env is None:
         st.markdown("**Oder wähle hier:**")
         env_choice = st.radio(
             "Arbeitsumgebung:",
-            list(environments.keys()),
+            range(len(katalog.arbeitsumgebung)),
+            format_func=katalog.arbeitsumgebung.labels.__getitem__,
             key="env_radio"
         )
-        if env_choice:
-            selected_env = environments[env_choice]['key']
+        if env_choice is not None:
+            selected_env = env_choice
     
     if st.button("Weiter ➡️", type="primary"):
-        if selected_env or 'env_radio' in st.session_state:
-            final_env = selected_env or environments[st.session_state.env_radio]['key']
-            st.session_state.player_data['arbeitsumgebung'] = final_env
+        if selected_env is not None or 'env_radio' in st.session_state:
+            final_env = selected_env if selected_env is not None else st.session_state.env_radio
+            st.session_state.answers = st.session_state.answers.update(arbeitsumgebung=final_env)
             st.session_state.current_step = 5
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("Bitte wähle eine Arbeitsumgebung!")
 
@@ -309,56 +313,49 @@ def step_5_future_values():
     st.markdown("### 💼 Wie wichtig sind dir diese Aspekte im späteren Beruf?")
     st.info("1 = Unwichtig, 2 = Wenig wichtig, 3 = Neutral, 4 = Wichtig, 5 = Sehr wichtig")
     
-    values = {
-        "💰 Gutes Einkommen": "Finanziell abgesichert sein",
-        "⚖️ Work-Life-Balance": "Zeit für Familie und Hobbys", 
-        "❤️ Sinnvolle Arbeit": "Etwas Wichtiges für die Gesellschaft tun",
-        "📈 Karrierechancen": "Aufstiegsmöglichkeiten haben",
-        "🔒 Jobsicherheit": "Sicherer Arbeitsplatz",
-        "🎓 Weiterbildung": "Immer weiter lernen können"
-    }
-    
-    value_ratings = {}
-    
-    for value, desc in values.items():
-        with st.container():
-            st.markdown(f"**{value}**")
-            st.caption(desc)
-            value_ratings[value] = st.slider(
-                f"Wichtigkeit: {value}",
-                1, 5, 3,
-                key=f"val_{value}",
-                label_visibility="collapsed"
-            )
-            st.markdown("---")
-    
-    # Balkendiagramm der Werte
-    if any(value_ratings.values()):
-        st.markdown("### 📊 Deine Prioritäten:")
+    value_form()
+    admission_heartbeat()
+
+@st.fragment
+@metrics.timed('zukunftsnavigator_abschnitt_sekunden', abschnitt='value_form')
+@lightcharts.measured(abschnitt='value_form')
+def value_form():
+    """Slider und Prioritäten-Vorschau; nur ein Absenden führt zu einem (Teil-)Rerun"""
+    keep_admission()
+    katalog = catalog.get()
+    with st.form("value_form", border=False):
+        value_ratings = []
         
-        df = pd.DataFrame({
-            'Aspekt': list(value_ratings.keys()),
-            'Wichtigkeit': list(value_ratings.values())
-        })
+        for value_id, value, desc in katalog.zukunftswerte:
+            with st.container():
+                st.markdown(f"**{value}**")
+                st.caption(desc)
+                value_ratings.append(st.slider(
+                    f"Wichtigkeit: {value}",
+                    1, 5, 3,
+                    key=f"val_{value_id}",
+                    label_visibility="collapsed"
+                ))
+                st.markdown("---")
         
-        fig = px.bar(
-            df, 
-            x='Wichtigkeit', 
-            y='Aspekt',
-            orientation='h',
-            color='Wichtigkeit',
-            color_continuous_scale='Blues'
-        )
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        st.form_submit_button("📊 Prioritäten aktualisieren")
+        
+        # Balkendiagramm der Werte
+        if any(value_ratings):
+            st.markdown("### 📊 Deine Prioritäten:")
+            
+            lightcharts.priorities(katalog.zukunftswerte.labels, tuple(value_ratings))
+        
+        weiter = st.form_submit_button("Weiter ➡️", type="primary")
     
-    if st.button("Weiter ➡️", type="primary"):
-        st.session_state.player_data['zukunftswerte'] = value_ratings
+    if weiter:
+        st.session_state.answers = st.session_state.answers.update(zukunftswerte=bytes(value_ratings))
         st.session_state.current_step = 6
-        st.experimental_rerun()
+        st.rerun()
 
 def step_6_personality():
     """Persönlichkeits-Assessment"""
+    katalog = catalog.get()
     st.markdown('<div class="step-header"><h2>🎮 Persönlichkeits-Challenge!</h2></div>', unsafe_allow_html=True)
     
     st.markdown("### 🎯 Zwei schnelle Situationen:")
@@ -367,12 +364,8 @@ def step_6_personality():
     st.markdown("**🎯 Du sollst eine Präsentation halten. Wie gehst du vor?**")
     presentation_style = st.radio(
         "Dein Ansatz:",
-        [
-            "📋 Detailliert planen und vorbereiten",
-            "💡 Spontan und frei sprechen", 
-            "🤝 Mit anderen zusammen vorbereiten",
-            "🎨 Kreativ und visuell gestalten"
-        ]
+        range(len(katalog.presentation_style)),
+        format_func=katalog.presentation_style.labels.__getitem__
     )
     
     st.markdown("---")
@@ -381,12 +374,8 @@ def step_6_personality():
     st.markdown("**🔍 Du stösst auf ein Problem. Was ist dein erster Impuls?**")
     problem_solving = st.radio(
         "Deine Reaktion:",
-        [
-            "🔧 Sofort praktisch ausprobieren",
-            "📚 Erst recherchieren und verstehen",
-            "👥 Andere um Hilfe fragen", 
-            "💡 Kreative Lösung erfinden"
-        ]
+        range(len(katalog.problem_solving)),
+        format_func=katalog.problem_solving.labels.__getitem__
     )
     
     st.markdown("---")
@@ -410,61 +399,190 @@ def step_6_personality():
     
     if st.button("🎯 Auswertung erstellen!", type="primary"):
         if strength and development:
-            st.session_state.player_data.update({
-                'presentation_style': presentation_style,
-                'problem_solving': problem_solving,
-                'strength': strength,
-                'development': development
-            })
+            st.session_state.answers = st.session_state.answers.update(
+                presentation_style=presentation_style,
+                problem_solving=problem_solving,
+                strength=strength,
+                development=development
+            )
+            with metrics.timer('zukunftsnavigator_abschnitt_sekunden', abschnitt='ergebnis'):
+                st.session_state.result = results.freeze(st.session_state.answers)
             st.session_state.quiz_completed = True
+            st.session_state.pop('result_id', None)
             st.session_state.current_step = 7
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("Bitte fülle beide Reflexionsfelder aus!")
 
-def calculate_recommendation():
-    """Berechnet die Empfehlung"""
-    data = st.session_state.player_data
-    kompetenzen = data.get('kompetenzen', {})
-    
-    # Berechne Scores
-    practical_keys = ['🔧 Praktisches Arbeiten', '💻 Technik verstehen', '🎨 Kreativität']
-    theoretical_keys = ['🗣️ Deutsch sprechen & verstehen', '✍️ Texte schreiben', '🧮 Mathematik & Logik']
-    
-    practical_score = sum(kompetenzen.get(key, 0) for key in practical_keys) / len(practical_keys)
-    theoretical_score = sum(kompetenzen.get(key, 0) for key in theoretical_keys) / len(theoretical_keys)
-    
-    # Motivationsanalyse
-    motivations = data.get('motivationen', [])
-    practical_motivation = any(mot in motivations for mot in ['praktisch', 'kreativ'])
-    theoretical_motivation = any(mot in motivations for mot in ['theoretisch', 'forschend'])
-    
-    # Umgebungsanalyse
-    environment = data.get('arbeitsumgebung', '')
-    practical_environment = environment in ['werkstatt', 'natur']
-    
-    # Entscheidungslogik
-    if (practical_score > theoretical_score + 0.5) or (practical_motivation and practical_environment):
-        return 'berufsausbildung'
-    elif (theoretical_score > practical_score + 0.5) or (theoretical_motivation and not practical_environment):
-        return 'weiterführende_schule'
+def current_result():
+    """Schnappschuss des abgeschlossenen Tests; nach einer wiederhergestellten Sitzung wird er einmal neu gebaut"""
+    result = st.session_state.get('result')
+    current = st.session_state.answers
+    if result is None or result.answers != current:
+        with metrics.timer('zukunftsnavigator_abschnitt_sekunden', abschnitt='ergebnis'):
+            # Schon gespeichert: Datum und Empfehlung aus der Ablage, nicht neu berechnet
+            stored = stored_result()
+            if stored is not None and answers.Answers.from_dict(stored) == current:
+                result = results.snapshot(current, stored)
+            else:
+                result = results.freeze(current)
+            st.session_state.result = result
+    return result
+
+def stored_result():
+    """Gespeichertes result_data zur result_id der Sitzung oder None"""
+    result_id = st.session_state.get('result_id')
+    if not result_id:
+        return None
+    result_store = resources.get_result_store()
+    result_store.flush()
+    return store.fetch_results(result_store.path, [result_id]).get(result_id)
+
+def score_breakdown(model):
+    """Punkte pro Weg und die Antworten mit dem grössten Anteil am Vorsprung (gewichtetes Modell)"""
+    breakdown = model.breakdown(st.session_state.answers)
+    for col, (path, points) in zip(st.columns(len(breakdown['punkte'])), breakdown['punkte'].items()):
+        col.metric(scoring.EMPFEHLUNGEN[path], f"{points:.1f}")
+    if breakdown['faktoren']:
+        st.write(f"Am meisten Vorsprung vor „{scoring.EMPFEHLUNGEN[breakdown['vergleich']]}“ bringen:")
+        for label, lead in breakdown['faktoren']:
+            st.write(f"• {label}: +{lead:.2f}")
+    st.caption(f"Gewichte Version {model.version or '–'}")
+
+@st.fragment
+@metrics.timed('zukunftsnavigator_abschnitt_sekunden', abschnitt='what_if_explorer')
+def what_if_explorer():
+    """Antworten probeweise ändern und sehen, wo die Grenze zwischen den Wegen liegt"""
+    katalog = catalog.get()
+    answers = st.session_state.answers
+    table = scoring.decision_table()
+    _, _, pm, tm, pe = scoring.decision_key(answers)
+    ratings = answers.kompetenzen or bytes(len(katalog.kompetenzen))
+
+    st.write("Nur diese Antworten beeinflussen die Empfehlung. Verschiebe sie und schau, was sich ändert:")
+    col1, col2 = st.columns(2)
+    sums = []
+    for col, title, ids in (
+        (col1, "🔧 Praktisch", scoring.PRACTICAL_COMPETENCIES),
+        (col2, "📚 Theoretisch", scoring.THEORETICAL_COMPETENCIES),
+    ):
+        with col:
+            st.markdown(f"**{title}**")
+            sums.append(sum(
+                st.slider(katalog.kompetenzen.label(key), 1, 5,
+                          min(max(ratings[katalog.kompetenzen.position[key]], 1), 5), key=f"whatif_{key}")
+                for key in ids
+            ))
+    pm = st.checkbox("Motivation: " + ", ".join(katalog.motivationen.label(m) for m in scoring.PRACTICAL_MOTIVATIONS),
+                     value=bool(pm), key="whatif_pm")
+    tm = st.checkbox("Motivation: " + ", ".join(katalog.motivationen.label(m) for m in scoring.THEORETICAL_MOTIVATIONS),
+                     value=bool(tm), key="whatif_tm")
+    pe = st.checkbox("Umgebung: " + " oder ".join(katalog.arbeitsumgebung.label(e) for e in scoring.PRACTICAL_ENVIRONMENTS),
+                     value=bool(pe), key="whatif_pe")
+
+    key = (*sums, int(pm), int(tm), int(pe))
+    result = scoring.RECOMMENDATIONS[table[key]]
+    st.markdown(f"**Empfehlung:** {scoring.EMPFEHLUNGEN[result]}")
+    distances = scoring.boundary_distances(*key)
+    for name, points in distances.items():
+        if name != result:
+            st.write(f"Bis „{scoring.EMPFEHLUNGEN[name]}“ fehlen {points} Bewertungspunkt{'e' if points != 1 else ''}.")
+    if len(distances) == 1:
+        st.write("Mit diesen Motivationen und dieser Umgebung ändern die Bewertungen nichts an der Empfehlung.")
+    
+    low_p, low_t = len(scoring.PRACTICAL_COMPETENCIES), len(scoring.THEORETICAL_COMPETENCIES)
+    surface = table[low_p:, low_t:, key[2], key[3], key[4]]
+    fig = charts.decision_chart(
+        tuple(map(tuple, surface.tolist())),
+        tuple(s / low_p for s in range(low_p, low_p + surface.shape[0])),
+        tuple(s / low_t for s in range(low_t, low_t + surface.shape[1])),
+        tuple(scoring.EMPFEHLUNGEN.values()),
+        (sums[0] / low_p, sums[1] / low_t),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def comparison_table(result_data):
+    """Markdown-Tabelle mit dem Perzentil jeder Bewertung in Klasse, Schule und Gesamtheit"""
+    histograms = resources.get_histograms()
+    katalog = catalog.get()
+    groups = dict(store.rollup_groups(result_data))
+    labels = katalog.kompetenzen.labels + katalog.zukunftswerte.labels
+    ratings = percentiles.ratings_from_result(result_data)
+
+    lines = [
+        "| Bereich | Du | " + " | ".join(title for _, title in percentiles.SCOPES) + " |",
+        "|---|:-:|" + ":-:|" * len(percentiles.SCOPES),
+    ]
+    for question, (label, rating) in enumerate(zip(labels, ratings)):
+        if not rating:
+            continue
+        cells = []
+        for scope, _ in percentiles.SCOPES:
+            group = groups.get(scope)
+            value = None
+            if group is not None and histograms.group_size(scope, group, question) >= percentiles.MIN_GROUP_SIZE:
+                value = histograms.percentile(scope, group, question, rating)
+            cells.append("–" if value is None else f"{value:.0f} %")
+        lines.append(f"| {label} | {rating} | " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def pdf_report(result):
+    """Knopf für den PDF-Bericht; gerendert wird im Hintergrund, fertige Berichte kommen aus dem Cache"""
+    service = resources.get_report_service()
+    key = result.report_key
+    pdf = service.get(key)
+    if pdf is not None:
+        st.download_button(
+            "📄 PDF herunterladen",
+            data=pdf,
+            file_name=result.file_name('.pdf'),
+            mime="application/pdf",
+            on_click="ignore"
+        )
+    elif service.pending(key):
+        report_progress(key)
     else:
-        return 'beide_wege'
+        error = service.error(key)
+        if error:
+            st.error(f"Das PDF konnte nicht erstellt werden: {error}")
+        if st.button("📄 PDF erstellen", type="secondary"):
+            if service.submit(result.report()):
+                st.rerun()
+            st.warning("Gerade werden sehr viele Berichte erstellt. Bitte versuche es gleich nochmals.")
+
+
+@st.fragment(run_every=0.5)
+def report_progress(key):
+    """Wartet auf den Bericht, ohne die Ergebnisseite zu blockieren; ist er fertig, zeigt ein Rerun den Download"""
+    if not resources.get_report_service().pending(key):
+        st.rerun()
+    st.info("⏳ Dein PDF wird erstellt …")
+
 
 def step_7_results():
     """Ergebnisse anzeigen"""
-    data = st.session_state.player_data
+    # Empfehlung, Stärken und Exporte stehen seit dem Absenden von Schritt 6 fest
+    result = current_result()
+    data = result.data
     name = data.get('name', 'Zukunftsheld')
+    recommendation = result.empfehlung
+    strengths, improvements = result.staerken, result.entwicklungsfelder
     
     st.markdown(f'<div class="step-header"><h1>🎉 Deine Auswertung, {name}!</h1></div>', unsafe_allow_html=True)
     
-    # Berechne Empfehlung
-    recommendation = calculate_recommendation()
-    
-    # Stärken-Schwächen-Analyse
-    kompetenzen = data.get('kompetenzen', {})
-    strengths = [k for k, v in kompetenzen.items() if v >= 4]
-    improvements = [k for k, v in kompetenzen.items() if v <= 2]
+    # Einmal pro abgeschlossenem Test speichern
+    if 'result_id' not in st.session_state:
+        result_data = result.result_data()
+        # Vor add_result holen: eine Erstbefüllung aus der Ablage enthielte das Ergebnis sonst schon
+        histograms = resources.get_histograms()
+        profile_index = resources.get_profile_index()
+        st.session_state.result_id = resources.get_result_store().add_result(result_data)
+        histograms.add(result_data)
+        profile_index.add(result_data, result.answers)
+        outbox = resources.get_delivery()
+        if outbox is not None:
+            outbox.submit(st.session_state.result_id, result_data)
     
     col1, col2 = st.columns(2)
     
@@ -494,6 +612,25 @@ def step_7_results():
         else:
             st.info("📈 Keine grösseren Schwächen erkannt!")
     
+    # Vergleich mit Klasse, Schule und allen bisherigen Ergebnissen
+    st.markdown("### 📊 Im Vergleich zu deiner Klasse")
+    st.markdown(comparison_table(data))
+    st.caption(
+        "Prozent der Vergleichsgruppe, die sich tiefer eingeschätzt haben (gleiche Bewertung zählt halb). "
+        f"Angezeigt ab {percentiles.MIN_GROUP_SIZE} Ergebnissen."
+    )
+    
+    # Empfehlungen der ähnlichsten bisherigen Profile
+    st.markdown("### 👥 Jugendliche wie du")
+    similar = resources.get_profile_index().similar(st.session_state.answers, recommendation)
+    total = sum(similar.values())
+    if total:
+        st.write(f"So lautete die Empfehlung für die {total} Jugendlichen mit den ähnlichsten Antworten:")
+        for col, (key, label) in zip(st.columns(len(similar)), scoring.EMPFEHLUNGEN.items()):
+            col.metric(label, f"{similar[key] / total:.0%}")
+    else:
+        st.info("Noch keine anderen Ergebnisse zum Vergleichen.")
+    
     # Hauptempfehlung
     st.markdown("## 🚀 Deine persönliche Wegempfehlung")
     
@@ -506,14 +643,6 @@ def step_7_results():
         </div>
         """, unsafe_allow_html=True)
         
-        st.markdown("### 📋 Deine nächsten Schritte:")
-        steps = [
-            "Informiere dich über verschiedene Lehrberufe",
-            "Organisiere 2-3 Schnupperlehren",
-            "Verbessere deine schulischen Kompetenzen gezielt",
-            "Sprich mit Berufsberater:innen und Praktiker:innen"
-        ]
-        
     elif recommendation == 'weiterführende_schule':
         st.markdown("""
         <div class="result-card">
@@ -523,14 +652,6 @@ def step_7_results():
         </div>
         """, unsafe_allow_html=True)
         
-        st.markdown("### 📋 Deine nächsten Schritte:")
-        steps = [
-            "Informiere dich über Aufnahmeprüfungen",
-            "Erstelle einen strukturierten Lernplan",
-            "Besuche Informationsveranstaltungen",
-            "Überlege dir mögliche Studienrichtungen"
-        ]
-        
     else:
         st.markdown("""
         <div class="result-card">
@@ -539,18 +660,19 @@ def step_7_results():
         <p>Sowohl Lehre als auch Schule passen zu dir. Lass dich von deinen Interessen leiten!</p>
         </div>
         """, unsafe_allow_html=True)
-        
-        st.markdown("### 📋 Deine nächsten Schritte:")
-        steps = [
-            "Mache sowohl Schnupperlehren als auch Schulbesuche",
-            "Führe Gespräche mit Berufsberater:innen",
-            "Reflektiere deine langfristigen Ziele",
-            "Entscheide nach deinem Bauchgefühl"
-        ]
-    
-    for i, step in enumerate(steps, 1):
+    
+    st.markdown("### 📋 Deine nächsten Schritte:")
+    for i, step in enumerate(scoring.NEXT_STEPS[recommendation], 1):
         st.write(f"{i}️⃣ {step}")
     
+    model = weights.get()
+    if model is None:
+        with st.expander("🔍 Was wäre, wenn …? Wie knapp ist deine Empfehlung?"):
+            what_if_explorer()
+    else:
+        with st.expander("🧮 So setzt sich deine Empfehlung zusammen"):
+            score_breakdown(model)
+    
     # Persönliche Notizen
     st.markdown("### 💬 Deine persönlichen Notizen:")
     col1, col2 = st.columns(2)
@@ -568,42 +690,115 @@ def step_7_results():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("📄 PDF erstellen", type="secondary"):
-            st.info("PDF-Export: Speichere diese Seite als PDF über deinen Browser (Strg+P)")
+        pdf_report(result)
     
     with col2:
-        # JSON Download
-        result_data = {
-            **data,
-            'empfehlung': recommendation,
-            'datum': datetime.now().isoformat(),
-            'staerken': strengths,
-            'entwicklungsfelder': improvements
-        }
-        
+        # JSON Download (beim Abschluss vorab serialisiert)
         st.download_button(
             "💾 Daten herunterladen",
-            data=json.dumps(result_data, ensure_ascii=False, indent=2),
-            file_name=f"zukunftsnavigator_{name}_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json"
+            data=result.payloads['json'],
+            file_name=result.file_name(results.PAYLOADS['json'][0]),
+            mime=results.PAYLOADS['json'][1],
+            on_click="ignore"
         )
     
     with col3:
         if st.button("🔄 Neuer Test", type="primary"):
             # Reset alles
+            token = st.query_params.get(sessions.QUERY_PARAM)
+            if token:
+                resources.get_session_store().delete(sessions.key(token))
+                del st.query_params[sessions.QUERY_PARAM]
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
     
     # Feedback
     st.markdown("---")
+    feedback_form()
+
+@st.fragment
+def feedback_form():
+    """Feedback als Fragment: Tippen und Absenden laden nur dieses Feld neu, nicht die Ergebnisseite"""
     st.markdown("### 💬 Feedback")
     feedback = st.text_area("Wie war der Test für dich? (Optional)")
     if st.button("Feedback senden") and feedback:
+        resources.get_result_store().add_feedback(st.session_state.get('result_id'), feedback)
         st.success("Danke für dein Feedback! 🙏")
 
+def admitted():
+    """Darf die Session ihren aktuellen Schritt zeigen? Ausserhalb von Schritt 2 und 5 gibt sie ihren Platz frei"""
+    gate = resources.get_admission()
+    if gate is None:
+        return True
+    if 'ticket' not in st.session_state:
+        st.session_state.ticket = (time.time(), secrets.token_hex(8))
+    if st.session_state.current_step not in admission.HEAVY_STEPS:
+        gate.release(st.session_state.ticket)
+        return True
+    return gate.acquire(st.session_state.ticket)[0]
+
+def keep_admission():
+    gate = resources.get_admission()
+    if gate is not None and 'ticket' in st.session_state:
+        gate.touch(st.session_state.ticket)
+
+def admission_heartbeat():
+    """Hält den Platz in Schritt 2 und 5, solange der Tab offen ist (nur mit Zulassung)"""
+    if resources.get_admission() is not None:
+        admission_heartbeat_fragment()
+
+@st.fragment(run_every=admission.HEARTBEAT)
+def admission_heartbeat_fragment():
+    keep_admission()
+
+def waiting_room():
+    """Schlanker Ersatz für Schritt 2 oder 5, solange alle Plätze belegt sind (keine Diagramme)"""
+    st.markdown('<div class="step-header"><h2>⏳ Gleich geht\'s weiter!</h2></div>', unsafe_allow_html=True)
+    waiting_position()
+
+@st.fragment(run_every=admission.POLL_INTERVAL)
+def waiting_position():
+    """Fragt regelmässig nach; sobald ein Platz frei ist, lädt ein Rerun den Schritt"""
+    ok, position = resources.get_admission().acquire(st.session_state.ticket)
+    if ok:
+        st.rerun()
+    st.info(f"Gerade sind sehr viele gleichzeitig hier. Du bist Nr. {position} in der Warteschlange – "
+            "es geht von selbst weiter, lass diese Seite einfach offen.")
+
+def record_trace():
+    """Hält Schrittwechsel und Antworten für replay.py fest; geschrieben wird beim Erreichen der Ergebnisse"""
+    recorder = resources.get_trace_recorder()
+    if recorder is None:
+        return
+    step = st.session_state.current_step
+    trace = st.session_state.get('trace')
+    if trace is None:
+        # Nur Sessions ab Schritt 0, sonst fehlt der Anfang der Spur
+        trace = st.session_state.trace = traces.Trace() if step == 0 and recorder.sample() else False
+    if not trace or step == trace.step:
+        return
+    trace.transition(step, st.session_state.answers)
+    if step == traces.RESULT_STEP:
+        recorder.write(trace, current_result().empfehlung)
+        st.session_state.trace = False
+
+def debug_panel():
+    """Verstecktes Panel (?debug=1 mit ZUKUNFTSNAVIGATOR_DEBUG=1) mit denselben Zahlen wie der Metrik-Endpunkt"""
+    with st.expander("🛠️ Debug", expanded=True):
+        if not metrics.ENABLED:
+            st.caption("Metriken sind aus (ZUKUNFTSNAVIGATOR_METRIKEN=1 oder ZUKUNFTSNAVIGATOR_METRIKEN_PORT setzen).")
+            return
+        rows = metrics.REGISTRY.snapshot()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+
 # Hauptanwendung
 def main():
+    resources.get_metrics_server()
+    save_session()
+    record_trace()
+    
     # Sidebar für Navigation
     with st.sidebar:
         st.markdown("### 🧭 Navigation")
@@ -623,11 +818,15 @@ def main():
         
         if st.session_state.current_step > 1:
             st.markdown("### 📊 Deine Daten")
-            data = st.session_state.player_data
-            if 'name' in data:
-                st.write(f"👤 {data['name']}")
-            if 'klasse' in data:
-                st.write(f"🎓 {data['klasse']}")
+            data = st.session_state.answers
+            if data.name:
+                st.write(f"👤 {data.name}")
+                st.write(f"🎓 {data.klasse}")
+            if st.session_state.get('result') is not None:
+                st.write(f"🚀 {scoring.EMPFEHLUNGEN[st.session_state.result.empfehlung]}")
+        
+        if metrics.PANEL and st.query_params.get('debug') == '1':
+            debug_panel()
     
     # Fortschritt anzeigen (außer bei Start und Ergebnis)
     if 0 < st.session_state.current_step < 7:
@@ -646,7 +845,14 @@ def main():
     ]
     
     if st.session_state.current_step < len(steps):
-        steps[st.session_state.current_step]()
+        if not admitted():
+            waiting_room()
+            return
+        step = steps[st.session_state.current_step]
+        metrics.inc('zukunftsnavigator_reruns_total', schritt=step.__name__)
+        with metrics.timer('zukunftsnavigator_schritt_sekunden', schritt=step.__name__), \
+                lightcharts.measure(abschnitt=step.__name__):
+            step()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""Benchmark der Kalibrierung (calibrate.py): Laufzeit und Spitzen-RSS über verschiedene Datenmengen
+
+Für jede Grösse wird eine Ergebnis-Ablage mit synthetischen Ergebnissen und
+eine passende Wege-CSV erzeugt. Der „tatsächliche“ Weg folgt verrauscht dem
+mitgelieferten gewichte.json, damit die Kalibrierung etwas zu lernen hat.
+calibrate.py läuft dann in einem eigenen Prozess; gemessen werden Wandzeit
+und Spitzen-RSS dieses Prozesses.
+
+Beispiel:
+    python benchmarks/calibration.py --groessen 10000 100000 1000000 -j 4
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import catalog  # noqa: E402
+import store  # noqa: E402
+import weights  # noqa: E402
+from answers import Answers  # noqa: E402
+
+
+def random_answers(rng, cat):
+    return Answers(
+        name=f"Test{rng.randrange(10**6)}",
+        klasse=rng.choice(["3. Sek A", "3. Sek B"]),
+        alter=rng.randint(13, 18),
+        schule="Sekundarschule Muster",
+        situation=rng.randrange(len(cat.situation)),
+        kompetenzen=bytes(rng.randint(1, 5) for _ in cat.kompetenzen.ids),
+        motivationen=rng.getrandbits(len(cat.motivationen)) & rng.getrandbits(len(cat.motivationen)),
+        weekend_choice=rng.randrange(len(cat.weekend_choice)),
+        arbeitsumgebung=rng.randrange(len(cat.arbeitsumgebung)),
+        zukunftswerte=bytes(rng.randint(1, 5) for _ in cat.zukunftswerte.ids),
+        presentation_style=rng.randrange(len(cat.presentation_style)),
+        problem_solving=rng.randrange(len(cat.problem_solving)),
+    )
+
+
+def generate(directory, size, seed, batch=10_000):
+    """Schreibt size synthetische Ergebnisse und ihre Wege; gibt (db, csv) zurück"""
+    cat = catalog.get()
+    model = weights.load(os.path.join(ROOT, 'gewichte.json'))
+    rng = random.Random(seed)
+    db_path = os.path.join(directory, f'ergebnisse_{size}.db')
+    csv_path = os.path.join(directory, f'wege_{size}.csv')
+    conn = store.connect(db_path)
+    conn.executescript(store.SCHEMA)
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['schluessel', 'weg'])
+        for start in range(0, size, batch):
+            answers = [random_answers(rng, cat) for _ in range(min(batch, size - start))]
+            scores = model.scores_batch(answers)
+            rows, outcomes = [], []
+            for a, points in zip(answers, scores):
+                result_id = uuid.UUID(int=rng.getrandbits(128)).hex
+                noisy = [p + rng.gauss(0, 0.5) for p in points]
+                outcomes.append((result_id, model.paths[noisy.index(max(noisy))]))
+                data = a.to_dict()
+                rows.append((result_id, '', a.name, a.klasse, a.schule, a.alter, '', json.dumps(data, ensure_ascii=False)))
+            with conn:
+                conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            writer.writerows(outcomes)
+    conn.close()
+    return db_path, csv_path
+
+
+def run_calibration(db_path, csv_path, output, workers, chunk_size):
+    """Startet calibrate.py und misst Wandzeit und Spitzen-RSS (inkl. Worker)"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'calibrate.py'), csv_path, '--db', db_path, '-o', output,
+         '-j', str(workers), '--chunk-size', str(chunk_size), '--pruefen'],
+        stderr=subprocess.PIPE, text=True,
+    )
+    stderr = proc.stderr.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(stderr)
+    summary = json.loads(stderr.strip().splitlines()[-1])
+    peak = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return elapsed, peak, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groessen', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('-j', '--workers', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args(argv)
+
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.groessen:
+            db_path, csv_path = generate(tmp, size, args.seed)
+            elapsed, peak, summary = run_calibration(
+                db_path, csv_path, os.path.join(tmp, 'gewichte.json'), args.workers, args.chunk_size,
+            )
+            report.append({
+                'zeilen': size,
+                'sekunden': round(elapsed, 2),
+                'zeilen_pro_s': round(size / elapsed),
+                'spitzen_rss_mb': round(peak / 2**20, 1),
+                'trefferquote_modell': summary.get('trefferquote_modell'),
+                'trefferquote_regel': summary.get('trefferquote_regel'),
+            })
+            os.remove(db_path)
+            os.remove(csv_path)
+
+    print(f"{'Zeilen':>10}{'Sekunden':>10}{'Zeilen/s':>10}{'RSS MB':>9}{'Modell':>9}{'Regel':>9}")
+    for row in report:
+        print(f"{row['zeilen']:>10}{row['sekunden']:>10}{row['zeilen_pro_s']:>10}{row['spitzen_rss_mb']:>9}"
+              f"{row['trefferquote_modell']:>9}{row['trefferquote_regel']:>9}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
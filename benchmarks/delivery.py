@@ -0,0 +1,196 @@
+"""Benchmark der Zustellung gegen einen lokalen Ersatz-Server
+
+Der Ersatz-Server nimmt POSTs wie ein Schulverwaltungssystem entgegen und
+antwortet mit einer einstellbaren Quote mit 503 (oder bricht die Verbindung
+ab). Gemessen werden die Dauer von submit() (das ist alles, was die
+Ergebnisseite davon merkt), die Zeit bis alles zugestellt ist, die Anzahl
+geöffneter Verbindungen und doppelt zugestellte Ergebnisse.
+
+Dann dasselbe gegen einen Server, der mit 204 ohne Content-Length
+antwortet (jedes Bündel darf nur einmal ankommen). Danach ein Neustart: Der Server ist weg, Ergebnisse landen nur im Spool;
+eine neue Delivery-Instanz stellt sie zu, sobald der Server wieder läuft.
+
+Beispiel:
+    python benchmarks/delivery.py --ergebnisse 5000 --fehlerquote 0.2
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import catalog  # noqa: E402
+import delivery  # noqa: E402
+from calibration import random_answers  # noqa: E402
+
+
+class StandIn:
+    """Ersatz-Server; zählt empfangene IDs, Anfragen und Verbindungen"""
+
+    def __init__(self, port=0, error_rate=0.0, seed=0, no_content=False):
+        self.received = collections.Counter()
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        rng = random.Random(seed)
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with stand_in.lock:
+                    stand_in.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                with stand_in.lock:
+                    stand_in.requests += 1
+                    roll = rng.random()
+                if roll < error_rate / 2:
+                    self.close_connection = True
+                    return
+                if roll < error_rate:
+                    self.send_response(503)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                ids = [item['id'] for item in json.loads(body)['ergebnisse']]
+                with stand_in.lock:
+                    stand_in.received.update(ids)
+                if no_content:
+                    # Wie viele Ingest-Endpunkte: 204 ohne Content-Length, Verbindung bleibt offen
+                    self.send_response(204)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ergebnisse', type=int, default=5000)
+    parser.add_argument('--fehlerquote', type=float, default=0.1, help="Anteil Anfragen mit 503 oder Abbruch")
+    parser.add_argument('--batch-size', type=int, default=delivery.BATCH_SIZE)
+    parser.add_argument('--verbindungen', type=int, default=delivery.MAX_CONNECTIONS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args(argv)
+    # Die Fehlversuche sind hier gewollt
+    logging.basicConfig(level=logging.ERROR)
+
+    cat = catalog.get()
+    rng = random.Random(args.seed)
+    records = [(f"r{i:07d}", random_answers(rng, cat).to_dict()) for i in range(args.ergebnisse)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = os.path.join(tmp, 'zustellung.db')
+        server = StandIn(error_rate=args.fehlerquote, seed=args.seed)
+        options = dict(batch_size=args.batch_size, max_connections=args.verbindungen, timeout=5,
+                       base_backoff=0.05, max_backoff=0.5)
+        outbox = delivery.Delivery(f"http://127.0.0.1:{server.port}/ergebnisse", spool, **options)
+
+        start = time.perf_counter()
+        submit_us = []
+        for result_id, data in records:
+            t = time.perf_counter()
+            outbox.submit(result_id, data)
+            submit_us.append((time.perf_counter() - t) * 1e6)
+        complete = wait_for(lambda: len(server.received) == len(records), 120)
+        elapsed = time.perf_counter() - start
+        opened = outbox.pool.opened
+        outbox.close()
+        server.stop()
+
+        # 204 ohne Content-Length: jedes Bündel genau einmal
+        no_content = StandIn(no_content=True)
+        outbox = delivery.Delivery(f"http://127.0.0.1:{no_content.port}/ergebnisse", spool, **options)
+        sample = [(f"k{i:07d}", data) for i, (_, data) in enumerate(records[:500])]
+        t = time.perf_counter()
+        for result_id, data in sample:
+            outbox.submit(result_id, data)
+        no_content_complete = wait_for(lambda: len(no_content.received) == len(sample), 30)
+        no_content_elapsed = time.perf_counter() - t
+        time.sleep(0.2)
+        outbox.close()
+        no_content.stop()
+
+        # Neustart: Server weg, Ergebnisse nur im Spool, dann neue Instanz und Server wieder da
+        offline = [(f"n{i:07d}", data) for i, (_, data) in enumerate(records[:1000])]
+        outbox = delivery.Delivery(f"http://127.0.0.1:{server.port}/ergebnisse", spool, **options)
+        for result_id, data in offline:
+            outbox.submit(result_id, data)
+        time.sleep(0.2)
+        outbox.close()
+        spooled = outbox.status()['wartend']
+        server2 = StandIn(port=server.port, seed=args.seed)
+        outbox = delivery.Delivery(f"http://127.0.0.1:{server.port}/ergebnisse", spool, **options)
+        recovered = wait_for(lambda: len(server2.received) == len(offline), 60)
+        outbox.close()
+        server2.stop()
+
+    result = {
+        'ergebnisse': len(records),
+        'fehlerquote': args.fehlerquote,
+        'submit_p50_us': round(statistics.median(submit_us), 1),
+        'submit_p99_us': round(percentile(submit_us, 0.99), 1),
+        'alle_zugestellt': complete,
+        'dauer_s': round(elapsed, 2),
+        'ergebnisse_pro_s': round(len(server.received) / elapsed),
+        'anfragen': server.requests,
+        'verbindungen': opened,
+        'doppelt': sum(count - 1 for count in server.received.values()),
+        'antwort_204_zugestellt': no_content_complete,
+        'antwort_204_dauer_s': round(no_content_elapsed, 2),
+        'antwort_204_doppelt': sum(count - 1 for count in no_content.received.values()),
+        'neustart_im_spool': spooled,
+        'neustart_zugestellt': recovered,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0 if complete and recovered and no_content_complete else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
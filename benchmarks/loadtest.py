@@ -0,0 +1,218 @@
+"""Lasttest: N simulierte Sessions laufen gleichzeitig durch den ganzen Wizard
+
+Jede Session ist ein Streamlit-AppTest (In-Process-App-Testing) und beantwortet
+alle Fragen zufällig. Die Sessions eines Prozesses sind alle gleichzeitig
+offen und rücken abwechselnd vor, wie mehrere Browser an einem Server.
+Gemessen wird die Dauer jedes Reruns pro Schritt, der Spitzenwert des RSS
+und der Speicher, den eine Session im Prozess belegt. Mit --max-aktiv
+läuft die Zulassung zu den Schritten 2 und 5 mit; wartende Sessions fragen
+dann wie der Warteraum im Browser nach, bis sie dran sind.
+
+Beispiel:
+    python benchmarks/loadtest.py --sessions 60 --processes 2
+"""
+import argparse
+import atexit
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'app.py')
+sys.path.insert(0, ROOT)
+
+import replay  # noqa: E402
+
+STEPS = ["Start", "Persönliche Daten", "Kompetenzen", "Motivation", "Umgebung", "Zukunftswerte", "Persönlichkeit", "Ergebnisse"]
+
+
+def rss_bytes():
+    """Aktueller RSS des Prozesses (Linux), sonst der bisherige Spitzenwert"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def button(at, label):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise LookupError(f"Button {label!r} nicht gefunden (Schritt {at.session_state.current_step})")
+
+
+def answer_step(at, rng):
+    """Füllt den aktuellen Schritt zufällig aus und gibt den auslösenden Button zurück"""
+    step = at.session_state.current_step
+    if step == 0:
+        return button(at, "🚀 Los geht's!")
+    if step == 1:
+        at.text_input[0].input(f"Test{rng.randrange(10**6)}")
+        at.text_input[1].input(rng.choice(["3. Sek A", "3. Sek B", "2. Sek C"]))
+        at.text_input[2].input(rng.choice(["Sekundarschule Muster", "Schulhaus Nord"]))
+        at.number_input[0].set_value(rng.randint(13, 18))
+        at.selectbox[0].set_value(rng.randrange(len(at.selectbox[0].options)))
+        return button(at, "Weiter ➡️")
+    if step in (2, 5):
+        for slider in at.slider:
+            slider.set_value(rng.randint(1, 5))
+        return button(at, "Weiter ➡️")
+    if step == 3:
+        for checkbox in at.checkbox:
+            checkbox.set_value(rng.random() < 0.3)
+        at.radio[0].set_value(rng.randrange(len(at.radio[0].options)))
+        return button(at, "Weiter ➡️")
+    if step == 4:
+        radio = at.radio(key="env_radio")
+        radio.set_value(rng.randrange(len(radio.options)))
+        return button(at, "Weiter ➡️")
+    if step == 6:
+        for radio in at.radio:
+            radio.set_value(rng.randrange(len(radio.options)))
+        at.text_area[0].input("Ich bin hilfsbereit")
+        at.text_area[1].input("Selbstbewusster werden")
+        return button(at, "🎯 Auswertung erstellen!")
+    at.text_area[0].input("Guter Test")
+    return button(at, "Feedback senden")
+
+
+def advance(at, rng, timings, waits):
+    """Beantwortet den aktuellen Schritt und misst den ausgelösten Rerun; False nach Schritt 7"""
+    step = at.session_state.current_step
+    if step in (2, 5) and not at.slider:
+        # Im Warteraum: nur nachfragen, wie es das Fragment im Browser tut
+        at.run()
+        waits.append(step)
+        return True
+    trigger = answer_step(at, rng)
+    start = time.perf_counter()
+    trigger.click().run()
+    timings[step].append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(f"Schritt {step}: {at.exception[0].message}")
+    return step != 7
+
+
+def run_worker(seeds):
+    """Führt mehrere Sessions verschränkt durch den Wizard (läuft in einem eigenen Prozess)
+
+    AppTest ist nicht threadsicher, darum rückt jede Session abwechselnd um
+    einen Rerun vor; alle Sessions bleiben bis zum Schluss im Speicher.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    # Eine Aufwärm-Session, damit Importe und Caches nicht der ersten echten Session angerechnet werden
+    warmup, rng = AppTest.from_file(APP, default_timeout=120).run(), random.Random(-1)
+    while advance(warmup, rng, defaultdict(list), []):
+        pass
+    del warmup
+    baseline = rss_bytes()
+
+    timings = defaultdict(list)
+    waits = []
+    active = []
+    for seed in seeds:
+        at = AppTest.from_file(APP, default_timeout=120)
+        start = time.perf_counter()
+        at.run()
+        timings[0].append(time.perf_counter() - start)
+        active.append((at, random.Random(seed)))
+    sessions = list(active)
+
+    while active:
+        active = [(at, rng) for at, rng in active if advance(at, rng, timings, waits)]
+
+    return {
+        'timings': dict(timings),
+        'waits': len(waits),
+        'peak_rss': peak_rss_bytes(),
+        'per_session': (rss_bytes() - baseline) / max(len(sessions), 1),
+    }
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=30, help="Anzahl simulierter Sessions")
+    parser.add_argument('--processes', type=int, default=1, help="Server-Prozesse, auf die die Sessions verteilt werden")
+    parser.add_argument('--max-aktiv', type=int, default=0,
+                        help="Sessions pro Prozess gleichzeitig in Schritt 2 und 5 (0 = unbeschränkt)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args(argv)
+
+    # Alle Ablagen wie bei replay.py im temporären Verzeichnis, aufgeräumt nach den atexit-Checkpoints der App
+    tmp = tempfile.mkdtemp(prefix='loadtest-')
+    atexit.register(shutil.rmtree, tmp, True)
+    replay.isolate(tmp)
+    if args.max_aktiv:
+        os.environ['ZUKUNFTSNAVIGATOR_MAX_AKTIV'] = str(args.max_aktiv)
+
+    seeds = [args.seed + i for i in range(args.sessions)]
+    batches = [seeds[i::args.processes] for i in range(args.processes)]
+    start = time.perf_counter()
+    if args.processes == 1:
+        results = [run_worker(seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            results = list(pool.map(run_worker, batches))
+    elapsed = time.perf_counter() - start
+
+    timings = defaultdict(list)
+    for result in results:
+        for step, samples in result['timings'].items():
+            timings[step].extend(samples)
+
+    report = {
+        'sessions': args.sessions,
+        'processes': args.processes,
+        'seconds': round(elapsed, 2),
+        'peak_rss_mb': round(max(r['peak_rss'] for r in results) / 2**20, 1),
+        'memory_per_session_kb': round(statistics.fmean(r['per_session'] for r in results) / 1024, 1),
+        'max_aktiv': args.max_aktiv or None,
+        'warteraum_abfragen': sum(r['waits'] for r in results),
+        'steps': {
+            STEPS[step]: {
+                'reruns': len(samples),
+                'p50_ms': round(percentile(samples, 50) * 1000, 1),
+                'p95_ms': round(percentile(samples, 95) * 1000, 1),
+                'p99_ms': round(percentile(samples, 99) * 1000, 1),
+                'mean_ms': round(statistics.fmean(samples) * 1000, 1),
+            }
+            for step, samples in sorted(timings.items())
+        },
+    }
+
+    print(f"{args.sessions} Sessions auf {args.processes} Prozess(en) in {report['seconds']} s, "
+          f"Spitzen-RSS {report['peak_rss_mb']} MB, ~{report['memory_per_session_kb']} KB pro Session")
+    if args.max_aktiv:
+        print(f"Höchstens {args.max_aktiv} Sessions in Schritt 2/5, {report['warteraum_abfragen']} Abfragen im Warteraum")
+    print(f"{'Schritt':<20}{'Reruns':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in report['steps'].items():
+        print(f"{name:<20}{row['reruns']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Bytes pro Rerun der Diagramme in Schritt 2 und 5: Plotly gegen den leichten Modus
+
+Für zufällige Bewertungen wird gemessen, wie viele Bytes ein Rerun mit dem
+Radar bzw. den Balken über den Websocket schickt (Figur von st.plotly_chart
+gegen die Argumente der Komponente) und wie lange das Bauen dauert.
+
+Beispiel:
+    python benchmarks/payload.py --profile 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import catalog  # noqa: E402
+import lightcharts  # noqa: E402
+
+
+def light_bytes(art, labels, values):
+    args = {'art': art, 'labels': list(labels), 'werte': list(values), 'max': lightcharts.MAX,
+            'key': f"diagramm_{art}", 'default': None}
+    return len(json.dumps(args))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', type=int, default=500, help="Anzahl zufälliger Bewertungen pro Diagramm")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args(argv)
+
+    # Wie in der App: Streamlit setzt beim ersten plotly_chart sein eigenes Plotly-Template
+    from streamlit.elements.lib.streamlit_plotly_theme import configure_streamlit_plotly_theme
+    configure_streamlit_plotly_theme()
+
+    cat = catalog.get()
+    rng = random.Random(args.seed)
+    result = {}
+    for art, labels in (('radar', cat.kompetenzen.labels), ('balken', cat.zukunftswerte.labels)):
+        plotly, light, build_ms = [], [], []
+        for _ in range(args.profile):
+            values = tuple(rng.randint(1, 5) for _ in labels)
+            start = time.perf_counter()
+            plotly.append(lightcharts.plotly_bytes(art, labels, values))
+            build_ms.append((time.perf_counter() - start) * 1000)
+            light.append(light_bytes(art, labels, values))
+        result[art] = {
+            'plotly_bytes': round(statistics.mean(plotly)),
+            'leicht_bytes': round(statistics.mean(light)),
+            'faktor': round(statistics.mean(plotly) / statistics.mean(light), 1),
+            'plotly_bauen_und_serialisieren_ms_p50': round(statistics.median(build_ms), 2),
+        }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Benchmark der PDF-Berichte: eine ganze Klasse fordert ihre Berichte gleichzeitig an
+
+Alle Berichte werden auf einmal beim ReportService in Auftrag gegeben (wie
+wenn eine Klasse gleichzeitig auf „PDF erstellen“ drückt). Gemessen werden
+die Zeit bis zum jeweiligen fertigen PDF, die Gesamtdauer und danach die
+Latenz eines erneuten Downloads aus dem Cache.
+
+Beispiel:
+    python benchmarks/reports.py --berichte 30 -j 4
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import catalog  # noqa: E402
+import report  # noqa: E402
+import scoring  # noqa: E402
+from calibration import random_answers  # noqa: E402
+
+
+def result_data(answers):
+    strengths, improvements = scoring.strengths_improvements_answers(answers)
+    return {
+        **answers.to_dict(),
+        'empfehlung': scoring.recommend_answers(answers),
+        'datum': datetime.now().isoformat(),
+        'staerken': strengths,
+        'entwicklungsfelder': improvements,
+    }
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--berichte', type=int, default=30)
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args(argv)
+
+    cat = catalog.get()
+    rng = random.Random(args.seed)
+    contents = [report.report_content(result_data(random_answers(rng, cat))) for _ in range(args.berichte)]
+    for i, content in enumerate(contents):
+        content['name'] = f"{content['name']}-{i}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = report.ReportService(tmp, workers=args.workers, max_pending=max(256, args.berichte))
+        # Pool einmal starten, damit der Prozessstart nicht in die Messung fällt
+        warmup = service.submit(report.report_content(result_data(random_answers(rng, cat))))
+        while service.pending(warmup):
+            time.sleep(0.01)
+
+        start = time.perf_counter()
+        keys = [service.submit(content) for content in contents]
+        submit_ms = (time.perf_counter() - start) * 1000
+        ready = {}
+        while len(ready) < len(keys):
+            for key in keys:
+                if key not in ready and not service.pending(key):
+                    ready[key] = time.perf_counter() - start
+            time.sleep(0.002)
+        total = time.perf_counter() - start
+        latencies = [ready[key] * 1000 for key in keys]
+        sizes = [len(service.get(key)) for key in keys]
+
+        cached = []
+        for key in keys:
+            t = time.perf_counter()
+            service.get(key)
+            cached.append((time.perf_counter() - t) * 1000)
+        service.close()
+
+    result = {
+        'berichte': args.berichte,
+        'worker': service.workers,
+        'einreichen_ms': round(submit_ms, 2),
+        'gesamt_s': round(total, 3),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p99_ms': round(percentile(latencies, 0.99), 1),
+        'cache_p99_ms': round(percentile(cached, 0.99), 3),
+        'kb_pro_bericht': round(statistics.mean(sizes) / 1024, 1),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Benchmark des Nächste-Nachbarn-Index: Abfragelatenz, Trefferquote und Heap-Bedarf
+
+Erzeugt synthetische Profile (Kompetenzen hängen an einem gemeinsamen
+„praktisch ↔ theoretisch“-Merkmal, damit die Daten nicht gleichverteilt sind),
+schreibt sie in einen Index in einem temporären Verzeichnis und misst dann
+Abfragen aus einem frisch geöffneten Index. Die Trefferquote vergleicht mit
+der exakten Suche ohne Kandidatenbudget.
+
+Beispiel:
+    python benchmarks/similarity.py --profiles 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import neighbours  # noqa: E402
+
+
+def synthetic_rows(layout, n, seed):
+    rng = np.random.default_rng(seed)
+    trait = rng.normal(0, 1, n)
+    weights = np.zeros(layout.kompetenzen)
+    weights[layout.practical] = 0.8
+    weights[layout.theoretical] = -0.8
+    rows = np.zeros((n, neighbours.WIDTH), dtype=np.uint8)
+    k, w, m = layout.kompetenzen, layout.werte, layout.motivationen
+    rows[:, :k] = np.clip(np.rint(3 + trait[:, None] * weights + rng.normal(0, 1, (n, k))), 1, 5)
+    rows[:, k:k + w] = np.clip(np.rint(3 + rng.normal(0, 1.1, (n, w))), 1, 5)
+    rows[:, k + w:k + w + m] = rng.random((n, m)) < 0.3
+    rows[np.arange(n), layout.env_start + rng.integers(0, layout.umgebungen, n)] = 1
+    rows[:, layout.dims] = rng.integers(1, len(neighbours.RECOMMENDATIONS), n)
+    return rows
+
+
+def anon_rss_bytes():
+    """Anonymer (Heap-)Anteil des RSS; Dateiabbildungen zählen nicht mit (nur Linux)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--exact', type=int, default=50, help="Abfragen, die mit einer exakten Suche verglichen werden")
+    parser.add_argument('--k', type=int, default=neighbours.K)
+    parser.add_argument('--budget', type=int, default=neighbours.BUDGET)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        layout = neighbours.ProfileIndex(tmp).layout
+        rows = synthetic_rows(layout, args.profiles, args.seed)
+        queries = rows[np.random.default_rng(args.seed + 1).integers(0, args.profiles, args.queries)].copy()
+        start = time.perf_counter()
+        neighbours.ProfileIndex(tmp).replace(rows)
+        build_seconds = time.perf_counter() - start
+        del rows
+
+        index = neighbours.ProfileIndex(tmp)
+        index.query(queries[0], args.k, args.budget)
+        heap_before = anon_rss_bytes()
+        latencies, results = [], []
+        for q in queries:
+            start = time.perf_counter()
+            results.append(index.query(q, args.k, args.budget)[0])
+            latencies.append(time.perf_counter() - start)
+        heap_after = anon_rss_bytes()
+
+        # Ohne Budget endet die Suche erst an der Schranke und ist damit exakt
+        recalls = []
+        for q, found in zip(queries[:args.exact], results):
+            exact = index.query(q, args.k, budget=args.profiles)[0]
+            recalls.append(float(np.mean(found <= exact.max())))
+
+    latencies_ms = np.array(latencies) * 1000
+    report = {
+        'profiles': args.profiles,
+        'k': args.k,
+        'budget': args.budget,
+        'build_s': round(build_seconds, 2),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2),
+        'max_ms': round(float(latencies_ms.max()), 2),
+        'recall': round(float(np.mean(recalls)), 3),
+        'heap_growth_mb': round((heap_after - heap_before) / 2**20, 1) if heap_before is not None else None,
+    }
+    print(f"{args.profiles} Profile, k={args.k}, Budget {args.budget}: "
+          f"p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms, Trefferquote {report['recall']:.1%}, "
+          f"Aufbau {report['build_s']} s, Heap-Zuwachs {report['heap_growth_mb']} MB")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
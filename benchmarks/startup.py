@@ -0,0 +1,103 @@
+"""Kaltstart-Benchmark: Importzeit des App-Moduls und erstes Rendern von step_0_welcome
+
+Jede Messung läuft in einem frischen Python-Prozess, damit nichts aus dem
+Modul-Cache mitgezählt wird.
+
+Beispiel:
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import replay  # noqa: E402
+
+HEAVY_MODULES = ['pandas', 'numpy', 'plotly.express', 'plotly.graph_objects']
+
+# Streamlit selbst wird vorab geladen; gemessen und gemeldet wird nur, was die App zusätzlich lädt
+IMPORT_PROBE = """
+import json, sys, time, logging
+import streamlit
+logging.disable(logging.WARNING)
+sys.path.insert(0, {root!r})
+before = set(sys.modules)
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in set(sys.modules) - before]}}))
+"""
+
+RENDER_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+before = set(sys.modules)
+ready = time.perf_counter()
+at.run()
+done = time.perf_counter()
+assert not at.exception, at.exception
+print(json.dumps({{
+    'seconds': done - start,
+    'script_seconds': done - ready,
+    'loaded': [m for m in {heavy!r} if m in set(sys.modules) - before],
+}}))
+"""
+
+
+def probe(code, env):
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    return {
+        'median_ms': round(statistics.median(samples) * 1000, 1),
+        'min_ms': round(min(samples) * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    # Alle Ablagen wie bei replay.py im temporären Verzeichnis
+    tmp = tempfile.mkdtemp(prefix='startup-')
+    atexit.register(shutil.rmtree, tmp, True)
+    replay.isolate(tmp)
+    env = dict(os.environ)
+    imports, renders, scripts = [], [], []
+    loaded_on_import = loaded_on_render = []
+    for _ in range(args.runs):
+        result = probe(IMPORT_PROBE.format(root=ROOT, heavy=HEAVY_MODULES), env)
+        imports.append(result['seconds'])
+        loaded_on_import = result['loaded']
+        result = probe(RENDER_PROBE.format(app=os.path.join(ROOT, 'app.py'), heavy=HEAVY_MODULES), env)
+        renders.append(result['seconds'])
+        scripts.append(result['script_seconds'])
+        loaded_on_render = result['loaded']
+
+    print(json.dumps({
+        'runs': args.runs,
+        'import_app': summarize(imports),
+        'first_render_step_0': summarize(renders),
+        'first_render_step_0_script_only': summarize(scripts),
+        'heavy_modules_after_import': loaded_on_import,
+        'heavy_modules_after_first_render': loaded_on_render,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
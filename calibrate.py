@@ -0,0 +1,235 @@
+"""Kalibriert die Gewichte des gewichteten Modells (weights.py) an den tatsächlich gewählten Wegen
+
+Eingabe ist eine CSV mit den Spalten `schluessel` und `weg`. `weg` ist einer
+der Wege aus scoring.EMPFEHLUNGEN. `schluessel` ist entweder die ID eines
+Ergebnisses in der Ergebnis-Ablage (--db) oder eine Datei aus einem
+Export-Verzeichnis bzw. einer ZIP-Datei (--exporte), wie in der Spalte
+`datei` von rescore.py.
+
+Die CSV wird in Blöcken gelesen. Jeder Block wird mit seinen Ergebnissen
+verbunden und in Merkmale übersetzt; übrig bleiben nur XᵀX und XᵀY
+(Merkmale × Merkmale bzw. × Wege). Diese Summen werden über alle Blöcke und
+Worker addiert, der Speicherbedarf hängt also nicht von der Anzahl Zeilen ab.
+Die Gewichte sind die Lösung der Ridge-Regression (XᵀX + λI) W = XᵀY. Die
+neue Gewichtsdatei bekommt die nächste Versionsnummer nach --basis
+(Standard: gewichte.json) und landet ohne -o daneben als
+gewichte-<version>.json; die handgesetzte Datei im Repository bleibt also
+unberührt. Eine bestehende Datei wird nur mit --ersetzen überschrieben,
+dann atomar, und die App lädt sie ohne Neustart.
+
+Beispiel:
+    python calibrate.py wege.csv --db zukunftsnavigator.db -j 4
+"""
+import argparse
+import collections
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import rescore
+import scoring
+import store
+import weights
+from answers import Answers
+
+KEY_COLUMN = 'schluessel'
+PATH_COLUMN = 'weg'
+RIDGE = 1.0
+# Gewichte darunter werden nicht in die Datei geschrieben
+MIN_WEIGHT = 1e-6
+
+
+def read_outcomes(path, chunk_size):
+    """Liest die Ergebnis-CSV blockweise als (Schlüssel, Wege)-Listen"""
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, usecols=[KEY_COLUMN, PATH_COLUMN], dtype=str,
+                             chunksize=chunk_size, keep_default_na=False):
+        yield chunk[KEY_COLUMN].tolist(), chunk[PATH_COLUMN].tolist()
+
+
+def load_chunk(source, keys):
+    """Ergebnisse zu den Schlüsseln in derselben Reihenfolge; None, wo keines gefunden wurde"""
+    kind, path = source
+    if kind == 'db':
+        found = store.fetch_results(path, keys)
+        return [found.get(key) for key in keys]
+    if not zipfile.is_zipfile(path):
+        keys = [key if os.path.exists(key) else os.path.join(path, key) for key in keys]
+    records, errors = rescore.load_records(path, keys)
+    return [None if i in errors else data for i, data in enumerate(records)]
+
+
+def prepare(source, keys, labels):
+    """Verbindet einen Block mit seinen Ergebnissen: (Antworten, Weg-Codes, Anzahl übersprungen)"""
+    codes = [scoring.RECOMMENDATIONS.index(label) if label in scoring.RECOMMENDATIONS else -1 for label in labels]
+    answers, kept = [], []
+    for data, code in zip(load_chunk(source, keys), codes):
+        if data is not None and code >= 0:
+            answers.append(Answers.from_dict(data))
+            kept.append(code)
+    return answers, np.array(kept, dtype=np.intp), len(keys) - len(kept)
+
+
+def accumulate_chunk(source, keys, labels):
+    """XᵀX, XᵀY und Zeilenzahlen eines Blocks (läuft im Worker)"""
+    answers, codes, skipped = prepare(source, keys, labels)
+    X = weights.feature_matrix(answers)
+    Y = np.zeros((len(codes), len(scoring.RECOMMENDATIONS)))
+    Y[np.arange(len(codes)), codes] = 1
+    return X.T @ X, X.T @ Y, len(codes), skipped
+
+
+def evaluate_chunk(source, keys, labels, model):
+    """Treffer des neuen Modells und der Regel in einem Block (läuft im Worker)"""
+    answers, codes, _ = prepare(source, keys, labels)
+    if not answers:
+        return 0, 0, 0
+    predicted = model.recommend_batch(answers)
+    actual = [scoring.RECOMMENDATIONS[code] for code in codes]
+    model_hits = sum(p == a for p, a in zip(predicted, actual))
+    rule_hits = sum(scoring.recommend_answers(ans) == a for ans, a in zip(answers, actual))
+    return model_hits, rule_hits, len(answers)
+
+
+def map_chunks(func, chunks, workers, source, *extra):
+    """Ruft func(source, schlüssel, wege, *extra) für alle Blöcke auf
+
+    Wie in rescore.py sind höchstens 2 Blöcke pro Worker gleichzeitig unterwegs.
+    """
+    if workers == 1:
+        for keys, labels in chunks:
+            yield func(source, keys, labels, *extra)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for keys, labels in chunks:
+            pending.append(pool.submit(func, source, keys, labels, *extra))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def fit(xtx, xty, ridge=RIDGE):
+    """Ridge-Lösung W (Wege × Merkmale); die Konstante wird nicht bestraft"""
+    penalty = np.full(len(xtx), float(ridge))
+    penalty[weights.feature_names().index(weights.BIAS)] = 0.0
+    return np.linalg.solve(xtx + np.diag(penalty), xty).T
+
+
+def next_version(path):
+    """Nächste Versionsnummer: führende Zahl der bisherigen Datei + 1"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            match = re.match(r'\d+', str(json.load(f).get('version', '')))
+    except (OSError, ValueError):
+        match = None
+    return int(match.group()) + 1 if match else 1
+
+
+def default_output(base):
+    """gewichte-<nächste Version>.json neben der bisherigen Datei"""
+    return os.path.join(os.path.dirname(base), f"gewichte-{next_version(base)}.json")
+
+
+def write_weights(path, matrix, rows, ridge, base=None):
+    names = weights.feature_names()
+    version = f"{next_version(base or path)}-kalibriert"
+    data = {
+        'version': version,
+        'erstellt': datetime.now().isoformat(timespec='seconds'),
+        'zeilen': rows,
+        'ridge': ridge,
+        'gewichte': {
+            path_name: {name: round(float(w), 6) for name, w in zip(names, row) if abs(w) >= MIN_WEIGHT}
+            for path_name, row in zip(scoring.RECOMMENDATIONS, matrix)
+        },
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return version
+
+
+def calibrate(outcomes, source, output, workers=None, chunk_size=10_000, ridge=RIDGE, check=False, base=None):
+    """Kalibriert, schreibt die Gewichtsdatei und gibt eine Zusammenfassung zurück
+
+    Die Versionsnummer folgt auf die von base (ohne base: auf die bisherige output).
+    """
+    if not ridge > 0:
+        # Ohne Regularisierung ist XᵀX singulär, sobald ein Merkmal nie vorkommt
+        raise ValueError(f"ridge muss grösser als 0 sein, nicht {ridge}")
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    features = len(weights.feature_names())
+    xtx = np.zeros((features, features))
+    xty = np.zeros((features, len(scoring.RECOMMENDATIONS)))
+    rows = skipped = 0
+    for part_xtx, part_xty, n, s in map_chunks(accumulate_chunk, read_outcomes(outcomes, chunk_size), workers, source):
+        xtx += part_xtx
+        xty += part_xty
+        rows += n
+        skipped += s
+    if (xty.sum(axis=0) > 0).sum() < 2:
+        raise ValueError("Für die Kalibrierung braucht es Ergebnisse zu mindestens zwei verschiedenen Wegen")
+    matrix = fit(xtx, xty, ridge)
+    version = write_weights(output, matrix, rows, ridge, base)
+    summary = {'zeilen': rows, 'uebersprungen': skipped, 'version': version, 'datei': output,
+               'sekunden': round(time.perf_counter() - start, 2)}
+
+    if check:
+        model = weights.load(output)
+        hits = np.zeros(3, dtype=np.int64)
+        for result in map_chunks(evaluate_chunk, read_outcomes(outcomes, chunk_size), workers, source, model):
+            hits += result
+        if hits[2]:
+            summary['trefferquote_modell'] = round(hits[0] / hits[2], 4)
+            summary['trefferquote_regel'] = round(hits[1] / hits[2], 4)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gewichte des Bewertungsmodells an tatsächlichen Wegen kalibrieren")
+    parser.add_argument('wege', help=f"CSV mit den Spalten '{KEY_COLUMN}' und '{PATH_COLUMN}'")
+    quelle = parser.add_mutually_exclusive_group(required=True)
+    quelle.add_argument('--db', help="Ergebnis-Ablage (SQLite), Schlüssel = Ergebnis-ID")
+    quelle.add_argument('--exporte', help="Verzeichnis oder ZIP mit JSON-Exporten, Schlüssel = Datei")
+    parser.add_argument('--basis', default='gewichte.json', help="Bisherige Gewichtsdatei, deren Version weitergezählt wird")
+    parser.add_argument('-o', '--ausgabe', help="Neue Gewichtsdatei (Standard: gewichte-<version>.json neben --basis)")
+    parser.add_argument('--ersetzen', action='store_true', help="Eine bestehende Ausgabedatei überschreiben")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Anzahl Prozesse (Standard: alle CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=10_000, help="Zeilen pro Block")
+    parser.add_argument('--ridge', type=float, default=RIDGE, help="Stärke der Ridge-Regularisierung λ (> 0)")
+    parser.add_argument('--pruefen', action='store_true',
+                        help="Trefferquote von Modell und Regel in einem zweiten Durchgang ausgeben")
+    args = parser.parse_args(argv)
+
+    source = ('db', args.db) if args.db else ('exporte', args.exporte)
+    for path in (args.wege, source[1]):
+        if not os.path.exists(path):
+            parser.error(f"{path} existiert nicht")
+    if not args.ridge > 0:
+        parser.error(f"--ridge muss grösser als 0 sein (z.B. {RIDGE}), nicht {args.ridge:g}")
+    output = args.ausgabe or default_output(args.basis)
+    if os.path.exists(output) and not args.ersetzen:
+        parser.error(f"{output} existiert schon; mit --ersetzen überschreiben oder ein anderes -o wählen")
+    try:
+        summary = calibrate(args.wege, source, output, args.workers, args.chunk_size, args.ridge, args.pruefen,
+                            base=args.basis)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Fragenkatalog: wird aus catalog.json einmal pro Prozess geladen und von allen Sessions geteilt
+
+Antworten speichern nur Positionen in die Abschnitte des Katalogs (siehe
+answers.py). Ändert sich die Datei, wird sie beim nächsten get() neu geladen,
+solange Fragen-IDs und Beschriftungen gleich bleiben; geänderte
+Beschreibungen brauchen so keinen Neustart. Die Beschriftungen sind die
+Schlüssel der gespeicherten Ergebnisse (Export-Format, Rollups, Perzentile,
+Nachbarn-Index) und werden darum nicht im laufenden Betrieb getauscht. Ein
+ungültiger oder fehlender Katalog wird verworfen und der bisherige bleibt
+aktiv.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+PATH = os.environ.get(
+    'ZUKUNFTSNAVIGATOR_KATALOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog.json'),
+)
+# Abschnitte des Katalogs, benannt wie die Felder in answers.Answers
+SECTIONS = (
+    'situation', 'kompetenzen', 'motivationen', 'weekend_choice',
+    'arbeitsumgebung', 'zukunftswerte', 'presentation_style', 'problem_solving',
+)
+RELOAD_INTERVAL = 2.0
+
+
+@dataclass(frozen=True, slots=True)
+class Section:
+    """Ein Abschnitt mit vorberechneten Indizes (ID → Position, Label → Position)"""
+    ids: tuple
+    labels: tuple
+    descriptions: tuple
+    position: MappingProxyType
+    label_position: MappingProxyType
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(zip(self.ids, self.labels, self.descriptions))
+
+    def label(self, question_id):
+        return self.labels[self.position[question_id]]
+
+
+@dataclass(frozen=True, slots=True)
+class Catalog:
+    version: int
+    situation: Section
+    kompetenzen: Section
+    motivationen: Section
+    weekend_choice: Section
+    arbeitsumgebung: Section
+    zukunftswerte: Section
+    presentation_style: Section
+    problem_solving: Section
+
+    def ids(self):
+        return {name: getattr(self, name).ids for name in SECTIONS}
+
+    def labels(self):
+        return {name: getattr(self, name).labels for name in SECTIONS}
+
+
+def _section(name, items):
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"Abschnitt '{name}' muss eine nicht-leere Liste sein")
+    ids, labels, descriptions = [], [], []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"{name}[{i}] ist kein Objekt")
+        question_id, label = item.get('id'), item.get('label')
+        if not isinstance(question_id, str) or not question_id:
+            raise ValueError(f"{name}[{i}] hat keine gültige 'id'")
+        if not isinstance(label, str) or not label:
+            raise ValueError(f"{name}[{i}] hat kein gültiges 'label'")
+        ids.append(question_id)
+        labels.append(label)
+        descriptions.append(item.get('beschreibung', ''))
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Abschnitt '{name}' enthält doppelte IDs")
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"Abschnitt '{name}' enthält doppelte Labels")
+    return Section(
+        ids=tuple(ids),
+        labels=tuple(labels),
+        descriptions=tuple(descriptions),
+        position=MappingProxyType({key: i for i, key in enumerate(ids)}),
+        label_position=MappingProxyType({label: i for i, label in enumerate(labels)}),
+    )
+
+
+def parse(raw):
+    """Validiert den Inhalt einer Katalogdatei und baut daraus einen Catalog"""
+    if not isinstance(raw, dict):
+        raise ValueError("Katalog muss ein JSON-Objekt sein")
+    missing = [name for name in SECTIONS if name not in raw]
+    if missing:
+        raise ValueError(f"Abschnitte fehlen: {', '.join(missing)}")
+    return Catalog(version=raw.get('version', 1), **{name: _section(name, raw[name]) for name in SECTIONS})
+
+
+def load(path=PATH):
+    with open(path, encoding='utf-8') as f:
+        return parse(json.load(f))
+
+
+_lock = threading.Lock()
+_current = None
+_mtime = None
+_checked = 0.0
+
+
+def get():
+    """Aktueller Katalog; prüft höchstens alle RELOAD_INTERVAL Sekunden, ob die Datei geändert wurde"""
+    global _current, _mtime, _checked
+    now = time.monotonic()
+    if _current is not None and now - _checked < RELOAD_INTERVAL:
+        return _current
+    with _lock:
+        if _current is not None and now - _checked < RELOAD_INTERVAL:
+            return _current
+        _checked = now
+        if _current is None:
+            _current, _mtime = load(), os.stat(PATH).st_mtime_ns
+            return _current
+        try:
+            mtime = os.stat(PATH).st_mtime_ns
+        except OSError as exc:
+            # Umbenannt oder gelöscht: weiter mit dem bisherigen, neu laden, sobald die Datei wieder da ist
+            logger.error("Katalog %s nicht lesbar: %s", PATH, exc)
+            return _current
+        if mtime == _mtime:
+            return _current
+        try:
+            fresh = load()
+            if fresh.ids() != _current.ids():
+                raise ValueError("Fragen-IDs oder ihre Reihenfolge haben sich geändert, Neustart nötig")
+            if fresh.labels() != _current.labels():
+                raise ValueError("Beschriftungen haben sich geändert (Schlüssel gespeicherter Ergebnisse), "
+                                 "Neustart nötig")
+        except (OSError, ValueError) as exc:
+            logger.error("Katalog %s nicht neu geladen: %s", PATH, exc)
+        else:
+            _current = fresh
+            logger.info("Katalog %s neu geladen", PATH)
+        _mtime = mtime
+        return _current
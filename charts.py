@@ -0,0 +1,117 @@
+"""Diagramme der Vorschau-Seiten, zwischengespeichert über alle Sessions
+
+Jede Bewertung hat nur 5 mögliche Werte und die Slider starten alle bei 3,
+darum wiederholen sich die Profile oft. Die fertigen Figuren werden pro
+Bewertungs-Tupel in einem begrenzten LRU-Cache gehalten und dürfen vom
+Aufrufer nicht verändert werden.
+
+Plotly und pandas werden erst beim ersten Diagramm importiert, damit ein
+Kaltstart der App sie nicht laden muss. Die Bauzeit (nur Cache-Fehlschläge)
+landet in metrics.
+"""
+import functools
+
+import metrics
+
+CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+@metrics.timed('zukunftsnavigator_diagramm_sekunden', diagramm='radar')
+def radar_chart(categories, values):
+    """Radar Chart der Kompetenzen (Schritt 2)"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=list(values),
+        theta=list(categories),
+        fill='toself',
+        name='Deine Kompetenzen',
+        line_color='rgb(102, 126, 234)'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 5]
+            )),
+        showlegend=False,
+        height=400
+    )
+    return fig
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+@metrics.timed('zukunftsnavigator_diagramm_sekunden', diagramm='prioritaeten')
+def priority_chart(aspects, values):
+    """Balkendiagramm der Zukunftswerte (Schritt 5)"""
+    import pandas as pd
+    import plotly.express as px
+
+    df = pd.DataFrame({
+        'Aspekt': list(aspects),
+        'Wichtigkeit': list(values)
+    })
+
+    fig = px.bar(
+        df,
+        x='Wichtigkeit',
+        y='Aspekt',
+        orientation='h',
+        color='Wichtigkeit',
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+# Farben der Empfehlungen in der Reihenfolge von scoring.RECOMMENDATIONS
+DECISION_COLORS = ('rgb(118, 75, 162)', 'rgb(102, 126, 234)', 'rgb(195, 207, 226)')
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+@metrics.timed('zukunftsnavigator_diagramm_sekunden', diagramm='entscheidung')
+def decision_chart(surface, practical_axis, theoretical_axis, names, point):
+    """Entscheidungsfläche (Was-wäre-wenn): Empfehlung je praktischem × theoretischem Durchschnitt
+
+    surface[i][j] ist der Code für den praktischen Durchschnitt practical_axis[i]
+    und den theoretischen theoretical_axis[j]; point = (praktisch, theoretisch)
+    wird markiert.
+    """
+    import plotly.graph_objects as go
+
+    n = len(names)
+    colorscale = []
+    for code, color in enumerate(DECISION_COLORS[:n]):
+        colorscale += [(code / n, color), ((code + 1) / n, color)]
+
+    fig = go.Figure(go.Heatmap(
+        z=[list(row) for row in surface],
+        x=list(theoretical_axis),
+        y=list(practical_axis),
+        zmin=-0.5,
+        zmax=n - 0.5,
+        colorscale=colorscale,
+        showscale=False,
+        text=[[names[code] for code in row] for row in surface],
+        hovertemplate="Praktisch %{y:.2f} · Theoretisch %{x:.2f}<br>%{text}<extra></extra>",
+    ))
+    # Nur für die Legende
+    for name, color in zip(names, DECISION_COLORS):
+        fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', name=name,
+                                 marker=dict(size=12, symbol='square', color=color)))
+    fig.add_trace(go.Scatter(
+        x=[point[1]], y=[point[0]],
+        mode='markers+text', text=["Du"], textposition='top center', name="Du",
+        marker=dict(size=16, color='white', line=dict(width=3, color='black')),
+        showlegend=False,
+    ))
+    fig.update_layout(
+        xaxis_title="Theoretische Kompetenzen (Ø)",
+        yaxis_title="Praktische Kompetenzen (Ø)",
+        legend=dict(orientation='h', y=-0.2),
+        height=450
+    )
+    return fig
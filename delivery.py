@@ -0,0 +1,426 @@
+"""Zustellung abgeschlossener Ergebnisse an ein Schulverwaltungssystem (HTTP POST)
+
+Die Ergebnisseite reiht ein Ergebnis nur in eine Queue im Speicher ein.
+Ein Hintergrund-Thread mit eigener asyncio-Schleife schreibt es in einen
+Spool (SQLite, übersteht Neustarts) und schickt es von dort gebündelt an
+ZUKUNFTSNAVIGATOR_ZUSTELLUNG_URL:
+
+    POST <url>
+    {"ergebnisse": [{"id": "...", "daten": {result_data}}, ...]}
+
+Bis zu max_connections Bündel sind gleichzeitig unterwegs, jeweils über
+eine wiederverwendete Keep-Alive-Verbindung. Bei Netzwerkfehlern, 408, 429
+und 5xx wird das Bündel mit exponentiell wachsender Wartezeit (und
+Retry-After) erneut versucht; andere 4xx-Antworten gelten als endgültig
+fehlgeschlagen und bleiben zur Kontrolle im Spool
+(python delivery.py --erneut stellt sie wieder zu). Zugestellt wird
+mindestens einmal; der Empfänger erkennt Wiederholungen an der id.
+
+Mehrere App-Prozesse dürfen denselben Spool benutzen: wer ein Bündel
+abholt, setzt den nächsten Versuch als Sperre in die Zukunft. Alle
+SQLite-Zugriffe laufen in einem eigenen Spool-Thread, damit das Warten auf
+eine Sperre die laufenden Übertragungen nicht anhält. Fehler im Spool
+(gesperrt, Platte voll) werden protokolliert und später wiederholt; ist der
+Zustell-Thread trotzdem weg, schreibt submit() direkt in den Spool.
+
+Der HTTP-Client ist bewusst klein (asyncio-Streams, HTTP/1.1), damit keine
+zusätzlichen Pakete nötig sind.
+"""
+import argparse
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import ssl
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import metrics
+import store
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    result_id TEXT UNIQUE NOT NULL,
+    daten TEXT NOT NULL,
+    versuche INTEGER NOT NULL DEFAULT 0,
+    naechster_versuch REAL,  -- NULL: endgültig fehlgeschlagen
+    fehler TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_faellig ON outbox (naechster_versuch);
+"""
+
+BATCH_SIZE = 50
+MAX_CONNECTIONS = 4
+TIMEOUT = 10.0
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 300.0
+# Spätestens so oft in den Spool schauen (Einträge anderer Prozesse)
+POLL_INTERVAL = 5.0
+RETRY_STATUS = {408, 425, 429}
+
+_STOP = object()
+
+
+class DeliveryError(Exception):
+    """Fehlgeschlagener Versuch; retry=False bei Antworten, die sich durch Wiederholen nicht ändern"""
+
+    def __init__(self, message, retry=True, retry_after=None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+def backoff(attempts, base=BASE_BACKOFF, maximum=MAX_BACKOFF):
+    """Wartezeit vor dem nächsten Versuch: exponentiell, mit Zufallsanteil gegen gleichzeitige Wiederholungen"""
+    return min(maximum, base * 2 ** max(attempts - 1, 0)) * random.uniform(0.5, 1.0)
+
+
+class ConnectionPool:
+    """Keep-Alive-Verbindungen zu einem HTTP(S)-Endpunkt für die asyncio-Schleife des Zustell-Threads"""
+
+    def __init__(self, url, timeout=TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Ungültige Zustell-URL: {url}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self.host_header = parts.netloc.rpartition('@')[2]
+        self.timeout = timeout
+        self._idle = []
+        self.opened = 0
+
+    async def post(self, body, headers):
+        """Schickt body als POST; gibt (Status, Header, Antwort) zurück"""
+        request = [f"POST {self.target} HTTP/1.1", f"Host: {self.host_header}",
+                   f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        request += [f"{name}: {value}" for name, value in headers.items()]
+        raw = ('\r\n'.join(request) + '\r\n\r\n').encode('latin-1') + body
+        while self._idle:
+            # Eine wiederverwendete Verbindung kann vom Server inzwischen geschlossen worden sein
+            connection = self._idle.pop()
+            try:
+                return await asyncio.wait_for(self._exchange(connection, raw), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                continue
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+        self.opened += 1
+        return await asyncio.wait_for(self._exchange(connection, raw), self.timeout)
+
+    async def _exchange(self, connection, raw):
+        reader, writer = connection
+        try:
+            writer.write(raw)
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("Verbindung geschlossen")
+            version, status = status_line.split()[:2]
+            headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            status = int(status)
+            keep = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            if 100 <= status < 200 or status in (204, 304):
+                # Ohne Körper, auch ohne Content-Length (typisch: 204 auf einen POST)
+                data = b''
+            elif headers.get('transfer-encoding', '').lower() == 'chunked':
+                chunks = []
+                while size := int((await reader.readline()).split(b';')[0], 16):
+                    chunks.append(await reader.readexactly(size))
+                    await reader.readline()
+                while await reader.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                data = b''.join(chunks)
+            elif 'content-length' in headers:
+                data = await reader.readexactly(int(headers['content-length']))
+            elif not keep:
+                # Ende des Körpers = Ende der Verbindung; nur wenn der Server sie auch schliesst
+                data = await reader.read()
+            else:
+                # Keep-Alive ohne Länge: Körper nicht abgrenzbar, also nichts lesen und nicht wiederverwenden
+                data, keep = b'', False
+        except BaseException:
+            writer.close()
+            raise
+        if keep:
+            self._idle.append(connection)
+        else:
+            writer.close()
+        return status, headers, data
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class Delivery:
+    """Zustell-Queue mit Spool; submit() kehrt sofort zurück"""
+
+    def __init__(self, url, spool_path, token=None, batch_size=BATCH_SIZE, max_connections=MAX_CONNECTIONS,
+                 timeout=TIMEOUT, base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.pool = ConnectionPool(url, timeout)
+        self.url = url
+        self.spool_path = spool_path
+        self.token = token
+        self.batch_size = batch_size
+        self.max_connections = max_connections
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        # Sperre für ein abgeholtes Bündel; länger als ein Versuch dauern kann
+        self.lease = 3 * timeout
+        with store.connect(spool_path) as conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+        self._inbox = queue.Queue()
+        self._loop = None
+        self._wake = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="delivery", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        atexit.register(self.close)
+
+    def submit(self, result_id, result_data):
+        """Reiht ein Ergebnis zur Zustellung ein (result_data wird danach nicht mehr verändert)"""
+        self._inbox.put((result_id, result_data))
+        if self._thread.is_alive():
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+                return
+            except RuntimeError:
+                # Die Schleife ist eben zu Ende gegangen
+                pass
+        self._spool_directly()
+
+    def _spool_directly(self):
+        """Ohne Zustell-Thread: Eingereihtes direkt in den Spool, der nächste Start stellt es zu"""
+        logger.error("Zustell-Thread läuft nicht mehr; Ergebnisse werden nur in den Spool geschrieben")
+        try:
+            conn = store.connect(self.spool_path)
+            try:
+                self._drain(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.exception("Ergebnisse konnten nicht in den Spool %s geschrieben werden", self.spool_path)
+
+    def status(self):
+        """Anzahl Ergebnisse im Spool: noch zuzustellen und endgültig fehlgeschlagen"""
+        conn = store.connect(self.spool_path)
+        try:
+            waiting, failed = conn.execute(
+                "SELECT COUNT(naechster_versuch), COUNT(*) - COUNT(naechster_versuch) FROM outbox").fetchone()
+        finally:
+            conn.close()
+        return {'wartend': waiting + self._inbox.qsize(), 'fehlgeschlagen': failed}
+
+    def close(self):
+        """Hält die Zustellung an; nicht Zugestelltes bleibt im Spool für den nächsten Start"""
+        if self._thread.is_alive():
+            self._inbox.put(_STOP)
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass
+            self._thread.join()
+
+    # --- Zustell-Thread -------------------------------------------------
+
+    def _run(self):
+        self._spool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="delivery-spool")
+        try:
+            asyncio.run(self._main())
+        except Exception:
+            logger.exception("Zustell-Thread beendet")
+        finally:
+            self._spool.shutdown()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._ready.set()
+        self._conn = await self._loop.run_in_executor(self._spool, store.connect, self.spool_path)
+        try:
+            workers = [asyncio.create_task(self._worker()) for _ in range(self.max_connections)]
+            await asyncio.gather(*workers)
+            await self._db(self._drain)
+        finally:
+            self.pool.close()
+            await self._db(lambda conn: conn.close())
+
+    async def _db(self, fn, *args):
+        """Führt fn(conn, *args) im Spool-Thread aus"""
+        return await self._loop.run_in_executor(self._spool, fn, self._conn, *args)
+
+    async def _worker(self):
+        while not self._stopping:
+            try:
+                if await self._db(self._drain):
+                    self._stopping = True
+                    self._wake.set()
+                    break
+                batch = await self._db(self._claim)
+                if batch:
+                    await self._send(batch)
+                    continue
+                self._wake.clear()
+                idle = await self._db(self._idle_time)
+            except Exception:
+                # z.B. "database is locked" oder volle Platte: Eingereihtes bleibt in der Queue,
+                # abgeholte Bündel werden nach Ablauf ihrer Sperre wieder fällig
+                logger.exception("Fehler im Zustell-Spool, nächster Versuch in %.0f s", POLL_INTERVAL)
+                metrics.inc('zukunftsnavigator_zustellung_spoolfehler_total')
+                idle = POLL_INTERVAL
+            try:
+                await asyncio.wait_for(self._wake.wait(), idle)
+            except asyncio.TimeoutError:
+                pass
+
+    def _drain(self, conn):
+        """Übernimmt eingereihte Ergebnisse in den Spool (eine Transaktion); True, wenn close() gerufen wurde
+
+        Schlägt das Schreiben fehl, kommen die Ergebnisse zurück in die Queue.
+        """
+        items, stop = [], False
+        while True:
+            try:
+                item = self._inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+            else:
+                items.append(item)
+        if items:
+            now = time.time()
+            rows = [(result_id, json.dumps(data, ensure_ascii=False), now) for result_id, data in items]
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO outbox (result_id, daten, naechster_versuch) VALUES (?, ?, ?)", rows)
+            except BaseException:
+                for item in items + [_STOP] * stop:
+                    self._inbox.put(item)
+                raise
+        return stop
+
+    def _claim(self, conn):
+        """Holt ein fälliges Bündel ab und sperrt es für die Dauer des Versuchs"""
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                """SELECT id, result_id, daten, versuche FROM outbox
+                   WHERE naechster_versuch <= ? ORDER BY naechster_versuch, id LIMIT ?""",
+                (now, self.batch_size),
+            ).fetchall()
+            if rows:
+                conn.executemany("UPDATE outbox SET naechster_versuch = ? WHERE id = ?",
+                                 [(now + self.lease, row[0]) for row in rows])
+        return rows
+
+    def _idle_time(self, conn):
+        (due,) = conn.execute("SELECT MIN(naechster_versuch) FROM outbox").fetchone()
+        if due is None:
+            return POLL_INTERVAL
+        return min(max(due - time.time(), 0.01), POLL_INTERVAL)
+
+    async def _send(self, batch):
+        ids = [row[0] for row in batch]
+        body = ('{"ergebnisse":[' + ','.join(
+            f'{{"id":{json.dumps(result_id)},"daten":{daten}}}' for _, result_id, daten, _ in batch
+        ) + ']}').encode('utf-8')
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Idempotency-Key': hashlib.sha256(','.join(row[1] for row in batch).encode()).hexdigest(),
+        }
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        try:
+            status, response_headers, _ = await self.pool.post(body, headers)
+            if not 200 <= status < 300:
+                retry = status in RETRY_STATUS or status >= 500
+                raise DeliveryError(f"HTTP {status}", retry, _retry_after(response_headers))
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, DeliveryError) as exc:
+            error = exc if isinstance(exc, DeliveryError) else DeliveryError(str(exc) or type(exc).__name__)
+            metrics.observe('zukunftsnavigator_zustellung_sekunden', time.perf_counter() - start)
+            metrics.inc('zukunftsnavigator_zustellung_total', len(batch), ergebnis='fehler')
+            await self._db(self._failed, batch, error)
+            return
+        metrics.observe('zukunftsnavigator_zustellung_sekunden', time.perf_counter() - start)
+        await self._db(self._delivered, ids)
+        metrics.inc('zukunftsnavigator_zustellung_total', len(batch), ergebnis='ok')
+
+    def _delivered(self, conn, ids):
+        with conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def _failed(self, conn, batch, error):
+        attempts = max(row[3] for row in batch) + 1
+        if error.retry:
+            delay = max(backoff(attempts, self.base_backoff, self.max_backoff), error.retry_after or 0)
+            next_try = time.time() + delay
+            logger.warning("Zustellung von %d Ergebnissen fehlgeschlagen (%s), nächster Versuch in %.0f s",
+                           len(batch), error, delay)
+        else:
+            next_try = None
+            logger.error("Zustellung von %d Ergebnissen abgelehnt (%s)", len(batch), error)
+        with conn:
+            conn.executemany(
+                "UPDATE outbox SET versuche = versuche + 1, naechster_versuch = ?, fehler = ? WHERE id = ?",
+                [(next_try, str(error), row[0]) for row in batch],
+            )
+
+
+def _retry_after(headers):
+    try:
+        return float(headers.get('retry-after', ''))
+    except ValueError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zustell-Spool anzeigen und fehlgeschlagene Ergebnisse erneut zustellen")
+    parser.add_argument('--spool', default=os.environ.get('ZUKUNFTSNAVIGATOR_ZUSTELLUNG_SPOOL', 'zustellung.db'),
+                        help="Zustell-Spool (SQLite)")
+    parser.add_argument('--erneut', action='store_true',
+                        help="endgültig fehlgeschlagene Ergebnisse wieder zur Zustellung freigeben")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.spool):
+        parser.error(f"{args.spool} existiert nicht")
+
+    conn = store.connect(args.spool)
+    with conn:
+        if args.erneut:
+            count = conn.execute("UPDATE outbox SET naechster_versuch = ?, versuche = 0 "
+                                 "WHERE naechster_versuch IS NULL", (time.time(),)).rowcount
+            print(f"{count} Ergebnisse wieder freigegeben", file=sys.stderr)
+        for fehler, anzahl in conn.execute(
+                "SELECT COALESCE(fehler, '–'), COUNT(*) FROM outbox WHERE naechster_versuch IS NULL GROUP BY 1"):
+            print(f"fehlgeschlagen ({fehler}): {anzahl}")
+        (waiting,) = conn.execute("SELECT COUNT(*) FROM outbox WHERE naechster_versuch IS NOT NULL").fetchone()
+        print(f"wartend: {waiting}")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
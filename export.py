@@ -0,0 +1,301 @@
+"""Sammel-Export der Ergebnis-Ablage als CSV, Parquet oder ZIP mit einer JSON-Datei pro Person
+
+Die Ergebnisse werden blockweise aus der Ablage gelesen und sofort in die
+Ausgabedatei geschrieben; der Speicherbedarf hängt nur von der Blockgrösse
+ab, nicht von der Anzahl Ergebnisse. CSV und Parquet haben eine Zeile pro
+Ergebnis mit einer Spalte pro Frage, die JSON-Dateien im ZIP haben dasselbe
+Format wie „💾 Daten herunterladen“ (und lassen sich mit rescore.py neu
+bewerten).
+
+In der App laufen Exporte über Exporter in einem Hintergrund-Thread, die
+Seite fragt nur den Fortschritt ab. Dieselbe Funktion gibt es auf der
+Kommandozeile:
+    python export.py --db zukunftsnavigator.db -o schule.zip --schule "Sekundarschule Muster"
+"""
+import argparse
+import atexit
+import csv
+import importlib.util
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+import catalog
+import store
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+# Format → (Bezeichnung, Dateiendung, MIME-Typ)
+FORMATS = {
+    'csv': ("CSV", '.csv', 'text/csv'),
+    'parquet': ("Parquet", '.parquet', 'application/vnd.apache.parquet'),
+    'zip': ("ZIP mit einer JSON-Datei pro Person", '.zip', 'application/zip'),
+}
+
+
+def available_formats():
+    """Formate, die in dieser Installation möglich sind (Parquet braucht pyarrow)"""
+    return [key for key in FORMATS if key != 'parquet' or importlib.util.find_spec('pyarrow')]
+
+
+def columns(cat=None):
+    """Spalten von CSV und Parquet als (Name, Typ) mit Typ 'str', 'int' oder 'bool'"""
+    cat = cat or catalog.get()
+    cols = [('id', 'str'), ('erstellt', 'str'), ('datum', 'str'), ('name', 'str'), ('klasse', 'str'),
+            ('schule', 'str'), ('alter', 'int'), ('situation', 'str'), ('empfehlung', 'str')]
+    cols += [(f"komp_{key}", 'int') for key in cat.kompetenzen.ids]
+    cols += [(f"wert_{key}", 'int') for key in cat.zukunftswerte.ids]
+    cols += [(f"mot_{key}", 'bool') for key in cat.motivationen.ids]
+    cols += [(name, 'str') for name in ('weekend_choice', 'arbeitsumgebung', 'presentation_style',
+                                        'problem_solving', 'strength', 'development',
+                                        'staerken', 'entwicklungsfelder')]
+    return cols
+
+
+def flat_row(result_id, erstellt, data, cat):
+    """Ein Ergebnis als Zeile in der Reihenfolge von columns(); fehlende Werte sind None"""
+    kompetenzen = data.get('kompetenzen') or {}
+    werte = data.get('zukunftswerte') or {}
+    motivationen = set(data.get('motivationen') or ())
+    answered = 'motivationen' in data
+    row = [result_id, erstellt, data.get('datum'), data.get('name'), data.get('klasse'), data.get('schule'),
+           data.get('alter'), data.get('situation'), data.get('empfehlung')]
+    row += [kompetenzen.get(label) for label in cat.kompetenzen.labels]
+    row += [werte.get(label) for label in cat.zukunftswerte.labels]
+    row += [key in motivationen if answered else None for key in cat.motivationen.ids]
+    row += [data.get(name) for name in ('weekend_choice', 'arbeitsumgebung', 'presentation_style',
+                                        'problem_solving', 'strength', 'development')]
+    row += [json.dumps(data[name], ensure_ascii=False) if name in data else None
+            for name in ('staerken', 'entwicklungsfelder')]
+    return row
+
+
+def json_name(result_id, data):
+    """Dateiname im ZIP wie beim Einzel-Download, ergänzt um den Anfang der ID"""
+    name = re.sub(r'[^\w\-]+', '_', str(data.get('name') or 'ergebnis')).strip('_') or 'ergebnis'
+    datum = str(data.get('datum') or '')[:10].replace('-', '')
+    return '_'.join(part for part in ('zukunftsnavigator', name, datum, result_id[:8]) if part) + '.json'
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.cat = catalog.get()
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns(self.cat)])
+
+    def write(self, records):
+        self.writer.writerows(flat_row(*record, self.cat) for record in records)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Schreibt pro Block eine Row Group"""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.cat = catalog.get()
+        types = {'str': pa.string(), 'int': pa.int16(), 'bool': pa.bool_()}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns(self.cat)])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, records):
+        rows = [flat_row(*record, self.cat) for record in records]
+        arrays = [
+            self.pa.array([_coerce(v, f.type) for v in values], type=f.type)
+            for f, values in zip(self.schema, zip(*rows))
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _coerce(value, arrow_type):
+    """Werte aus alten oder von Hand bearbeiteten Ergebnissen an den Spaltentyp anpassen"""
+    if value is None:
+        return None
+    if str(arrow_type) == 'string':
+        return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    if str(arrow_type) == 'int16':
+        return value if isinstance(value, int) and not isinstance(value, bool) else None
+    return bool(value)
+
+
+class ZipSink:
+    """Eine JSON-Datei pro Ergebnis im Format des Einzel-Downloads"""
+
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, records):
+        for result_id, _, data in records:
+            self.archive.writestr(json_name(result_id, data), json.dumps(data, ensure_ascii=False, indent=2))
+
+    def close(self):
+        self.archive.close()
+
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink, 'zip': ZipSink}
+
+
+def export(records, fmt, path, chunk_size=CHUNK_SIZE, progress=None):
+    """Schreibt (id, erstellt, result_data)-Datensätze blockweise nach path; gibt die Anzahl zurück
+
+    progress(anzahl) wird nach jedem Block aufgerufen; löst es eine Ausnahme
+    aus (z.B. beim Abbrechen), bleibt keine halbe Datei liegen.
+    """
+    sink = SINKS[fmt](path)
+    count = 0
+    try:
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                sink.write(chunk)
+                count += len(chunk)
+                chunk = []
+                if progress:
+                    progress(count)
+        if chunk:
+            sink.write(chunk)
+            count += len(chunk)
+    except BaseException:
+        sink.close()
+        os.remove(path)
+        raise
+    sink.close()
+    return count
+
+
+class Cancelled(Exception):
+    pass
+
+
+@dataclass
+class ExportJob:
+    """Zustand eines Hintergrund-Exports, wird vom Export-Thread nachgeführt"""
+    format: str
+    schule: str = None
+    klasse: str = None
+    total: int = None  # erwartete Anzahl (aus den Rollups), None wenn unbekannt
+    path: str = None
+    done: int = 0
+    finished: bool = False
+    error: str = None
+    cancelled: bool = False
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def progress(self):
+        if self.finished:
+            return 1.0
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def file_name(self):
+        scope = '_'.join(part for part in (self.schule, self.klasse) if part) or 'alle'
+        scope = re.sub(r'[^\w\-]+', '_', scope).strip('_')
+        return f"zukunftsnavigator_{scope}_{time.strftime('%Y%m%d')}{FORMATS[self.format][1]}"
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Exporter:
+    """Startet Exporte in Hintergrund-Threads; höchstens max_running laufen gleichzeitig
+
+    Die Dateien liegen in einem eigenen temporären Verzeichnis; nur die
+    letzten keep bleiben erhalten, beim Beenden wird alles gelöscht.
+    """
+
+    def __init__(self, result_store, max_running=2, keep=20):
+        self.result_store = result_store
+        self.directory = tempfile.mkdtemp(prefix='zukunftsnavigator-export-')
+        self.keep = keep
+        self._slots = threading.BoundedSemaphore(max_running)
+        self._lock = threading.Lock()
+        self._jobs = []
+        atexit.register(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def start(self, fmt, schule=None, klasse=None, total=None):
+        if fmt not in available_formats():
+            raise ValueError(f"Format '{fmt}' ist nicht verfügbar")
+        fd, path = tempfile.mkstemp(suffix=FORMATS[fmt][1], dir=self.directory)
+        os.close(fd)
+        job = ExportJob(format=fmt, schule=schule, klasse=klasse, total=total, path=path)
+        with self._lock:
+            self._jobs.append(job)
+            stale, self._jobs = self._jobs[:-self.keep], self._jobs[-self.keep:]
+        for old in stale:
+            old.cancel()
+            if old.finished and os.path.exists(old.path):
+                os.remove(old.path)
+        threading.Thread(target=self._run, args=(job,), name="export", daemon=True).start()
+        return job
+
+    def _run(self, job):
+        def progress(count):
+            if job.cancelled:
+                raise Cancelled()
+            job.done = count
+
+        with self._slots:
+            try:
+                # Noch nicht geschriebene Ergebnisse sollen mit in den Export
+                self.result_store.flush()
+                records = self.result_store.iter_records(job.schule, job.klasse, chunk_size=CHUNK_SIZE)
+                job.done = export(records, job.format, job.path, progress=progress)
+            except Cancelled:
+                job.error = "abgebrochen"
+            except Exception as exc:
+                logger.exception("Export nach %s fehlgeschlagen", job.path)
+                job.error = str(exc) or type(exc).__name__
+            finally:
+                job.finished = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ergebnisse der Ablage gesammelt exportieren")
+    parser.add_argument('--db', default=os.environ.get('ZUKUNFTSNAVIGATOR_DB', 'zukunftsnavigator.db'),
+                        help="Ergebnis-Ablage (SQLite)")
+    parser.add_argument('-o', '--ausgabe', required=True, help="Ausgabedatei (.csv, .parquet oder .zip)")
+    parser.add_argument('--schule', help="nur diese Schule ('–' = ohne Angabe)")
+    parser.add_argument('--klasse', help="nur diese Klasse (zusammen mit --schule)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Ergebnisse pro Block")
+    args = parser.parse_args(argv)
+
+    fmt = next((key for key, (_, ext, _) in FORMATS.items() if args.ausgabe.endswith(ext)), None)
+    if fmt is None:
+        parser.error("Ausgabe muss auf .csv, .parquet oder .zip enden")
+    if fmt not in available_formats():
+        parser.error("Für Parquet-Ausgabe wird 'pyarrow' benötigt (pip install pyarrow)")
+    if args.klasse and not args.schule:
+        parser.error("--klasse braucht --schule")
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} existiert nicht")
+
+    result_store = store.ResultStore(args.db)
+    start = time.perf_counter()
+    count = export(result_store.iter_records(args.schule, args.klasse, args.chunk_size), fmt, args.ausgabe,
+                   args.chunk_size)
+    print(f"{count} Ergebnisse in {time.perf_counter() - start:.2f} s -> {args.ausgabe}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""Importiert abgetippte Papier-Fragebögen (CSV oder Excel) in die Ergebnis-Ablage
+
+Eine Zeile pro Person, eine Spalte pro Frage. Die Spaltennamen sind dieselben
+wie im Sammel-Export (export.py): name, klasse, alter, schule, situation,
+komp_<id>, mot_<id>, weekend_choice, arbeitsumgebung, wert_<id>,
+presentation_style, problem_solving, strength, development. Statt komp_<id>
+und wert_<id> geht auch der Text der Frage, für die Einzelauswahlen auch
+wochenende, umgebung, praesentation und problem.
+
+Geprüft wird wie in der App: Name, Reflexionen und alle Einzelauswahlen
+müssen ausgefüllt sein, Bewertungen sind ganze Zahlen 1–5, das Alter 13–18.
+Einzelauswahlen dürfen als ID, als Text (mit oder ohne Emoji) oder als
+Nummer der Option (1 = erste) angegeben sein, Motivationen als x/1/ja.
+Fehlerhafte Zeilen landen mit Zeilennummer und Grund in einer Fehlerdatei,
+der Import läuft weiter.
+
+Die Datei wird blockweise gelesen, bewertet (ein Batch-Durchgang pro Block,
+mit ZUKUNFTSNAVIGATOR_GEWICHTE über das gewichtete Modell) und pro Block in
+einer Transaktion gespeichert. Die ID eines Ergebnisses ergibt sich aus
+seinem Inhalt; ein zweiter Import derselben Datei legt also nichts doppelt an.
+Neue Ergebnisse werden auch in perzentile.json und den Nachbarn-Index
+eingetragen, sofern diese schon existieren.
+
+Beispiel:
+    python importer.py fragebogen_3a.xlsx --db zukunftsnavigator.db
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import catalog
+import percentiles
+import scoring
+import store
+import weights
+from answers import Answers
+
+CHUNK_SIZE = 5000
+MIN_AGE, MAX_AGE = 13, 18
+MIN_RATING, MAX_RATING = 1, 5
+# Namensraum der inhaltsabhängigen Ergebnis-IDs
+ID_NAMESPACE = uuid.UUID('6f1b7d4e-2c1a-4f0e-9d55-0b7e3c2a9f10')
+
+# Einzelauswahlen (Abschnitte des Katalogs) und übrige Felder aus answers.Answers
+_CHOICES = ('situation', 'weekend_choice', 'arbeitsumgebung', 'presentation_style', 'problem_solving')
+_FIELDS = ('name', 'klasse', 'alter', 'schule', *_CHOICES, 'strength', 'development')
+_CHOICE_ALIASES = {
+    'wochenende': 'weekend_choice',
+    'umgebung': 'arbeitsumgebung',
+    'praesentation': 'presentation_style',
+    'problem': 'problem_solving',
+}
+_RATINGS = {str(i): i for i in range(MIN_RATING, MAX_RATING + 1)}
+_TRUE = {'1', 'x', 'ja', 'j', 'true', 'wahr', 'yes'}
+_FALSE = {'', '0', 'nein', 'n', 'false', 'falsch', 'no'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _normalize(text):
+    """Vergleichsform von Spaltennamen und Antworten: ohne Emoji am Anfang, ohne Gross/klein"""
+    return re.sub(r'^[^\w]+', '', str(text).strip()).casefold()
+
+
+class Schema:
+    """Zuordnung der Spalten einer Datei zu den Fragen des Katalogs"""
+
+    def __init__(self, header, cat=None):
+        self.cat = cat = cat or catalog.get()
+        names = {name: name for name in _FIELDS}
+        names.update(_CHOICE_ALIASES)
+        for prefix, section in (('komp', cat.kompetenzen), ('wert', cat.zukunftswerte), ('mot', cat.motivationen)):
+            for key, label, _ in section:
+                names[f"{prefix}_{key}"] = (prefix, key)
+                names[_normalize(label)] = (prefix, key)
+        names = {_normalize(name): target for name, target in names.items()}
+
+        self.header = list(header)
+        self.columns = {}
+        for i, column in enumerate(self.header):
+            target = names.get(_normalize(column))
+            if target is not None and target not in self.columns:
+                self.columns[target] = i
+        required = [name for name in _FIELDS if name not in ('klasse', 'schule')]
+        required += [('komp', key) for key in cat.kompetenzen.ids]
+        required += [('wert', key) for key in cat.zukunftswerte.ids]
+        missing = [t if isinstance(t, str) else f"{t[0]}_{t[1]}" for t in required if t not in self.columns]
+        if missing:
+            raise ValueError(f"Es fehlen die Spalten: {', '.join(missing)}")
+
+        self.choices = {}
+        for field in _CHOICES:
+            section = getattr(cat, field)
+            lookup = {}
+            for i, (key, label, _) in enumerate(section):
+                lookup.update({_normalize(key): i, _normalize(label): i, str(i + 1): i})
+            self.choices[field] = lookup
+
+        self.width = len(self.header)
+        self._komp = [self.columns[('komp', key)] for key in cat.kompetenzen.ids]
+        self._werte = [self.columns[('wert', key)] for key in cat.zukunftswerte.ids]
+        self._mot = [self.columns.get(('mot', key)) for key in cat.motivationen.ids]
+
+    def _value(self, row, target):
+        i = self.columns.get(target)
+        return row[i].strip() if i is not None else ''
+
+    def _choice(self, row, field):
+        value = self._value(row, field)
+        lookup = self.choices[field]
+        position = lookup.get(value.casefold())
+        if position is None:
+            position = lookup.get(_normalize(value))
+        if position is None:
+            raise RowError(f"{field}: '{value}' ist keine der Optionen")
+        return position
+
+    def _ratings(self, row, positions, prefix, ids):
+        ratings = bytearray()
+        for i, key in zip(positions, ids):
+            value = row[i].strip()
+            number = _RATINGS.get(value)
+            if number is None:
+                number = _integer(value)
+                if number is None or not MIN_RATING <= number <= MAX_RATING:
+                    raise RowError(f"{prefix}_{key}: '{value}' ist keine ganze Zahl von {MIN_RATING} bis {MAX_RATING}")
+            ratings.append(number)
+        return bytes(ratings)
+
+    def answers(self, row):
+        """Antworten einer Zeile; RowError mit Grund, wenn sie in der App nicht möglich wären"""
+        cat = self.cat
+        if len(row) > self.width:
+            raise RowError(f"{len(row)} statt {self.width} Spalten")
+        if len(row) < self.width:
+            row = row + [''] * (self.width - len(row))
+        name = self._value(row, 'name')
+        if not name:
+            raise RowError("name fehlt")
+        alter = _integer(self._value(row, 'alter'))
+        if alter is None or not MIN_AGE <= alter <= MAX_AGE:
+            raise RowError(f"alter: '{self._value(row, 'alter')}' ist keine ganze Zahl von {MIN_AGE} bis {MAX_AGE}")
+        motivationen = 0
+        for bit, (i, key) in enumerate(zip(self._mot, cat.motivationen.ids)):
+            value = row[i].strip().casefold() if i is not None else ''
+            if value in _TRUE:
+                motivationen |= 1 << bit
+            elif value not in _FALSE:
+                raise RowError(f"mot_{key}: '{value}' ist weder ja noch nein")
+        strength, development = self._value(row, 'strength'), self._value(row, 'development')
+        if not strength or not development:
+            raise RowError("strength und development müssen ausgefüllt sein")
+        return Answers(
+            name=name,
+            klasse=self._value(row, 'klasse'),
+            alter=alter,
+            schule=self._value(row, 'schule'),
+            situation=self._choice(row, 'situation'),
+            kompetenzen=self._ratings(row, self._komp, 'komp', cat.kompetenzen.ids),
+            motivationen=motivationen,
+            weekend_choice=self._choice(row, 'weekend_choice'),
+            arbeitsumgebung=self._choice(row, 'arbeitsumgebung'),
+            zukunftswerte=self._ratings(row, self._werte, 'wert', cat.zukunftswerte.ids),
+            presentation_style=self._choice(row, 'presentation_style'),
+            problem_solving=self._choice(row, 'problem_solving'),
+            strength=strength,
+            development=development,
+        )
+
+
+def _integer(value):
+    """'3', '3.0' → 3; alles andere (auch 3.5, nan) → None"""
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def _cell(value):
+    """Excel-Zelle als Text wie in einer CSV (3.0 → '3')"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def read_rows(path, chunk_size=CHUNK_SIZE):
+    """Liefert (Kopfzeile, Blöcke von (Zeilennummer, Zeile als Liste von Texten)); liest nie die ganze Datei ein"""
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            import openpyxl
+        except ImportError:
+            sys.exit("Für Excel-Dateien wird 'openpyxl' benötigt (pip install openpyxl)")
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_cell(v) for v in next(rows, ())]
+
+        def chunks():
+            try:
+                chunk = []
+                for line, row in enumerate(rows, 2):
+                    if any(v is not None for v in row):
+                        chunk.append((line, [_cell(v) for v in row]))
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+            finally:
+                workbook.close()
+        return header, chunks()
+
+    # Aus Excel gespeicherte CSVs sind oft cp1252 statt UTF-8 und haben ';' als Trennzeichen
+    with open(path, 'rb') as f:
+        sample = f.read(1 << 16)
+    try:
+        sample.decode('utf-8')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError as exc:
+        encoding = 'utf-8-sig' if exc.start > len(sample) - 4 else 'cp1252'
+    first_line = sample.decode(encoding, 'replace').splitlines()[0] if sample else ''
+    sep = max(',;\t', key=first_line.count)
+    f = open(path, encoding=encoding, errors='replace', newline='')
+    reader = csv.reader(f, delimiter=sep)
+    header = next(reader, [])
+
+    def chunks():
+        with f:
+            chunk = []
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as exc:
+                    row = RowError(f"nicht lesbar: {exc}")
+                if row:
+                    chunk.append((reader.line_num, row))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+    return header, chunks()
+
+
+def result_id(answers):
+    """Inhaltsabhängige ID: dieselbe Zeile ergibt beim nächsten Import dieselbe ID"""
+    return uuid.uuid5(ID_NAMESPACE, repr(answers)).hex
+
+
+def score(answers_list):
+    """Empfehlung, Stärken und Entwicklungsfelder für einen Block über den Batch-Pfad"""
+    records = [a.to_dict() for a in answers_list]
+    scored = scoring.score_frame(scoring.frame_from_answers(answers_list))
+    model = weights.get()
+    if model is not None:
+        scored['empfehlung'] = model.recommend_batch(answers_list)
+    datum = datetime.now().isoformat()
+    return [
+        {**data, 'empfehlung': row.empfehlung, 'datum': datum, 'staerken': row.staerken,
+         'entwicklungsfelder': row.entwicklungsfelder, 'quelle': 'papier'}
+        for data, row in zip(records, scored.itertuples(index=False))
+    ]
+
+
+class ErrorFile:
+    """Fehlerhafte Zeilen unverändert, ergänzt um Zeilennummer und Grund; wird erst beim ersten Fehler angelegt"""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.file = self.writer = None
+        self.count = 0
+
+    def write(self, line, row, reason):
+        if self.writer is None:
+            self.file = open(self.path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(['zeile', 'fehler', *self.header])
+        self.writer.writerow([line, reason, *row])
+        self.count += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def run(path, result_store, errors_path, chunk_size=CHUNK_SIZE, histograms=None, profile_index=None):
+    """Importiert die Datei; gibt eine Zusammenfassung (Zeilen, neu, bereits vorhanden, Fehler) zurück"""
+    header, chunks = read_rows(path, chunk_size)
+    schema = Schema(header)
+    error_file = ErrorFile(errors_path, header)
+    summary = {'zeilen': 0, 'neu': 0, 'vorhanden': 0, 'fehler': 0}
+    try:
+        for chunk in chunks:
+            valid = []
+            for line, row in chunk:
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    valid.append(schema.answers(row))
+                except RowError as exc:
+                    error_file.write(line, row if isinstance(row, list) else [], str(exc))
+            summary['zeilen'] += len(chunk)
+            if not valid:
+                continue
+            results = score(valid)
+            ids = [result_id(a) for a in valid]
+            new = set(result_store.add_results(zip(ids, results)))
+            summary['neu'] += len(new)
+            summary['vorhanden'] += len(valid) - len(new)
+            # Doppelt erfasste Zeilen im selben Block haben dieselbe ID, zählen aber nur einmal
+            added, taken = [], set()
+            for rid, data, answers in zip(ids, results, valid):
+                if rid in new and rid not in taken:
+                    taken.add(rid)
+                    added.append((data, answers))
+            if histograms is not None and added:
+                # Ausserhalb der Sperre gezählt, dann ein einziges merge() pro Block
+                histograms.merge(histograms.count(data for data, _ in added))
+            if profile_index is not None and added:
+                profile_index.add_many(added)
+    finally:
+        error_file.close()
+        if histograms is not None:
+            histograms.checkpoint()
+    summary['fehler'] = error_file.count
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Papier-Fragebögen aus CSV oder Excel importieren")
+    parser.add_argument('datei', help="CSV- oder Excel-Datei (.xlsx), eine Zeile pro Person")
+    parser.add_argument('--db', default=os.environ.get('ZUKUNFTSNAVIGATOR_DB', 'zukunftsnavigator.db'),
+                        help="Ergebnis-Ablage (SQLite)")
+    parser.add_argument('--fehler', help="Datei für fehlerhafte Zeilen (Standard: <datei>.fehler.csv)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Zeilen pro Block")
+    parser.add_argument('--perzentile', default=os.environ.get('ZUKUNFTSNAVIGATOR_PERZENTILE', 'perzentile.json'),
+                        help="Perzentil-Histogramme, werden nachgeführt, falls vorhanden")
+    parser.add_argument('--nachbarn', default=os.environ.get('ZUKUNFTSNAVIGATOR_NACHBARN', 'nachbarn'),
+                        help="Nachbarn-Index, wird nachgeführt, falls vorhanden")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.datei):
+        parser.error(f"{args.datei} existiert nicht")
+    errors_path = args.fehler or f"{os.path.splitext(args.datei)[0]}.fehler.csv"
+
+    histograms = None
+    if os.path.exists(args.perzentile):
+        histograms = percentiles.RatingHistograms(args.perzentile)
+        histograms.load()
+    profile_index = None
+    if os.path.exists(os.path.join(args.nachbarn, 'profile.u8')):
+        import neighbours
+
+        profile_index = neighbours.ProfileIndex(args.nachbarn)
+
+    result_store = store.ResultStore(args.db)
+    start = time.perf_counter()
+    try:
+        summary = run(args.datei, result_store, errors_path, args.chunk_size, histograms, profile_index)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    finally:
+        result_store.close()
+    elapsed = time.perf_counter() - start
+    rate = summary['zeilen'] / elapsed if elapsed > 0 else 0.0
+    print(f"{summary['zeilen']} Zeilen in {elapsed:.2f} s ({rate:.0f} Zeilen/s): {summary['neu']} neu, "
+          f"{summary['vorhanden']} schon vorhanden, {summary['fehler']} fehlerhaft"
+          + (f" -> {errors_path}" if summary['fehler'] else ""), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
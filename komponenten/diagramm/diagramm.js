@@ -0,0 +1,119 @@
+// Leichte Diagramme des Zukunftsnavigators (Radar und Balken) als SVG.
+// Streamlit-Komponente nach dem Protokoll der Version 1: Der Server schickt pro
+// Rerun nur {art, labels, werte, max}; diese Datei lädt der Browser einmal und
+// hält sie im Cache.
+(function () {
+  'use strict';
+
+  var SVG = 'http://www.w3.org/2000/svg';
+  var WIDTH = 560;
+  var HEIGHT = 400;
+  var ACCENT = [102, 126, 234];
+  // Endpunkte der Farbskala 'Blues' wie im Plotly-Balkendiagramm
+  var BLUES = [[247, 251, 255], [8, 48, 107]];
+  var root = document.getElementById('diagramm');
+
+  function send(type, data) {
+    var message = {isStreamlitMessage: true, type: type};
+    for (var key in data) message[key] = data[key];
+    window.parent.postMessage(message, '*');
+  }
+
+  function node(name, attrs, parent, text) {
+    var element = document.createElementNS(SVG, name);
+    for (var key in attrs) element.setAttribute(key, attrs[key]);
+    if (text !== undefined) element.textContent = text;
+    parent.appendChild(element);
+    return element;
+  }
+
+  function rgb(c, alpha) {
+    return alpha === undefined ? 'rgb(' + c.join(',') + ')' : 'rgba(' + c.join(',') + ',' + alpha + ')';
+  }
+
+  function radar(svg, args, style) {
+    var n = args.labels.length;
+    var cx = WIDTH / 2, cy = HEIGHT / 2, radius = 140;
+    var angle = function (i) { return Math.PI / 2 - 2 * Math.PI * i / n; };
+    var point = function (i, value) {
+      var r = radius * value / args.max;
+      return [cx + r * Math.cos(angle(i)), cy - r * Math.sin(angle(i))];
+    };
+    for (var ring = 1; ring <= args.max; ring++) {
+      var corners = [];
+      for (var i = 0; i < n; i++) corners.push(point(i, ring).join(','));
+      node('polygon', {points: corners.join(' '), fill: 'none', stroke: style.grid}, svg);
+      node('text', {x: cx + 3, y: cy - radius * ring / args.max - 3, 'font-size': 10, fill: style.muted}, svg, ring);
+    }
+    for (var j = 0; j < n; j++) {
+      var end = point(j, args.max), label = point(j, args.max * 1.12);
+      var cos = Math.cos(angle(j));
+      node('line', {x1: cx, y1: cy, x2: end[0], y2: end[1], stroke: style.grid}, svg);
+      node('text', {
+        x: label[0], y: label[1], 'font-size': 13, fill: style.text, 'dominant-baseline': 'middle',
+        'text-anchor': Math.abs(cos) < 0.2 ? 'middle' : (cos > 0 ? 'start' : 'end')
+      }, svg, args.labels[j]);
+    }
+    var profile = [];
+    for (var k = 0; k < n; k++) profile.push(point(k, args.werte[k]).join(','));
+    node('polygon', {
+      points: profile.join(' '), fill: rgb(ACCENT, 0.5), stroke: rgb(ACCENT), 'stroke-width': 2
+    }, svg);
+    for (var m = 0; m < n; m++) {
+      var p = point(m, args.werte[m]);
+      var dot = node('circle', {cx: p[0], cy: p[1], r: 4, fill: rgb(ACCENT)}, svg);
+      node('title', {}, dot, args.labels[m] + ': ' + args.werte[m]);
+    }
+  }
+
+  function bars(svg, args, style) {
+    var n = args.labels.length;
+    var left = 210, right = WIDTH - 40, top = 10, row = (HEIGHT - 2 * top) / n;
+    for (var tick = 0; tick <= args.max; tick++) {
+      var x = left + (right - left) * tick / args.max;
+      node('line', {x1: x, y1: top, x2: x, y2: HEIGHT - top, stroke: style.grid}, svg);
+    }
+    for (var i = 0; i < n; i++) {
+      var value = args.werte[i], share = value / args.max;
+      var y = top + i * row;
+      var color = BLUES[0].map(function (low, c) { return Math.round(low + (BLUES[1][c] - low) * share); });
+      node('text', {
+        x: left - 10, y: y + row / 2, 'font-size': 13, fill: style.text,
+        'text-anchor': 'end', 'dominant-baseline': 'middle'
+      }, svg, args.labels[i]);
+      var bar = node('rect', {
+        x: left, y: y + row * 0.15, width: (right - left) * share, height: row * 0.7,
+        fill: rgb(color), stroke: style.grid
+      }, svg);
+      node('title', {}, bar, args.labels[i] + ': ' + value);
+      node('text', {
+        x: left + (right - left) * share + 6, y: y + row / 2, 'font-size': 12, fill: style.muted,
+        'dominant-baseline': 'middle'
+      }, svg, value);
+    }
+  }
+
+  var DRAW = {radar: radar, balken: bars};
+
+  window.addEventListener('message', function (event) {
+    if (!event.data || event.data.type !== 'streamlit:render') return;
+    var args = event.data.args;
+    var theme = event.data.theme || {};
+    var style = {
+      text: theme.textColor || '#31333f',
+      muted: theme.textColor ? rgb([128, 128, 128]) : '#808495',
+      grid: 'rgba(128, 128, 128, 0.3)'
+    };
+    root.textContent = '';
+    var svg = node('svg', {viewBox: '0 0 ' + WIDTH + ' ' + HEIGHT, role: 'img'}, root);
+    svg.style.fontFamily = theme.font || 'sans-serif';
+    DRAW[args.art](svg, args, style);
+    send('streamlit:setFrameHeight', {height: root.getBoundingClientRect().height});
+  });
+
+  window.addEventListener('resize', function () {
+    send('streamlit:setFrameHeight', {height: root.getBoundingClientRect().height});
+  });
+
+  send('streamlit:componentReady', {apiVersion: 1});
+})();
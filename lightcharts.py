@@ -0,0 +1,146 @@
+"""Leichte Diagramme für die Vorschau in Schritt 2 und 5 und ein Byte-Budget pro Rerun
+
+Jedes st.plotly_chart schickt bei jedem Rerun die ganze Plotly-Figur über
+den Websocket (rund 4 KB für 8 bzw. 6 Zahlen). Im leichten Modus
+(ZUKUNFTSNAVIGATOR_DIAGRAMME=leicht) zeichnet stattdessen eine kleine
+Komponente aus komponenten/diagramm/ das Radar und die Balken als SVG: Der
+Browser lädt ihr Skript einmal und hält es im Cache, pro Rerun gehen nur
+Beschriftungen und Werte über die Leitung (300 bis 400 Bytes).
+
+Mit ZUKUNFTSNAVIGATOR_BUDGET_KB=<n> bleibt Plotly der Standard, aber ein
+Diagramm, das das Budget des laufenden Reruns sprengen würde, wird leicht
+gezeichnet. Gezählt werden die Bytes der Diagramme; ein Rerun ist ein
+measure()-Block (der Schritt in main oder ein Fragment für sich). Die Zahlen
+landen in metrics.
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+
+import charts
+import metrics
+
+PLOTLY = 'plotly'
+LEICHT = 'leicht'
+MODE = os.environ.get('ZUKUNFTSNAVIGATOR_DIAGRAMME', PLOTLY).strip().lower()
+# Budget pro Rerun in Bytes (0 = keins)
+BUDGET = int(float(os.environ.get('ZUKUNFTSNAVIGATOR_BUDGET_KB') or 0) * 1024)
+COMPONENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'komponenten', 'diagramm')
+# Höchste Bewertung (Skala der Achsen)
+MAX = 5
+
+_BUILDERS = {'radar': charts.radar_chart, 'balken': charts.priority_chart}
+_NULL = contextlib.nullcontext()
+_local = threading.local()
+
+
+def radar(categories, values):
+    """Radar der Kompetenzen (Schritt 2); gibt die gesendeten Bytes zurück"""
+    return show('radar', categories, values)
+
+
+def priorities(aspects, values):
+    """Balken der Zukunftswerte (Schritt 5); gibt die gesendeten Bytes zurück"""
+    return show('balken', aspects, values)
+
+
+def show(art, labels, values):
+    """Zeichnet das Diagramm im eingestellten Modus; Plotly nur, solange es ins Budget passt"""
+    import streamlit as st
+
+    values = tuple(values)
+    if MODE != LEICHT:
+        size = plotly_bytes(art, labels, values) if BUDGET or metrics.ENABLED else 0
+        if not BUDGET or spent() + size <= BUDGET:
+            st.plotly_chart(_BUILDERS[art](labels, values), use_container_width=True)
+            _add(art, PLOTLY, size)
+            return size
+        metrics.inc('zukunftsnavigator_diagramm_ersetzt_total', diagramm=art)
+
+    # Fester Schlüssel: Das iframe bleibt über Reruns stehen und bekommt nur neue Werte
+    args = {'art': art, 'labels': list(labels), 'werte': list(values), 'max': MAX,
+            'key': f"diagramm_{art}", 'default': None}
+    _component()(**args)
+    # So serialisiert Streamlit die Argumente der Komponente
+    size = len(json.dumps(args))
+    _add(art, LEICHT, size)
+    return size
+
+
+@functools.lru_cache(maxsize=charts.CACHE_SIZE)
+def plotly_bytes(art, labels, values):
+    """Grösse der Figur, wie st.plotly_chart sie verschickt (einmal pro Bewertungs-Tupel)"""
+    import plotly.io as pio
+
+    return len(pio.to_json(_BUILDERS[art](labels, values), validate=False).encode('utf-8'))
+
+
+@functools.cache
+def _component():
+    import streamlit.components.v1 as components
+
+    return components.declare_component('diagramm', path=COMPONENT_PATH)
+
+
+def measure(**labels):
+    """Kontext für einen Rerun (Schritt oder Fragment): zählt seine Diagramm-Bytes
+
+    Verschachtelt (ein Fragment im vollen Rerun) zählen die Bytes auch für den
+    äusseren Block, und das Budget gilt für den äussersten.
+    """
+    if not BUDGET and not metrics.ENABLED:
+        return _NULL
+    return _Measure(labels)
+
+
+def measured(**labels):
+    """Dekorator wie measure(); ohne Budget und Metriken bleibt die Funktion unverändert"""
+    def decorate(fn):
+        if not BUDGET and not metrics.ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Measure(labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def spent():
+    """Bytes des laufenden Reruns bisher (0 ausserhalb von measure())"""
+    stack = getattr(_local, 'stack', None)
+    return stack[0] if stack else 0
+
+
+class _Measure:
+    __slots__ = ('labels',)
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def __enter__(self):
+        if not hasattr(_local, 'stack'):
+            _local.stack = []
+        _local.stack.append(0)
+        return self
+
+    def __exit__(self, *exc):
+        # Auch st.rerun() und st.stop() (Ausnahmen) beenden einen gezählten Rerun
+        size = _local.stack.pop()
+        metrics.inc('zukunftsnavigator_rerun_bytes_total', size, **self.labels)
+        metrics.inc('zukunftsnavigator_gezaehlte_reruns_total', **self.labels)
+        if BUDGET and size > BUDGET:
+            metrics.inc('zukunftsnavigator_budget_ueberschritten_total', **self.labels)
+        return False
+
+
+def _add(art, mode, size):
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        for i in range(len(stack)):
+            stack[i] += size
+    metrics.inc('zukunftsnavigator_diagramm_bytes_total', size, diagramm=art, modus=mode)
+    metrics.inc('zukunftsnavigator_diagramme_total', diagramm=art, modus=mode)
@@ -0,0 +1,235 @@
+"""Laufzeit-Metriken der App: Zähler, Momentwerte und Latenz-Histogramme im Prometheus-Textformat
+
+Eingeschaltet wird die Messung mit ZUKUNFTSNAVIGATOR_METRIKEN=1 oder durch
+einen Port in ZUKUNFTSNAVIGATOR_METRIKEN_PORT; dann liefert
+http://127.0.0.1:<port>/metrics die Werte. Ist zusätzlich auf dem Server
+ZUKUNFTSNAVIGATOR_DEBUG=1 gesetzt, zeigt das Debug-Panel der Seitenleiste
+(?debug=1 in der URL) dieselben Zahlen; ohne die Variable bleibt es für alle
+Besucher verborgen.
+
+Ohne die Variablen kosten die Messpunkte praktisch nichts: timed() gibt die
+Funktion unverändert zurück, timer() einen geteilten leeren Kontext.
+
+Beispiel:
+    @metrics.timed('zukunftsnavigator_diagramm_sekunden', diagramm='radar')
+    def radar_chart(...): ...
+
+    with metrics.timer('zukunftsnavigator_abschnitt_sekunden', abschnitt='css'):
+        st.markdown(...)
+"""
+import bisect
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PORT = int(os.environ.get('ZUKUNFTSNAVIGATOR_METRIKEN_PORT') or 0)
+ENABLED = bool(PORT) or os.environ.get('ZUKUNFTSNAVIGATOR_METRIKEN', '').lower() in ('1', 'ja', 'true')
+# Debug-Panel in der Seitenleiste nur, wenn der Server es erlaubt (nicht allein per URL)
+PANEL = os.environ.get('ZUKUNFTSNAVIGATOR_DEBUG', '').lower() in ('1', 'ja', 'true')
+# Obergrenzen der Histogramm-Klassen in Sekunden (Prometheus-Standard, unten feiner für Teile eines
+# Reruns, oben länger für Wartezeiten)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+           30.0, 60.0, 120.0)
+
+_NULL = contextlib.nullcontext()
+
+
+class Registry:
+    """Zähler, Momentwerte und Histogramme eines Prozesses; Schlüssel ist (Metrik, sortierte Labels)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}  # Schlüssel → [Anzahl pro Klasse (+ Überlauf), Summe]
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][slot] += 1
+            histogram[1] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            # Momentwerte bleiben, sie werden nur bei Änderungen neu gesetzt
+
+    def render(self):
+        """Alle Werte im Prometheus-Textformat (Version 0.0.4)"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+        lines = []
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (counts, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip((*self.buckets, '+Inf'), counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """Zeilen für das Debug-Panel: Metrik, Labels, Anzahl, Mittelwert und p50/p95 in ms"""
+        with self._lock:
+            counters = dict(self._counters)
+            counters.update(self._gauges)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+        rows = []
+        for (name, labels), value in sorted(counters.items()):
+            rows.append({"Metrik": name, "Labels": _plain(labels), "Anzahl": value,
+                         "Mittel ms": None, "p50 ms": None, "p95 ms": None})
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            count = sum(counts)
+            rows.append({
+                "Metrik": name, "Labels": _plain(labels), "Anzahl": count,
+                "Mittel ms": round(total / count * 1000, 2) if count else None,
+                "p50 ms": round(self._quantile(counts, 0.5) * 1000, 2),
+                "p95 ms": round(self._quantile(counts, 0.95) * 1000, 2),
+            })
+        return rows
+
+    def _quantile(self, counts, q):
+        """Schätzung aus den Klassen, linear innerhalb der Klasse; im Überlauf die oberste Grenze"""
+        target = q * sum(counts)
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= target:
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _plain(labels):
+    return ', '.join(f"{key}={value}" for key, value in labels)
+
+
+REGISTRY = Registry()
+
+
+def inc(name, amount=1, **labels):
+    if ENABLED:
+        REGISTRY.inc(name, amount, **labels)
+
+
+def set_gauge(name, value, **labels):
+    if ENABLED:
+        REGISTRY.set_gauge(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    if ENABLED:
+        REGISTRY.observe(name, seconds, **labels)
+
+
+class _Timer:
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # Auch st.rerun() und st.stop() (Ausnahmen) zählen als gemessener Durchlauf
+        REGISTRY.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def timer(name, **labels):
+    """Kontext, der seine Dauer ins Histogramm name einträgt (ausgeschaltet: nichts)"""
+    return _Timer(name, labels) if ENABLED else _NULL
+
+
+def timed(name, **labels):
+    """Dekorator wie timer(); ausgeschaltet bleibt die Funktion unverändert"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(name, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def serve(port=PORT, host='127.0.0.1'):
+    """Startet den Metrik-Endpunkt in einem Hintergrund-Thread; gibt den Server zurück (None ohne Port)"""
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError:
+        # Mehrere App-Prozesse auf demselben Port: nur der erste bekommt ihn
+        logger.warning("Metrik-Endpunkt %s:%d ist schon belegt", host, port)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info("Metriken unter http://%s:%d/metrics", host, server.server_port)
+    return server
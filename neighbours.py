@@ -0,0 +1,310 @@
+"""„Jugendliche wie du“: Nächste-Nachbarn-Suche über die Antwortprofile aller Ergebnisse
+
+Ein Profil ist ein kleiner uint8-Vektor: Kompetenzen und Werte (1–5, 0 = fehlt),
+Motivationen als 0/1 und die Arbeitsumgebung one-hot, direkt dahinter der
+Code der Empfehlung; jede Zeile ist WIDTH Bytes breit.
+
+Die Profile liegen in zwei Dateien, die als np.memmap geöffnet werden und so
+im Page-Cache des Betriebssystems statt im Heap jedes Workers liegen:
+
+- profile.u8: Zellgrenzen (int64) als Kopf, danach die Profile nach Zelle sortiert
+- neu.u8: seit dem letzten Verdichten angehängte Profile, unsortiert
+
+Beide werden nur durch os.replace ersetzt, nie gekürzt; bestehende
+Abbildungen in anderen Workern bleiben so gültig.
+
+Eine Zelle fasst Profile mit gleicher Summe der praktischen und der
+theoretischen Kompetenzen und gleicher Umgebung zusammen. Daraus folgt eine
+untere Schranke für den Abstand zu allen Profilen der Zelle. Gesucht wird
+Zelle für Zelle nach aufsteigender Schranke, bis keine Zelle mehr näher
+liegen kann (exakt) oder das Kandidatenbudget aufgebraucht ist (approximativ).
+"""
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: ohne Dateisperre
+    fcntl = None
+
+import numpy as np
+
+import catalog
+import scoring
+from answers import Answers
+
+logger = logging.getLogger(__name__)
+
+# Code 0 = keine Empfehlung gespeichert
+RECOMMENDATIONS = ('', *scoring.EMPFEHLUNGEN)
+K = 25
+BUDGET = 50_000
+WIDTH = 32
+# Ab so vielen neuen Profilen wird neu.u8 in profile.u8 einsortiert
+COMPACT_AFTER = 20_000
+_MAX_RATING = 5
+
+
+class Layout:
+    """Spaltenpositionen im Profilvektor, abgeleitet aus dem Katalog"""
+
+    def __init__(self, cat):
+        self.kompetenzen = len(cat.kompetenzen)
+        self.werte = len(cat.zukunftswerte)
+        self.motivationen = len(cat.motivationen)
+        self.umgebungen = len(cat.arbeitsumgebung)
+        self.dims = self.kompetenzen + self.werte + self.motivationen + self.umgebungen
+        if self.dims >= WIDTH:
+            raise ValueError(f"Profil mit {self.dims} Werten passt nicht in {WIDTH} Bytes")
+        self.env_start = self.dims - self.umgebungen
+        self.practical = [cat.kompetenzen.position[key] for key in scoring.PRACTICAL_COMPETENCIES]
+        self.theoretical = [cat.kompetenzen.position[key] for key in scoring.THEORETICAL_COMPETENCIES]
+        self.sum_levels = (len(self.practical) * _MAX_RATING + 1, len(self.theoretical) * _MAX_RATING + 1)
+        # Umgebung: 0 = keine, 1.. = Position + 1
+        self.cells = self.sum_levels[0] * self.sum_levels[1] * (self.umgebungen + 1)
+        p, t, e = np.meshgrid(
+            np.arange(self.sum_levels[0]), np.arange(self.sum_levels[1]), np.arange(self.umgebungen + 1),
+            indexing='ij',
+        )
+        self._cell_p, self._cell_t, self._cell_e = p.ravel(), t.ravel(), e.ravel()
+
+    def vector(self, answers, empfehlung=''):
+        row = np.zeros(WIDTH, dtype=np.uint8)
+        k, w, m = self.kompetenzen, self.werte, self.motivationen
+        row[:len(answers.kompetenzen[:k])] = np.frombuffer(answers.kompetenzen[:k], dtype=np.uint8)
+        row[k:k + len(answers.zukunftswerte[:w])] = np.frombuffer(answers.zukunftswerte[:w], dtype=np.uint8)
+        row[k + w:k + w + m] = [answers.motivationen >> i & 1 for i in range(m)]
+        if answers.arbeitsumgebung >= 0:
+            row[self.env_start + answers.arbeitsumgebung] = 1
+        row[self.dims] = RECOMMENDATIONS.index(empfehlung) if empfehlung in RECOMMENDATIONS else 0
+        return row
+
+    def cell(self, rows):
+        """Zellnummer je Zeile"""
+        rows = np.atleast_2d(rows)
+        p = rows[:, self.practical].sum(axis=1, dtype=np.int64)
+        t = rows[:, self.theoretical].sum(axis=1, dtype=np.int64)
+        env = rows[:, self.env_start:self.dims]
+        e = np.where(env.any(axis=1), env.argmax(axis=1) + 1, 0)
+        return (p * self.sum_levels[1] + t) * (self.umgebungen + 1) + e
+
+    def lower_bounds(self, row):
+        """Quadrierte Mindestabstände von row zu jeder Zelle
+
+        Die Summe über n Kompetenzen ist eine Projektion auf (1, …, 1)/√n; der
+        Abstand ist also mindestens Δsumme²/n. Eine andere Umgebung kostet 2
+        (beide gesetzt) bzw. 1 (eine fehlt).
+        """
+        cell = int(self.cell(row)[0])
+        e = cell % (self.umgebungen + 1)
+        t = cell // (self.umgebungen + 1) % self.sum_levels[1]
+        p = cell // (self.umgebungen + 1) // self.sum_levels[1]
+        env = np.where(self._cell_e == e, 0, np.where((self._cell_e == 0) | (e == 0), 1, 2))
+        return (
+            (self._cell_p - p) ** 2 / len(self.practical)
+            + (self._cell_t - t) ** 2 / len(self.theoretical)
+            + env
+        )
+
+
+def _open(path, offset=0):
+    """Nur lesende Abbildung einer Profildatei ab offset; None, wenn sie leer ist"""
+    try:
+        rows = (os.path.getsize(path) - offset) // WIDTH
+    except FileNotFoundError:
+        return None
+    if rows <= 0:
+        return None
+    # Als einfaches ndarray weiterreichen; memmap-Slices sind pro Zelle spürbar teurer
+    return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(rows, WIDTH)).view(np.ndarray)
+
+
+def _replace(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ProfileIndex:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.layout = Layout(catalog.get())
+        self._main_path = os.path.join(directory, 'profile.u8')
+        self._header = (self.layout.cells + 1) * 8
+        self._tail_path = os.path.join(directory, 'neu.u8')
+        self._lock = threading.Lock()
+        self._main = self._bounds = self._tail = None
+        self._main_stamp = self._tail_stamp = None
+        self._compacting = False
+
+    def exists(self):
+        return os.path.exists(self._main_path)
+
+    def __len__(self):
+        main, _, tail = self._refresh()
+        return sum(len(part) for part in (main, tail) if part is not None)
+
+    def add(self, result_data, answers=None):
+        """Hängt das Profil eines Ergebnisses an neu.u8 an"""
+        self.add_many([(result_data, answers)])
+
+    def add_many(self, items):
+        """Wie add() für viele (result_data, answers) mit einem einzigen Schreibzugriff"""
+        rows = b''.join(
+            self.layout.vector(Answers.from_dict(data) if answers is None else answers,
+                               data.get('empfehlung', '')).tobytes()
+            for data, answers in items
+        )
+        with self._file_lock():
+            with open(self._tail_path, 'ab') as f:
+                f.write(rows)
+        if os.path.getsize(self._tail_path) >= COMPACT_AFTER * WIDTH and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, name="profile-compact", daemon=True).start()
+
+    def build(self, results):
+        """Erstbefüllung aus gespeicherten Ergebnissen; nichts zu tun, wenn ein anderer Worker schneller war"""
+        rows = [self.layout.vector(Answers.from_dict(data), data.get('empfehlung', '')) for data in results]
+        with self._file_lock():
+            if not self.exists():
+                self._replace_rows(np.array(rows, dtype=np.uint8).reshape(-1, WIDTH))
+
+    def replace(self, rows):
+        """Ersetzt den ganzen Index durch rows (uint8, WIDTH Spalten wie Layout.vector)"""
+        with self._file_lock():
+            self._replace_rows(rows)
+
+    def compact(self):
+        """Sortiert neu.u8 in profile.u8 ein"""
+        try:
+            with self._file_lock():
+                parts = [_open(self._main_path, self._header), _open(self._tail_path)]
+                rows = np.concatenate([np.asarray(p) for p in parts if p is not None] or [np.zeros((0, WIDTH), np.uint8)])
+                self._replace_rows(rows)
+            logger.info("Profilindex verdichtet: %d Profile", len(rows))
+        except OSError:
+            logger.exception("Verdichten des Profilindex fehlgeschlagen")
+        finally:
+            self._compacting = False
+
+    def _replace_rows(self, rows):
+        cells = self.layout.cell(rows) if len(rows) else np.zeros(0, np.int64)
+        order = np.argsort(cells, kind='stable')
+        bounds = np.searchsorted(cells[order], np.arange(self.layout.cells + 1)).astype(np.int64)
+        _replace(self._main_path, bounds.tobytes() + rows[order].tobytes())
+        _replace(self._tail_path, b'')
+
+    def _file_lock(self):
+        return _FileLock(os.path.join(self.directory, '.lock'))
+
+    def _refresh(self):
+        """Bildet die Dateien neu ab, wenn sie verdichtet wurden oder gewachsen sind
+
+        Gibt (profile, zellgrenzen, neu) als zusammengehörigen Stand zurück.
+        Hat sich etwas geändert, wird unter der Dateisperre neu abgebildet:
+        Verdichten ersetzt erst profile.u8 und dann neu.u8, dazwischen stünden
+        die verdichteten Zeilen sonst doppelt im Stand.
+        """
+        with self._lock:
+            main_stamp, tail_stamp = self._stamps()
+            if main_stamp is None:
+                return None, None, None
+            if main_stamp != self._main_stamp or tail_stamp != self._tail_stamp:
+                with self._file_lock():
+                    main_stamp, tail_stamp = self._stamps()
+                    if main_stamp is None:
+                        return None, None, None
+                    if main_stamp != self._main_stamp:
+                        self._bounds = np.fromfile(self._main_path, dtype=np.int64, count=self.layout.cells + 1)
+                        self._main = _open(self._main_path, self._header)
+                        self._main_stamp = main_stamp
+                    if tail_stamp != self._tail_stamp:
+                        self._tail = _open(self._tail_path)
+                        self._tail_stamp = tail_stamp
+            return self._main, self._bounds, self._tail
+
+    def _stamps(self):
+        """(Inode, mtime) von profile.u8 und (Inode, Grösse) von neu.u8; None für fehlende Dateien"""
+        try:
+            stat = os.stat(self._main_path)
+            main = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            main = None
+        try:
+            stat = os.stat(self._tail_path)
+            tail = (stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            tail = None
+        return main, tail
+
+    def query(self, q, k=K, budget=BUDGET):
+        """Abstände und Empfehlungscodes der k ähnlichsten Profile zum Vektor q, nach Abstand sortiert"""
+        main, bounds, tail = self._refresh()
+        qf = q[:self.layout.dims].astype(np.float32)
+        dims = self.layout.dims
+
+        best_d = np.full(k, np.inf, dtype=np.float32)
+        best_c = np.zeros(k, dtype=np.uint8)
+
+        def scan(rows):
+            nonlocal best_d, best_c
+            diff = rows[:, :dims].astype(np.float32)
+            diff -= qf
+            d = np.einsum('ij,ij->i', diff, diff)
+            d = np.concatenate([best_d, d])
+            codes = np.concatenate([best_c, rows[:, dims]])
+            top = np.argpartition(d, k - 1)[:k] if len(d) > k else np.arange(len(d))
+            best_d, best_c = d[top], codes[top]
+
+        if tail is not None:
+            scan(tail)
+        if main is not None:
+            lower = self.layout.lower_bounds(q)
+            scanned = 0
+            for cell in np.argsort(lower, kind='stable'):
+                if lower[cell] > best_d.max() or scanned >= budget:
+                    break
+                start, stop = bounds[cell], bounds[cell + 1]
+                if start < stop:
+                    scan(main[start:stop])
+                    scanned += stop - start
+
+        order = np.argsort(best_d, kind='stable')
+        found = np.isfinite(best_d[order])
+        return best_d[order][found], best_c[order][found]
+
+    def similar(self, answers, empfehlung=None, k=K):
+        """Anzahl je Empfehlung unter den k ähnlichsten Profilen
+
+        Mit empfehlung wird ein Treffer mit Abstand 0 und dieser Empfehlung als
+        das eigene, bereits eingetragene Profil verworfen.
+        """
+        distances, codes = self.query(self.layout.vector(answers), k + (empfehlung is not None))
+        codes = list(codes)
+        if empfehlung is not None:
+            own = RECOMMENDATIONS.index(empfehlung)
+            for i, (d, code) in enumerate(zip(distances, codes)):
+                if d == 0 and code == own:
+                    del codes[i]
+                    break
+            codes = codes[:k]
+        return {name: codes.count(code) for code, name in enumerate(RECOMMENDATIONS) if name}
+
+
+class _FileLock:
+    """Exklusive Sperre über Prozesse hinweg (fcntl), damit Anhängen und Verdichten sich nicht kreuzen"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._file = open(self.path, 'w')
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
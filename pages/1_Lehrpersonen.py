@@ -0,0 +1,184 @@
+"""Lehrpersonen-Ansicht: Empfehlungen, Kompetenzen und Werte nach Schule, Klasse und Alter
+
+Liest ausschliesslich die Rollups der Ergebnis-Ablage; die Ladezeit hängt
+nur von der Anzahl Gruppen ab, nicht von der Anzahl gespeicherter Ergebnisse.
+Nur der Sammel-Export geht durch alle Ergebnisse einer Gruppe, und zwar in
+einem Hintergrund-Thread (export.py).
+
+Gruppen mit weniger als percentiles.MIN_GROUP_SIZE Ergebnissen zeigen nur
+ihre Anzahl: Bei einem oder zwei Tests wären Durchschnitte und Anteile die
+Antworten einzelner Schülerinnen und Schüler.
+"""
+import functools
+import hmac
+import os
+
+import streamlit as st
+
+import catalog
+import charts
+import export
+import percentiles
+import resources
+import scoring
+
+st.set_page_config(
+    page_title="📊 Klassenübersicht",
+    page_icon="📊",
+    layout="wide"
+)
+
+DIMENSIONEN = {"Gesamt": 'gesamt', "Schule": 'schule', "Klasse": 'klasse', "Alter": 'alter'}
+PASSWORD_VARIABLE = 'ZUKUNFTSNAVIGATOR_LEHRER_PASSWORT'
+
+
+def check_password():
+    """Fragt das Passwort aus ZUKUNFTSNAVIGATOR_LEHRER_PASSWORT ab (ohne Variable ist die Seite offen)"""
+    expected = os.environ.get(PASSWORD_VARIABLE)
+    if not expected or st.session_state.get('lehrer_ok'):
+        return True
+    password = st.text_input("🔒 Passwort für Lehrpersonen:", type="password")
+    if password and hmac.compare_digest(password, expected):
+        st.session_state.lehrer_ok = True
+        st.rerun()
+    elif password:
+        st.error("Falsches Passwort")
+    return False
+
+
+def averages(metrics, prefix, section):
+    """Durchschnitt je Frage eines Abschnitts; 0 für Fragen ohne Antworten"""
+    result = []
+    for question_id in section.ids:
+        anzahl, summe = metrics.get(f"{prefix}:{question_id}", (0, 0.0))
+        result.append(round(summe / anzahl, 2) if anzahl else 0)
+    return tuple(result)
+
+
+def count(metrics):
+    return metrics.get('ergebnisse', (0, 0))[0]
+
+
+def too_small(metrics):
+    """Zu wenige Ergebnisse, um die Gruppe ohne Rückschluss auf Einzelne zu zeigen"""
+    return count(metrics) < percentiles.MIN_GROUP_SIZE
+
+
+def share(metrics, empfehlung):
+    total = metrics.get('ergebnisse', (0, 0))[0]
+    return metrics.get(f"empfehlung:{empfehlung}", (0, 0))[0] / total if total else 0.0
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def export_panel():
+    """Export einer Schule, Klasse oder aller Ergebnisse; die Auswahl kommt aus den Rollups"""
+    st.markdown("### 📦 Ergebnisse exportieren")
+    result_store = resources.get_result_store()
+    schulen = result_store.rollup('schule')
+    col1, col2, col3 = st.columns(3)
+    schule = col1.selectbox("Schule:", ["Alle", *sorted(schulen)], key='export_schule')
+    schule = None if schule == "Alle" else schule
+    klasse = None
+    total = result_store.rollup('gesamt').get('alle', {}).get('ergebnisse', (0, 0))[0]
+    if schule is not None:
+        prefix = f"{schule} / "
+        klassen = {name[len(prefix):]: metrics for name, metrics in result_store.rollup('klasse').items()
+                   if name.startswith(prefix)}
+        klasse = col2.selectbox("Klasse:", ["Alle", *sorted(klassen)], key='export_klasse')
+        klasse = None if klasse == "Alle" else klasse
+        metrics = klassen[klasse] if klasse is not None else schulen[schule]
+        total = metrics.get('ergebnisse', (0, 0))[0]
+    fmt = col3.selectbox("Format:", export.available_formats(), format_func=lambda key: export.FORMATS[key][0],
+                         key='export_format')
+
+    job = st.session_state.get('export_job')
+    if job is not None and not job.finished:
+        export_progress(job)
+        return
+    if job is not None:
+        if job.error:
+            st.error(f"Export fehlgeschlagen: {job.error}")
+        elif os.path.exists(job.path):
+            st.success(f"✅ {job.done} Ergebnisse exportiert")
+            # Die Datei wird erst beim Klick gelesen, nicht bei jedem Rerun
+            st.download_button(f"💾 {job.file_name} herunterladen", data=functools.partial(read_file, job.path),
+                               file_name=job.file_name, mime=export.FORMATS[job.format][2])
+    if st.button(f"📦 {total} Ergebnisse exportieren", disabled=not total):
+        st.session_state.export_job = resources.get_exporter().start(fmt, schule, klasse, total)
+        st.rerun()
+
+
+@st.fragment(run_every=0.5)
+def export_progress(job):
+    """Fortschritt eines laufenden Exports; ist er fertig, zeigt ein Rerun den Download"""
+    if job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"Export läuft: {job.done} von {job.total or '?'} Ergebnissen")
+    if st.button("Abbrechen"):
+        job.cancel()
+
+
+def main():
+    st.title("📊 Klassenübersicht")
+    if not check_password():
+        return
+
+    katalog = catalog.get()
+    dimension = DIMENSIONEN[st.radio("Gruppieren nach:", list(DIMENSIONEN), horizontal=True)]
+    groups = resources.get_result_store().rollup(dimension)
+    if not groups:
+        st.info("Noch keine Ergebnisse gespeichert.")
+        return
+
+    gruppe = 'alle' if dimension == 'gesamt' else st.selectbox("Gruppe:", sorted(groups))
+    metrics = groups[gruppe]
+
+    cols = st.columns(len(scoring.EMPFEHLUNGEN) + 1)
+    cols[0].metric("Abgeschlossene Tests", count(metrics))
+    if too_small(metrics):
+        st.info(f"Angezeigt ab {percentiles.MIN_GROUP_SIZE} Ergebnissen, damit keine einzelnen Antworten "
+                "erkennbar sind.")
+    else:
+        for col, (key, label) in zip(cols[1:], scoring.EMPFEHLUNGEN.items()):
+            col.metric(label, f"{share(metrics, key):.0%}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("### 📈 Durchschnittliche Kompetenzen")
+            fig = charts.radar_chart(katalog.kompetenzen.labels, averages(metrics, 'komp', katalog.kompetenzen))
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            st.markdown("### 📊 Durchschnittliche Prioritäten")
+            fig = charts.priority_chart(katalog.zukunftswerte.labels,
+                                        averages(metrics, 'wert', katalog.zukunftswerte))
+            st.plotly_chart(fig, use_container_width=True)
+
+    if dimension != 'gesamt':
+        st.markdown("### 🔍 Vergleich aller Gruppen")
+        rows = []
+        for name in sorted(groups):
+            group_metrics = groups[name]
+            row = {"Gruppe": name, "Tests": count(group_metrics)}
+            if too_small(group_metrics):
+                # Kleine Gruppen bleiben in der Liste, aber ohne Anteile und Durchschnitte
+                row.update({label: None for label in scoring.EMPFEHLUNGEN.values()})
+                row.update({label: None for label in katalog.kompetenzen.labels})
+            else:
+                row.update({label: f"{share(group_metrics, key):.0%}" for key, label in scoring.EMPFEHLUNGEN.items()})
+                row.update(zip(katalog.kompetenzen.labels, averages(group_metrics, 'komp', katalog.kompetenzen)))
+            rows.append(row)
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(f"Anteile und Durchschnitte ab {percentiles.MIN_GROUP_SIZE} Tests pro Gruppe.")
+
+    # Der Export enthält Namen und Reflexionstexte: nur hinter einem Passwort
+    if os.environ.get(PASSWORD_VARIABLE):
+        export_panel()
+    else:
+        st.info(f"📦 Der Export einzelner Ergebnisse ist erst verfügbar, wenn {PASSWORD_VARIABLE} gesetzt ist.")
+
+
+main()
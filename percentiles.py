@@ -0,0 +1,216 @@
+"""Perzentile „im Vergleich zu deiner Klasse“ aus Histogrammen im Speicher
+
+Jede Bewertung hat nur die Werte 1–5, darum ist ein Histogramm mit 5 Fächern
+pro Gruppe und Frage eine exakte und beliebig zusammenführbare Skizze der
+Verteilung. Eine Abfrage ist ein paar Listenzugriffe.
+
+Der Prozess hält die Gesamtzählung (Stand der letzten Sicherung plus eigene
+Zugänge) im Speicher. Beim Sichern werden nur die eigenen Zugänge unter
+Dateisperre in die Checkpoint-Datei eingerechnet, so können mehrere Worker
+dieselbe Datei teilen.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: ohne Dateisperre
+    fcntl = None
+
+import catalog
+import store
+
+logger = logging.getLogger(__name__)
+
+LEVELS = 5
+CHECKPOINT_INTERVAL = 30.0
+# Kleinere Gruppen werden nicht angezeigt (aussagelos und zu nah an Einzelnen)
+MIN_GROUP_SIZE = 3
+# Vergleichsgruppen in Anzeigereihenfolge
+SCOPES = (('klasse', "Klasse"), ('schule', "Schule"), ('gesamt', "Alle"))
+_SCOPE_NAMES = frozenset(scope for scope, _ in SCOPES)
+_RATING_VALUES = frozenset(range(1, LEVELS + 1))
+
+
+def question_ids():
+    cat = catalog.get()
+    return [f"komp:{key}" for key in cat.kompetenzen.ids] + [f"wert:{key}" for key in cat.zukunftswerte.ids]
+
+
+def ratings_from_result(result_data):
+    """Bewertungen eines Ergebnisses in Katalogreihenfolge (Kompetenzen, dann Werte), 0 = fehlt"""
+    cat = catalog.get()
+    kompetenzen = result_data.get('kompetenzen') or {}
+    werte = result_data.get('zukunftswerte') or {}
+    return (
+        [kompetenzen.get(label, 0) for label in cat.kompetenzen.labels]
+        + [werte.get(label, 0) for label in cat.zukunftswerte.labels]
+    )
+
+
+class RatingHistograms:
+    def __init__(self, path=None):
+        self.path = path
+        self.questions = question_ids()
+        self._counts = {}
+        self._delta = {}
+        self._lock = threading.Lock()
+        self._last_checkpoint = time.monotonic()
+        self._saving = False
+        if path:
+            atexit.register(self.checkpoint)
+
+    def _key(self, scope, group):
+        return f"{scope}|{group}"
+
+    def add(self, result_data, ratings=None):
+        """Zählt ein Ergebnis in alle seine Vergleichsgruppen ein"""
+        if ratings is None:
+            ratings = ratings_from_result(result_data)
+        with self._lock:
+            self._count(self._counts, result_data, ratings)
+            self._count(self._delta, result_data, ratings)
+        self._maybe_checkpoint()
+
+    def _count(self, counts, result_data, ratings):
+        for scope, group in store.rollup_groups(result_data):
+            if scope not in _SCOPE_NAMES:
+                continue
+            hist = counts.setdefault(self._key(scope, group), [0] * (len(self.questions) * LEVELS))
+            for q, rating in enumerate(ratings):
+                if rating in _RATING_VALUES:
+                    hist[q * LEVELS + int(rating) - 1] += 1
+
+    def percentile(self, scope, group, question, rating):
+        """Anteil der Gruppe unter der Bewertung (gleiche zählen halb), 0–100; None ohne Daten"""
+        hist = self._counts.get(self._key(scope, group))
+        if hist is None or not 1 <= rating <= LEVELS:
+            return None
+        bins = hist[question * LEVELS:(question + 1) * LEVELS]
+        total = sum(bins)
+        if not total:
+            return None
+        below = sum(bins[:rating - 1])
+        return 100.0 * (below + 0.5 * bins[rating - 1]) / total
+
+    def group_size(self, scope, group, question=0):
+        hist = self._counts.get(self._key(scope, group))
+        return sum(hist[question * LEVELS:(question + 1) * LEVELS]) if hist else 0
+
+    def count(self, results):
+        """Zählungen ({schlüssel: histogramm}) vieler Ergebnisse, ohne sie einzurechnen (für merge())"""
+        groups = {}
+        for result_data in results:
+            self._count(groups, result_data, ratings_from_result(result_data))
+        return groups
+
+    def merge(self, groups):
+        """Addiert Zählungen ({schlüssel: histogramm}) hinzu, z.B. einen ganzen Import-Block auf einmal
+
+        Wie bei add() gehen sie mit dem nächsten Checkpoint in die Datei.
+        """
+        with self._lock:
+            _merge_into(self._counts, groups)
+            _merge_into(self._delta, groups)
+        self._maybe_checkpoint()
+
+    def rebuild(self, results):
+        """Erstbefüllung aus gespeicherten Ergebnissen, falls noch kein Checkpoint existiert
+
+        Läuft nur einmal: hat ein anderer Worker die Datei inzwischen angelegt,
+        wird stattdessen diese geladen.
+        """
+        groups = self.count(results)
+        with self._file_lock():
+            if os.path.exists(self.path):
+                groups = self._read()
+            else:
+                self._write(groups)
+        with self._lock:
+            self._counts = groups
+            _merge_into(self._counts, self._delta)
+
+    def _maybe_checkpoint(self):
+        if (self.path and not self._saving
+                and time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL):
+            self._saving = True
+            threading.Thread(target=self.checkpoint, name="percentile-checkpoint", daemon=True).start()
+
+    def checkpoint(self):
+        """Rechnet die eigenen Zugänge in die Datei ein und übernimmt den Stand aller Worker"""
+        delta = {}
+        try:
+            with self._lock:
+                delta, self._delta = self._delta, {}
+            with self._file_lock():
+                groups = self._read()
+                _merge_into(groups, delta)
+                self._write(groups)
+            with self._lock:
+                # Zugänge während des Sicherns sind noch nicht in der Datei
+                _merge_into(groups, self._delta)
+                self._counts = groups
+        except Exception:
+            # Auch unerwartete Fehler (im Hintergrund-Thread): die eigenen Zugänge nicht verlieren
+            logger.exception("Perzentil-Checkpoint %s fehlgeschlagen", self.path)
+            with self._lock:
+                _merge_into(self._delta, delta)
+        finally:
+            self._last_checkpoint = time.monotonic()
+            self._saving = False
+
+    def load(self):
+        """Lädt den Checkpoint; False, wenn es noch keinen gibt"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        groups = self._read()
+        with self._lock:
+            self._counts = groups
+            _merge_into(self._counts, self._delta)
+        return True
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.path + '.lock', 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _write(self, groups):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'fragen': self.questions, 'gruppen': groups}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # z.B. abgeschnitten nach einem vollen Datenträger
+            logger.warning("Perzentil-Checkpoint %s ist nicht lesbar, wird neu begonnen", self.path)
+            return {}
+        if not isinstance(data, dict) or not isinstance(data.get('gruppen'), dict):
+            logger.warning("Perzentil-Checkpoint %s ist nicht lesbar, wird neu begonnen", self.path)
+            return {}
+        if data.get('fragen') != self.questions:
+            logger.warning("Perzentil-Checkpoint %s passt nicht zum Katalog, wird neu begonnen", self.path)
+            return {}
+        return data['gruppen']
+
+
+def _merge_into(target, source):
+    for key, hist in source.items():
+        existing = target.get(key)
+        if existing is None:
+            target[key] = list(hist)
+        else:
+            for i, n in enumerate(hist):
+                existing[i] += n
@@ -0,0 +1,264 @@
+"""Spielt aufgezeichnete Antwort-Spuren (traces.py) headless durch die App
+
+Jede Spur läuft als eigener Streamlit-AppTest Schritt für Schritt durch den
+Wizard, mit den aufgezeichneten Antworten und Platzhaltern für die Freitexte.
+Am Ende muss die Empfehlung dieselbe sein wie bei der Aufzeichnung; Spuren,
+deren Empfehlung sich geändert hat oder deren Ablauf nicht mehr passt,
+werden gemeldet (Exit-Code 1).
+
+Gemessen wird die Dauer jedes Reruns pro Schritt und in einem zweiten
+Durchgang über die ersten --speicher Spuren mit tracemalloc der
+Speicher-Spitzenwert pro Rerun (getrennt, weil tracemalloc die Zeiten
+verfälscht). Ablage, Sitzungen, Perzentile, Nachbarn-Index und Berichte
+liegen in einem temporären Verzeichnis und starten leer, damit zwei Läufe
+vergleichbar sind; Zustellung, Zulassung und Aufzeichnung sind aus.
+
+Mit --vergleich alt.json zeigt der Lauf die Veränderung gegenüber einem
+früheren Bericht (--json) und scheitert mit --schwelle 20, wenn ein Schritt
+im p95 mehr als 20 % langsamer geworden ist.
+
+Beispiel:
+    python replay.py spuren.jsonl --json neu.json --vergleich release-1.4.json --schwelle 20
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import traces
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+STEPS = ["Start", "Persönliche Daten", "Kompetenzen", "Motivation", "Umgebung", "Zukunftswerte", "Persönlichkeit", "Ergebnisse"]
+# Auslösender Button beim Verlassen eines Schritts nach vorne
+FORWARD = {0: "🚀 Los geht's!", 6: "🎯 Auswertung erstellen!"}
+BACK = "⬅️ Zurück"
+# Platzhalter für die nicht aufgezeichneten Freitexte
+NAME = "Anonym"
+TEXT = "–"
+
+
+class Mismatch(Exception):
+    """Die Spur passt nicht mehr zum Ablauf der App"""
+
+
+def button(at, label):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise Mismatch(f"Button {label!r} fehlt in Schritt {at.session_state.current_step}")
+
+
+def fill(at, step, values):
+    """Setzt die aufgezeichneten Antworten des Schritts und gibt den Button zum Weitergehen zurück"""
+    if step == 1:
+        at.text_input[0].input(NAME)
+        at.number_input[0].set_value(values['alter'])
+        at.selectbox[0].set_value(values['situation'])
+    elif step in (2, 5):
+        ratings = values['kompetenzen' if step == 2 else 'zukunftswerte']
+        if len(at.slider) != len(ratings):
+            raise Mismatch(f"Schritt {step}: {len(at.slider)} Slider, aufgezeichnet {len(ratings)}")
+        for slider, rating in zip(at.slider, ratings):
+            slider.set_value(int(rating))
+    elif step == 3:
+        for i, checkbox in enumerate(at.checkbox):
+            checkbox.set_value(bool(values['motivationen'] >> i & 1))
+        at.radio[0].set_value(values['weekend_choice'])
+    elif step == 4:
+        at.radio(key="env_radio").set_value(values['arbeitsumgebung'])
+    elif step == 6:
+        at.radio[0].set_value(values['presentation_style'])
+        at.radio[1].set_value(values['problem_solving'])
+        at.text_area[0].input(TEXT)
+        at.text_area[1].input(TEXT)
+    return button(at, FORWARD.get(step, "Weiter ➡️"))
+
+
+def replay(trace, timings=None, memory=None):
+    """Spielt eine Spur ab; gibt die Empfehlung der App zurück
+
+    timings bzw. memory (Schritt → Liste) bekommen Dauer bzw. Speicher-Spitze
+    jedes Reruns; memory setzt ein laufendes tracemalloc voraus.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    run = _measured(at.run, 0, timings, memory)
+    run()
+    for event in trace['schritte']:
+        source, target = event[0], event[1]
+        if at.session_state.current_step != source:
+            raise Mismatch(f"Erwartet Schritt {source}, die App ist in Schritt {at.session_state.current_step}")
+        trigger = button(at, BACK) if target < source else fill(at, source, event[2] if len(event) > 2 else {})
+        _measured(trigger.click().run, source, timings, memory)()
+        if at.exception:
+            raise Mismatch(f"Schritt {source}: {at.exception[0].message}")
+        if at.session_state.current_step != target:
+            raise Mismatch(f"Schritt {source} führt zu {at.session_state.current_step} statt {target}")
+    if at.session_state.current_step != traces.RESULT_STEP:
+        raise Mismatch("Die Spur endet vor den Ergebnissen")
+    return at.session_state.result.empfehlung
+
+
+def _measured(fn, step, timings, memory):
+    def wrapper():
+        if memory is not None:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = fn()
+        if timings is not None:
+            timings[step].append(time.perf_counter() - start)
+        if memory is not None:
+            memory[step].append(tracemalloc.get_traced_memory()[1] - base)
+        return result
+    return wrapper
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def isolate(directory):
+    """Alle Ablagen der App ins temporäre Verzeichnis; Zustellung, Zulassung und Aufzeichnung aus"""
+    for name, file_name in (('DB', 'replay.db'), ('SESSIONS', 'sessions.db'), ('PERZENTILE', 'perzentile.json'),
+                            ('NACHBARN', 'nachbarn'), ('BERICHTE', 'berichte')):
+        os.environ[f'ZUKUNFTSNAVIGATOR_{name}'] = os.path.join(directory, file_name)
+    for name in ('ZUSTELLUNG_URL', 'MAX_AKTIV', 'SPUREN'):
+        os.environ.pop(f'ZUKUNFTSNAVIGATOR_{name}', None)
+
+
+def compare(report, baseline, threshold=None):
+    """Zeilen mit der Veränderung pro Schritt und die Schritte über der Schwelle (p95 in %)"""
+    rows, regressions = [], []
+    for name, row in report['steps'].items():
+        old = baseline.get('steps', {}).get(name)
+        if not old:
+            continue
+        change = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+        memory = (row['speicher_p95_kb'] - old['speicher_p95_kb']
+                  if row.get('speicher_p95_kb') is not None and old.get('speicher_p95_kb') is not None else None)
+        rows.append((name, old['p95_ms'], row['p95_ms'], change, memory))
+        if threshold is not None and change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('spuren', help="JSONL-Datei aus ZUKUNFTSNAVIGATOR_SPUREN")
+    parser.add_argument('--limit', type=int, help="Nur die ersten N Spuren")
+    parser.add_argument('--speicher', type=int, default=20,
+                        help="Spuren für den Speicher-Durchgang mit tracemalloc (0 = aus)")
+    parser.add_argument('--json', help="Bericht zusätzlich als JSON in diese Datei schreiben")
+    parser.add_argument('--vergleich', help="Früherer Bericht (--json) für den Vergleich")
+    parser.add_argument('--schwelle', type=float,
+                        help="Exit-Code 1, wenn ein Schritt im p95 um mehr als so viele Prozent langsamer ist")
+    args = parser.parse_args(argv)
+
+    loaded, broken = traces.load(args.spuren)
+    loaded = loaded[:args.limit]
+    if not loaded:
+        print("Keine lesbaren Spuren gefunden", file=sys.stderr)
+        return 1
+
+    # Vor den Importen der App registriert, damit es nach deren atexit-Checkpoints aufgeräumt wird
+    tmp = tempfile.mkdtemp(prefix='replay-')
+    atexit.register(shutil.rmtree, tmp, True)
+    isolate(tmp)
+
+    key = traces.catalog_key()
+    foreign = [trace for trace in loaded if trace['katalog'] != key]
+    loaded = [trace for trace in loaded if trace['katalog'] == key]
+    if not loaded:
+        print(f"Alle {len(foreign)} Spuren stammen von einem anderen Katalog", file=sys.stderr)
+        return 1
+
+    # Aufwärmen, damit Importe und Caches nicht der ersten Spur angerechnet werden
+    try:
+        replay(loaded[0])
+    except Mismatch:
+        pass
+
+    timings = defaultdict(list)
+    changed, mismatched = [], []
+    start = time.perf_counter()
+    for number, trace in enumerate(loaded, 1):
+        try:
+            empfehlung = replay(trace, timings=timings)
+        except Mismatch as exc:
+            mismatched.append((number, str(exc)))
+            continue
+        if empfehlung != trace['empfehlung']:
+            changed.append((number, trace['empfehlung'], empfehlung))
+    elapsed = time.perf_counter() - start
+
+    memory = defaultdict(list)
+    if args.speicher:
+        tracemalloc.start()
+        for trace in loaded[:args.speicher]:
+            try:
+                replay(trace, memory=memory)
+            except Mismatch:
+                pass
+        tracemalloc.stop()
+
+    report = {
+        'spuren': len(loaded),
+        'unlesbar': broken,
+        'anderer_katalog': len(foreign),
+        'sekunden': round(elapsed, 2),
+        'empfehlung_geaendert': len(changed),
+        'ablauf_abweichend': len(mismatched),
+        'steps': {
+            STEPS[step]: {
+                'reruns': len(samples),
+                'p50_ms': round(percentile(samples, 50) * 1000, 1),
+                'p95_ms': round(percentile(samples, 95) * 1000, 1),
+                'mean_ms': round(statistics.fmean(samples) * 1000, 1),
+                'speicher_p95_kb': round(percentile(memory[step], 95) / 1024, 1) if memory.get(step) else None,
+            }
+            for step, samples in sorted(timings.items())
+        },
+    }
+
+    print(f"{len(loaded)} Spuren in {report['sekunden']} s; Empfehlung geändert: {len(changed)}, "
+          f"Ablauf abweichend: {len(mismatched)}, unlesbar: {broken}, anderer Katalog: {len(foreign)}")
+    for number, old, new in changed[:10]:
+        print(f"  Spur {number}: {old} → {new}")
+    for number, message in mismatched[:10]:
+        print(f"  Spur {number}: {message}")
+    print(f"{'Schritt':<20}{'Reruns':>8}{'p50 ms':>10}{'p95 ms':>10}{'Speicher KB':>13}")
+    for name, row in report['steps'].items():
+        memory_kb = '' if row['speicher_p95_kb'] is None else row['speicher_p95_kb']
+        print(f"{name:<20}{row['reruns']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{memory_kb:>13}")
+
+    regressions = []
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare(report, baseline, args.schwelle)
+        print(f"\nVergleich mit {args.vergleich} (p95)")
+        print(f"{'Schritt':<20}{'alt ms':>10}{'neu ms':>10}{'Δ %':>8}{'Δ Speicher KB':>15}")
+        for name, old, new, change, memory_kb in rows:
+            memory_kb = '' if memory_kb is None else f"{memory_kb:+.1f}"
+            print(f"{name:<20}{old:>10}{new:>10}{change:>+8.1f}{memory_kb:>15}")
+        if regressions:
+            print(f"Langsamer als {args.schwelle:g} %: {', '.join(regressions)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if changed or mismatched or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
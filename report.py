@@ -0,0 +1,472 @@
+"""PDF-Bericht der Ergebnisseite, serverseitig und in reinem Python erzeugt
+
+render() schreibt ein A4-PDF mit Empfehlung, Radar der Kompetenzen,
+Zukunftswerten und nächsten Schritten direkt im PDF-Format: Standardschriften
+Helvetica (WinAnsi, also mit Umlauten), Vektorgrafik, zlib-komprimierte
+Seiteninhalte. Es braucht weder Browser noch Zusatzpakete; ein Bericht
+hat wenige KB und ist in Millisekunden fertig.
+
+ReportService rendert auf einem begrenzten Prozess-Pool, damit der
+Streamlit-Thread nie wartet, und legt die fertigen PDFs unter dem Hash ihres
+Inhalts ab. Wer denselben Bericht nochmals herunterlädt, bekommt die Datei
+aus dem Cache; gleichzeitige Anfragen für denselben Inhalt teilen sich einen
+Auftrag.
+"""
+import atexit
+import collections
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import catalog
+import scoring
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen am Layout erhöhen, damit alte PDFs im Cache nicht mehr passen
+LAYOUT_VERSION = 1
+# Höchstens so oft (Sekunden) wird berichte/ nach alten PDFs durchsucht
+PRUNE_INTERVAL = 60
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in Punkt
+MARGIN = 50
+BLUE = (0.4, 0.494, 0.918)
+PURPLE = (0.463, 0.294, 0.635)
+LIGHT = (0.86, 0.88, 0.98)
+GREY = (0.45, 0.45, 0.5)
+GRID = (0.78, 0.78, 0.82)
+
+# Zeichenbreiten von Helvetica (1/1000 Schriftgrösse) für ASCII 32–126
+_ASCII_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_DEFAULT_WIDTH = 600
+# Helvetica-Bold ist etwas breiter; für den Zeilenumbruch genügt ein Faktor
+_BOLD_FACTOR = 1.08
+
+
+def _encode(text):
+    """Text als WinAnsi-Bytes; Emojis und andere nicht darstellbare Zeichen fallen weg"""
+    return str(text).encode('cp1252', 'ignore').strip()
+
+
+def _width(raw, size, bold=False):
+    units = sum(_ASCII_WIDTHS[b - 32] if 32 <= b < 127 else _DEFAULT_WIDTH for b in raw)
+    return units * size / 1000 * (_BOLD_FACTOR if bold else 1)
+
+
+def _wrap(text, size, width, bold=False):
+    """Bricht Text wortweise auf Zeilen von höchstens width Punkt um"""
+    lines, line = [], b''
+    for word in _encode(text).split():
+        candidate = line + b' ' + word if line else word
+        if line and _width(candidate, size, bold) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _literal(raw):
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _num(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def _color(rgb):
+    return ' '.join(_num(c) for c in rgb)
+
+
+class Canvas:
+    """Zeichenbefehle für eine Seite, Koordinaten in Punkt ab der linken unteren Ecke"""
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, text, size=10, bold=False, color=(0, 0, 0), align='left'):
+        raw = text if isinstance(text, bytes) else _encode(text)
+        if align != 'left':
+            x -= _width(raw, size, bold) / (2 if align == 'center' else 1)
+        self.ops.append(
+            f"BT /{'F2' if bold else 'F1'} {_num(size)} Tf {_color(color)} rg {_num(x)} {_num(y)} Td ".encode()
+            + _literal(raw) + b" Tj ET"
+        )
+
+    def rect(self, x, y, w, h, fill):
+        self.ops.append(f"{_color(fill)} rg {_num(x)} {_num(y)} {_num(w)} {_num(h)} re f".encode())
+
+    def polygon(self, points, fill=None, stroke=None, line_width=1):
+        path = ' '.join(f"{_num(x)} {_num(y)} {'m' if i == 0 else 'l'}" for i, (x, y) in enumerate(points))
+        paint = 'b' if fill and stroke else 'f' if fill else 's'
+        style = []
+        if fill:
+            style.append(f"{_color(fill)} rg")
+        if stroke:
+            style.append(f"{_color(stroke)} RG {_num(line_width)} w")
+        self.ops.append(f"{' '.join(style)} {path} {paint}".encode())
+
+    def line(self, x1, y1, x2, y2, color=GRID, line_width=0.5):
+        self.ops.append(
+            f"{_color(color)} RG {_num(line_width)} w {_num(x1)} {_num(y1)} m {_num(x2)} {_num(y2)} l S".encode()
+        )
+
+
+def write_pdf(pages):
+    """Setzt die Seiten (Liste von Canvas) zu einer PDF-Datei zusammen"""
+    objects = [None, None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for canvas in pages:
+        stream = zlib.compress(b'\n'.join(canvas.ops))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] " % (PAGE_WIDTH, PAGE_HEIGHT)
+            + b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b' '.join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def report_content(result_data):
+    """Alles, was im Bericht steht, als JSON-fähiges Dict (Grundlage des Cache-Schlüssels)
+
+    Vom Zeitstempel zählt nur das Datum, damit Reruns derselben Ergebnisseite
+    denselben Bericht treffen.
+    """
+    cat = catalog.get()
+    empfehlung = result_data.get('empfehlung', '')
+    try:
+        datum = datetime.fromisoformat(result_data['datum']).strftime('%d.%m.%Y')
+    except (KeyError, TypeError, ValueError):
+        datum = ''
+    kompetenzen = result_data.get('kompetenzen') or {}
+    werte = result_data.get('zukunftswerte') or {}
+    return {
+        'layout': LAYOUT_VERSION,
+        'name': result_data.get('name', ''),
+        'klasse': result_data.get('klasse', ''),
+        'schule': result_data.get('schule', ''),
+        'datum': datum,
+        'empfehlung': scoring.EMPFEHLUNGEN.get(empfehlung, empfehlung),
+        'kompetenzen': [[label, kompetenzen.get(label, 0)] for label in cat.kompetenzen.labels],
+        'zukunftswerte': [[label, werte.get(label, 0)] for label in cat.zukunftswerte.labels],
+        'staerken': list(result_data.get('staerken') or ()),
+        'entwicklungsfelder': list(result_data.get('entwicklungsfelder') or ()),
+        'schritte': scoring.NEXT_STEPS.get(empfehlung, []),
+        'staerke': result_data.get('strength') or '',
+        'entwicklung': result_data.get('development') or '',
+    }
+
+
+def content_key(content):
+    """Hash des Berichtsinhalts, Dateiname im Cache"""
+    raw = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _Layout:
+    """Füllt Seiten von oben nach unten und beginnt bei Bedarf eine neue"""
+
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.canvas = Canvas()
+        self.pages.append(self.canvas)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def need(self, height):
+        if self.y - height < MARGIN + 20:
+            self.new_page()
+
+    def heading(self, text):
+        self.need(40)
+        self.y -= 26
+        self.canvas.text(MARGIN, self.y, text, size=13, bold=True, color=PURPLE)
+        self.y -= 8
+
+    def paragraph(self, text, size=10, x=MARGIN, width=PAGE_WIDTH - 2 * MARGIN, prefix=''):
+        """Umbrochener Absatz; ein Präfix (Aufzählungszeichen, Nummer) steht fett davor"""
+        raw_prefix = prefix.encode('cp1252', 'ignore')
+        indent = _width(raw_prefix, size, bold=True)
+        for i, raw in enumerate(_wrap(text, size, width - indent)):
+            self.need(size + 4)
+            self.y -= size + 4
+            if i == 0 and prefix:
+                self.canvas.text(x, self.y, raw_prefix, size=size, bold=True, color=BLUE)
+            self.canvas.text(x + indent, self.y, raw, size=size)
+
+
+def radar(canvas, cx, cy, radius, items, maximum=5, label_width=80):
+    """Radar der Bewertungen (label, wert) als Vektorgrafik; Beschriftungen werden umbrochen"""
+    n = len(items)
+    if n < 3:
+        return
+
+    def point(i, r):
+        angle = math.pi / 2 - 2 * math.pi * i / n
+        return cx + r * math.cos(angle), cy + r * math.sin(angle)
+
+    values = [point(i, radius * min(max(value, 0), maximum) / maximum) for i, (_, value) in enumerate(items)]
+    canvas.polygon(values, fill=LIGHT)
+    for level in range(1, maximum + 1):
+        canvas.polygon([point(i, radius * level / maximum) for i in range(n)], stroke=GRID, line_width=0.5)
+    for i, (label, _) in enumerate(items):
+        canvas.line(cx, cy, *point(i, radius))
+        x, y = point(i, radius + 8)
+        dx, dy = x - cx, y - cy
+        align = 'left' if dx > radius * 0.2 else 'right' if dx < -radius * 0.2 else 'center'
+        lines = _wrap(label, 8, label_width)
+        # oben: letzte Zeile am Punkt, unten: erste Zeile darunter, seitlich vertikal zentriert
+        if dy > radius * 0.5:
+            top = y + 9 * (len(lines) - 1)
+        elif dy < -radius * 0.5:
+            top = y - 8
+        else:
+            top = y + 4.5 * (len(lines) - 1) - 3
+        for j, raw in enumerate(lines):
+            canvas.text(x, top - 9 * j, raw, size=8, color=GREY, align=align)
+    canvas.polygon(values, stroke=BLUE, line_width=1.5)
+
+
+def render(content):
+    """Baut den Bericht zu report_content() und gibt die PDF-Bytes zurück (läuft im Worker)"""
+    page = _Layout()
+    c = page.canvas
+    width = PAGE_WIDTH - 2 * MARGIN
+
+    c.rect(0, PAGE_HEIGHT - 95, PAGE_WIDTH, 95, fill=BLUE)
+    c.text(MARGIN, PAGE_HEIGHT - 50, "Zukunfts-Navigator", size=22, bold=True, color=(1, 1, 1))
+    c.text(MARGIN, PAGE_HEIGHT - 74, f"Persönliche Auswertung für {content['name'] or 'dich'}",
+           size=12, color=(1, 1, 1))
+    details = [f"{label}: {content[key]}" for key, label in
+               (('klasse', "Klasse"), ('schule', "Schule"), ('datum', "Datum")) if content[key]]
+    page.y = PAGE_HEIGHT - 115
+    c.text(MARGIN, page.y, "   ·   ".join(details), size=9, color=GREY)
+
+    page.y -= 62
+    c.rect(MARGIN, page.y, width, 48, fill=LIGHT)
+    c.text(MARGIN + 14, page.y + 30, "Deine Wegempfehlung", size=9, color=GREY)
+    c.text(MARGIN + 14, page.y + 11, content['empfehlung'], size=17, bold=True, color=PURPLE)
+
+    # Radar links, Stärken und Entwicklungsfelder rechts
+    page.heading("Deine Kompetenzen")
+    top = page.y
+    radius = 75
+    radar(c, MARGIN + 135, top - radius - 30, radius, content['kompetenzen'])
+    column = MARGIN + 305
+    for title, items, empty in (
+        ("Stärken", content['staerken'], "Ausgewogene Kompetenzen in allen Bereichen"),
+        ("Entwicklungsfelder", content['entwicklungsfelder'], "Keine grösseren Schwächen erkannt"),
+    ):
+        page.y -= 16
+        c.text(column, page.y, title, size=10, bold=True)
+        page.y -= 2
+        for item in items or [empty]:
+            page.paragraph(item, size=9, x=column, width=PAGE_WIDTH - MARGIN - column, prefix="•  ")
+        page.y -= 6
+    page.y = min(page.y, top - 2 * radius - 60)
+
+    page.heading("Was dir in Zukunft wichtig ist")
+    label_width, bar_width = 190, width - 220
+    for label, value in content['zukunftswerte']:
+        page.need(18)
+        page.y -= 18
+        page.canvas.text(MARGIN, page.y, _wrap(label, 9, label_width)[0] if label else b'', size=9)
+        page.canvas.rect(MARGIN + label_width, page.y - 2, bar_width, 10, fill=LIGHT)
+        page.canvas.rect(MARGIN + label_width, page.y - 2, bar_width * min(max(value, 0), 5) / 5, 10, fill=BLUE)
+        page.canvas.text(PAGE_WIDTH - MARGIN, page.y, f"{value}/5", size=9, color=GREY, align='right')
+
+    page.heading("Deine nächsten Schritte")
+    for i, step in enumerate(content['schritte'], 1):
+        page.paragraph(step, prefix=f"{i}.  ")
+
+    if content['staerke'] or content['entwicklung']:
+        page.heading("Deine Notizen")
+        if content['staerke']:
+            page.paragraph(content['staerke'], prefix="Deine Stärke:  ")
+        if content['entwicklung']:
+            page.paragraph(content['entwicklung'], prefix="Entwicklungsfeld:  ")
+
+    for number, canvas in enumerate(page.pages, 1):
+        footer = f"Erstellt mit dem Zukunfts-Navigator {content['datum']}".strip()
+        canvas.text(MARGIN, MARGIN - 20, footer, size=8, color=GREY)
+        if len(page.pages) > 1:
+            canvas.text(PAGE_WIDTH - MARGIN, MARGIN - 20, f"Seite {number}/{len(page.pages)}",
+                        size=8, color=GREY, align='right')
+    return write_pdf(page.pages)
+
+
+class ReportService:
+    """Rendert Berichte im Hintergrund und hält sie nach Inhalts-Hash vor
+
+    Die fertigen PDFs liegen in directory (überleben Neustarts und werden von
+    allen Server-Prozessen geteilt) und die zuletzt benutzten zusätzlich im
+    Speicher. Höchstens max_pending Aufträge warten gleichzeitig; darüber
+    lehnt submit() ab, statt die Warteschlange unbegrenzt wachsen zu lassen.
+
+    Auf der Platte bleiben höchstens keep PDFs, keines länger als max_days
+    Tage nach dem letzten Abruf; prune() räumt beim Start und danach
+    höchstens alle PRUNE_INTERVAL Sekunden nach einem neuen Bericht auf.
+    """
+
+    def __init__(self, directory, workers=None, max_pending=256, memory_items=128, keep=5000, max_days=30):
+        self.directory = directory
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.memory_items = memory_items
+        self.keep = keep
+        self.max_days = max_days
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = {}
+        self._errors = {}
+        self._memory = collections.OrderedDict()
+        self._pruned = 0.0
+        atexit.register(self.close)
+        self.prune()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """PDF-Bytes aus dem Cache oder None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        try:
+            with open(self._path(key), 'rb') as f:
+                pdf = f.read()
+            # Abgerufene Berichte gelten für prune() als frisch
+            os.utime(self._path(key))
+        except OSError:
+            return None
+        self._remember(key, pdf)
+        return pdf
+
+    def pending(self, key):
+        return key in self._pending
+
+    def error(self, key):
+        """Fehlermeldung eines gescheiterten Auftrags (nur einmal), sonst None"""
+        with self._lock:
+            return self._errors.pop(key, None)
+
+    def submit(self, content):
+        """Stellt den Bericht zu report_content() in Auftrag; False, wenn die Warteschlange voll ist
+
+        Gibt sonst den Cache-Schlüssel zurück. Liegt der Bericht schon vor
+        oder ist er bereits in Arbeit, entsteht kein neuer Auftrag.
+        """
+        key = content_key(content)
+        if self.get(key) is not None:
+            return key
+        with self._lock:
+            if key in self._pending:
+                return key
+            if len(self._pending) >= self.max_pending:
+                return False
+            if self._pool is None:
+                # spawn statt fork: der Server-Prozess hat bereits viele Threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            future = self._pool.submit(render, content)
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f))
+        return key
+
+    def _finish(self, key, future):
+        try:
+            pdf = future.result()
+        except Exception as exc:
+            logger.exception("PDF-Bericht %s nicht erstellt", key)
+            with self._lock:
+                self._errors[key] = str(exc) or type(exc).__name__
+                del self._pending[key]
+            return
+        tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(pdf)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            logger.exception("PDF-Bericht %s nicht im Cache abgelegt", key)
+        self._remember(key, pdf)
+        with self._lock:
+            del self._pending[key]
+            due = time.monotonic() - self._pruned >= PRUNE_INTERVAL
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Löscht PDFs, die älter als max_days sind, und die ältesten über keep; gibt die Anzahl zurück"""
+        self._pruned = time.monotonic()
+        cutoff = time.time() - self.max_days * 86400
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(('.pdf', '.tmp')):
+                        try:
+                            files.append((entry.stat().st_mtime, entry.path))
+                        except OSError:
+                            pass
+        except OSError:
+            logger.exception("Berichte in %s nicht aufgeräumt", self.directory)
+            return 0
+        files.sort(reverse=True)
+        stale = [path for number, (mtime, path) in enumerate(files) if number >= self.keep or mtime < cutoff]
+        removed = 0
+        for path in stale:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                # Ein anderer Server-Prozess war schneller
+                pass
+        return removed
+
+    def _remember(self, key, pdf):
+        with self._lock:
+            self._memory[key] = pdf
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
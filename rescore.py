@@ -0,0 +1,234 @@
+"""Bewertet exportierte Ergebnis-JSONs (Verzeichnis oder ZIP) neu
+
+Mit ZUKUNFTSNAVIGATOR_GEWICHTE kommt die Empfehlung aus dem gewichteten Modell
+(weights.py, ein Matrixprodukt pro Paket), sonst aus der Regel in scoring.py.
+
+Beispiel:
+    python rescore.py exporte.zip -o ergebnisse.csv -j 8
+"""
+import argparse
+import collections
+import csv
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import scoring
+import weights
+from answers import Answers
+
+COLUMNS = [
+    'datei', 'name', 'klasse', 'schule', 'alter', 'datum',
+    'empfehlung_alt', 'empfehlung', 'geaendert',
+    'staerken', 'entwicklungsfelder', 'fehler',
+]
+
+
+def iter_sources(path):
+    """Liefert die Namen aller JSON-Dateien im Verzeichnis oder ZIP, ohne sie zu lesen"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.endswith('.json'):
+                    yield info.filename
+        return
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith('.json'):
+                    yield entry.path
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def check_record(data):
+    """Prüft die Form eines Exports, bevor er in den Batch geht; ValueError mit dem Grund"""
+    if not isinstance(data, dict):
+        raise ValueError("kein JSON-Objekt")
+    for field in ('kompetenzen', 'zukunftswerte'):
+        ratings = data.get(field)
+        if ratings is None:
+            continue
+        if not isinstance(ratings, dict):
+            raise ValueError(f"'{field}' ist kein Objekt")
+        for label, rating in ratings.items():
+            if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not 0 <= rating <= 255:
+                raise ValueError(f"'{field}': Bewertung {rating!r} für {label!r} ist keine Zahl von 0 bis 255")
+    motivationen = data.get('motivationen')
+    if motivationen is not None and (
+            not isinstance(motivationen, list) or not all(isinstance(m, str) for m in motivationen)):
+        raise ValueError("'motivationen' ist keine Liste von Texten")
+    for field in ('situation', 'weekend_choice', 'arbeitsumgebung', 'presentation_style', 'problem_solving'):
+        if not isinstance(data.get(field, ''), str):
+            raise ValueError(f"'{field}' ist kein Text")
+
+
+def load_records(source, names):
+    """Liest die Dateien eines Pakets; defekte oder falsch aufgebaute Dateien werden als Fehler vermerkt"""
+    records, errors = [], {}
+    archive = zipfile.ZipFile(source) if zipfile.is_zipfile(source) else None
+    try:
+        for i, name in enumerate(names):
+            try:
+                if archive:
+                    raw = archive.read(name)
+                else:
+                    with open(name, 'rb') as f:
+                        raw = f.read()
+                data = json.loads(raw)
+                check_record(data)
+            except (OSError, ValueError, KeyError) as exc:
+                errors[i] = str(exc)
+                data = {}
+            records.append(data)
+    finally:
+        if archive:
+            archive.close()
+    return records, errors
+
+
+def score_chunk(source, names):
+    """Bewertet ein Paket von Dateien in einem Batch-Durchgang (läuft im Worker)"""
+    records, errors = load_records(source, names)
+    scored = scoring.score_frame(scoring.frame_from_records(records))
+    model = weights.get()
+    if model is not None:
+        answers = []
+        for i, data in enumerate(records):
+            try:
+                answers.append(Answers.from_dict(data))
+            except (TypeError, ValueError) as exc:
+                # z.B. Bewertung 3.5: für die Regel gültig, als kompakte Antwort nicht
+                errors[i] = f"nicht lesbar: {exc}"
+                answers.append(Answers())
+        scored['empfehlung'] = model.recommend_batch(answers)
+
+    rows = []
+    for i, (name, data, result) in enumerate(zip(names, records, scored.itertuples(index=False))):
+        if i in errors:
+            rows.append([name] + [''] * (len(COLUMNS) - 2) + [errors[i]])
+            continue
+        rows.append([
+            name,
+            data.get('name', ''),
+            data.get('klasse', ''),
+            data.get('schule', ''),
+            data.get('alter', ''),
+            data.get('datum', ''),
+            data.get('empfehlung', ''),
+            result.empfehlung,
+            data.get('empfehlung') not in (None, result.empfehlung),
+            json.dumps(result.staerken, ensure_ascii=False),
+            json.dumps(result.entwicklungsfelder, ensure_ascii=False),
+            '',
+        ])
+    return rows
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Für Parquet-Ausgabe wird 'pyarrow' benötigt (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([(col, pa.string()) for col in COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = [[None if v == '' else str(v) for v in col] for col in zip(*rows)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def rescore(source, writer, workers=None, chunk_size=500):
+    """Bewertet alle Dateien neu; gibt (Anzahl Dateien, Anzahl Fehler) zurück
+
+    Es sind höchstens 2 Pakete pro Worker gleichzeitig unterwegs, damit der
+    Speicherbedarf unabhängig von der Anzahl Dateien bleibt.
+    """
+    files = errors = 0
+
+    def consume(rows):
+        nonlocal files, errors
+        writer.write(rows)
+        files += len(rows)
+        errors += sum(1 for row in rows if row[-1])
+
+    chunks = chunked(iter_sources(source), chunk_size)
+    if workers == 1:
+        for names in chunks:
+            consume(score_chunk(source, names))
+        return files, errors
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        max_pending = 2 * workers
+        pending = collections.deque()
+        for names in chunks:
+            pending.append(pool.submit(score_chunk, source, names))
+            if len(pending) >= max_pending:
+                consume(pending.popleft().result())
+        while pending:
+            consume(pending.popleft().result())
+    return files, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportierte Zukunfts-Navigator-Ergebnisse neu bewerten")
+    parser.add_argument('eingabe', help="Verzeichnis oder ZIP-Datei mit zukunftsnavigator_*.json")
+    parser.add_argument('-o', '--ausgabe', default='ergebnisse.csv', help="Ausgabedatei (.csv oder .parquet)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Anzahl Prozesse (Standard: alle CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Dateien pro Paket")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.eingabe):
+        parser.error(f"{args.eingabe} existiert nicht")
+    writer = ParquetWriter(args.ausgabe) if args.ausgabe.endswith('.parquet') else CsvWriter(args.ausgabe)
+
+    start = time.perf_counter()
+    try:
+        files, errors = rescore(args.eingabe, writer, args.workers, args.chunk_size)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    rate = files / elapsed if elapsed > 0 else 0.0
+    print(f"{files} Dateien in {elapsed:.2f} s ({rate:.0f} Dateien/s), {errors} Fehler -> {args.ausgabe}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
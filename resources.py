@@ -0,0 +1,98 @@
+"""Prozessweite Ressourcen, die sich app.py und die Seiten unter pages/ teilen"""
+import os
+
+import streamlit as st
+
+import admission
+import delivery
+import export
+import metrics
+import percentiles
+import report
+import sessions
+import store
+import traces
+
+
+@st.cache_resource
+def get_result_store():
+    """Gemeinsame Ergebnis-Ablage für alle Sessions"""
+    return store.ResultStore(os.environ.get('ZUKUNFTSNAVIGATOR_DB', 'zukunftsnavigator.db'))
+
+
+@st.cache_resource
+def get_session_store():
+    """Gemeinsamer Store für Sitzungs-Schnappschüsse (SQLite-Datei oder redis://-URL)"""
+    return sessions.open_store(os.environ.get('ZUKUNFTSNAVIGATOR_SESSIONS', 'sessions.db'))
+
+
+@st.cache_resource
+def get_exporter():
+    """Sammel-Exporte der Ergebnis-Ablage im Hintergrund (Seite Lehrpersonen)"""
+    return export.Exporter(get_result_store())
+
+
+@st.cache_resource
+def get_histograms():
+    """Bewertungs-Histogramme für die Perzentile auf der Ergebnisseite"""
+    histograms = percentiles.RatingHistograms(os.environ.get('ZUKUNFTSNAVIGATOR_PERZENTILE', 'perzentile.json'))
+    if not histograms.load():
+        result_store = get_result_store()
+        result_store.flush()
+        histograms.rebuild(result_store.iter_results())
+    return histograms
+
+
+@st.cache_resource
+def get_profile_index():
+    """Nächste-Nachbarn-Index der Antwortprofile (importiert NumPy erst bei Bedarf)"""
+    import neighbours
+
+    index = neighbours.ProfileIndex(os.environ.get('ZUKUNFTSNAVIGATOR_NACHBARN', 'nachbarn'))
+    if not index.exists():
+        result_store = get_result_store()
+        result_store.flush()
+        index.build(result_store.iter_results())
+    return index
+
+
+@st.cache_resource
+def get_report_service():
+    """Prozess-Pool und Cache für die PDF-Berichte"""
+    workers = os.environ.get('ZUKUNFTSNAVIGATOR_PDF_WORKER')
+    return report.ReportService(os.environ.get('ZUKUNFTSNAVIGATOR_BERICHTE', 'berichte'),
+                                workers=int(workers) if workers else None,
+                                keep=int(os.environ.get('ZUKUNFTSNAVIGATOR_BERICHTE_MAX') or 5000),
+                                max_days=float(os.environ.get('ZUKUNFTSNAVIGATOR_BERICHTE_TAGE') or 30))
+
+
+@st.cache_resource
+def get_metrics_server():
+    """Metrik-Endpunkt auf ZUKUNFTSNAVIGATOR_METRIKEN_PORT (einmal pro Prozess, None ohne Port)"""
+    return metrics.serve()
+
+
+@st.cache_resource
+def get_delivery():
+    """Zustellung an ZUKUNFTSNAVIGATOR_ZUSTELLUNG_URL; None, wenn keine URL konfiguriert ist"""
+    url = os.environ.get('ZUKUNFTSNAVIGATOR_ZUSTELLUNG_URL')
+    if not url:
+        return None
+    return delivery.Delivery(url, os.environ.get('ZUKUNFTSNAVIGATOR_ZUSTELLUNG_SPOOL', 'zustellung.db'),
+                             token=os.environ.get('ZUKUNFTSNAVIGATOR_ZUSTELLUNG_TOKEN'))
+
+
+@st.cache_resource
+def get_admission():
+    """Platzbeschränkung für die Schritte 2 und 5 (ZUKUNFTSNAVIGATOR_MAX_AKTIV); None ohne Beschränkung"""
+    capacity = int(os.environ.get('ZUKUNFTSNAVIGATOR_MAX_AKTIV') or 0)
+    return admission.Admission(capacity) if capacity > 0 else None
+
+
+@st.cache_resource
+def get_trace_recorder():
+    """Aufzeichnung der Antwort-Spuren nach ZUKUNFTSNAVIGATOR_SPUREN; None ohne Pfad"""
+    path = os.environ.get('ZUKUNFTSNAVIGATOR_SPUREN')
+    if not path:
+        return None
+    return traces.Recorder(path, share=float(os.environ.get('ZUKUNFTSNAVIGATOR_SPUREN_ANTEIL') or 1))
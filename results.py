@@ -0,0 +1,107 @@
+"""Eingefrorenes Ergebnis eines abgeschlossenen Tests
+
+Empfehlung, Stärken, Entwicklungsfelder, der Inhalt des PDF-Berichts und die
+Export-Dateien werden genau einmal berechnet, wenn Schritt 6 abgeschickt
+wird. Die Ergebnisseite, die Seitenleiste und die Downloads lesen danach
+nur noch diesen Schnappschuss; ein Rerun der Ergebnisseite (z.B. beim
+Feedback) rechnet nichts neu.
+
+Der Schnappschuss ist unveränderlich (verschachtelte Dicts als
+MappingProxyType, Listen als Tupel); Ablage, Histogramme und Index bekommen
+über result_data() eine eigene Kopie. Nach einer wiederhergestellten Sitzung
+baut snapshot() ihn aus dem gespeicherten Ergebnis nach, damit Datum und
+Empfehlung dieselben bleiben wie beim Abschluss des Tests.
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+
+import report
+import scoring
+import weights
+from answers import Answers
+
+# Format → (Dateiendung, MIME-Typ) der vorab serialisierten Exporte
+PAYLOADS = {
+    'json': ('.json', 'application/json'),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ResultSnapshot:
+    answers: Answers
+    data: MappingProxyType  # result_data wie in der Ablage
+    payloads: MappingProxyType  # Format → Bytes
+    report_content: MappingProxyType
+    report_key: str
+
+    @property
+    def empfehlung(self):
+        return self.data['empfehlung']
+
+    @property
+    def staerken(self):
+        return self.data['staerken']
+
+    @property
+    def entwicklungsfelder(self):
+        return self.data['entwicklungsfelder']
+
+    def result_data(self):
+        """Veränderbare Kopie von data, z.B. für die Ergebnis-Ablage"""
+        return _thaw(self.data)
+
+    def report(self):
+        """Inhalt des PDF-Berichts als Dict für ReportService.submit()"""
+        return _thaw(self.report_content)
+
+    def file_name(self, extension):
+        """Download-Name mit Name und Datum des Tests, z.B. zukunftsnavigator_Anna_20250301.json"""
+        name = self.data.get('name') or 'Zukunftsheld'
+        datum = self.data['datum'][:10].replace('-', '')
+        return f"zukunftsnavigator_{name}_{datum}{extension}"
+
+
+def freeze(answers, datum=None):
+    """Berechnet das Ergebnis zu answers einmal und friert es ein"""
+    recommendation = weights.recommend_answers(answers)
+    strengths, improvements = scoring.strengths_improvements_answers(answers)
+    result_data = {
+        **answers.to_dict(),
+        'empfehlung': recommendation,
+        'datum': datum or datetime.now().isoformat(),
+        'staerken': strengths,
+        'entwicklungsfelder': improvements,
+    }
+    return snapshot(answers, result_data)
+
+
+def snapshot(answers, result_data):
+    """Friert ein schon berechnetes Ergebnis ein (z.B. aus der Ablage), ohne es neu zu bewerten"""
+    report_content = report.report_content(result_data)
+    return ResultSnapshot(
+        answers=answers,
+        data=_freeze(result_data),
+        payloads=MappingProxyType({
+            'json': json.dumps(result_data, ensure_ascii=False, indent=2).encode('utf-8'),
+        }),
+        report_content=_freeze(report_content),
+        report_key=report.content_key(report_content),
+    )
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(v) for key, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(v) for key, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
@@ -0,0 +1,287 @@
+"""Empfehlungslogik ohne Streamlit – einzeln und als Batch für ganze Jahrgänge
+
+Die Entscheidung hängt nur von den Summen der praktischen und theoretischen
+Kompetenzen und drei Flags ab. decision_table() rechnet sie dafür einmal
+vollständig vor; jede weitere Empfehlung ist ein Index in diese Tabelle.
+
+NumPy und pandas werden erst für die Tabelle und den Batch-Pfad importiert.
+"""
+import functools
+
+import catalog
+
+# Kompetenz-IDs aus catalog.json
+PRACTICAL_COMPETENCIES = ['praktisch', 'technik', 'kreativitaet']
+THEORETICAL_COMPETENCIES = ['deutsch', 'schreiben', 'mathematik']
+PRACTICAL_MOTIVATIONS = ['praktisch', 'kreativ']
+THEORETICAL_MOTIVATIONS = ['theoretisch', 'forschend']
+PRACTICAL_ENVIRONMENTS = ['werkstatt', 'natur']
+
+# Mögliche Empfehlungen mit Kurzbezeichnung für die Anzeige
+EMPFEHLUNGEN = {
+    'berufsausbildung': "🔧 Berufsausbildung",
+    'weiterführende_schule': "📚 Weiterführende Schule",
+    'beide_wege': "⚖️ Beide Wege",
+}
+# Codes in der Entscheidungstabelle = Position in diesem Tupel
+RECOMMENDATIONS = tuple(EMPFEHLUNGEN)
+# Nächste Schritte pro Empfehlung (Ergebnisseite und PDF-Bericht)
+NEXT_STEPS = {
+    'berufsausbildung': [
+        "Informiere dich über verschiedene Lehrberufe",
+        "Organisiere 2-3 Schnupperlehren",
+        "Verbessere deine schulischen Kompetenzen gezielt",
+        "Sprich mit Berufsberater:innen und Praktiker:innen",
+    ],
+    'weiterführende_schule': [
+        "Informiere dich über Aufnahmeprüfungen",
+        "Erstelle einen strukturierten Lernplan",
+        "Besuche Informationsveranstaltungen",
+        "Überlege dir mögliche Studienrichtungen",
+    ],
+    'beide_wege': [
+        "Mache sowohl Schnupperlehren als auch Schulbesuche",
+        "Führe Gespräche mit Berufsberater:innen",
+        "Reflektiere deine langfristigen Ziele",
+        "Entscheide nach deinem Bauchgefühl",
+    ],
+}
+
+STRENGTH_MIN = 4
+IMPROVEMENT_MAX = 2
+
+# Spaltennamen des breiten Batch-Formats
+# Die IDs bleiben beim Neuladen des Katalogs gleich, die Positionen also auch
+_catalog = catalog.get()
+KOMP_COLUMNS = [f"komp_{key}" for key in _catalog.kompetenzen.ids]
+MOT_COLUMNS = [f"mot_{key}" for key in _catalog.motivationen.ids]
+ENV_COLUMN = "arbeitsumgebung"
+
+_PRACTICAL_IDX = [_catalog.kompetenzen.position[key] for key in PRACTICAL_COMPETENCIES]
+_THEORETICAL_IDX = [_catalog.kompetenzen.position[key] for key in THEORETICAL_COMPETENCIES]
+_PRACTICAL_MOTIVATION_IDX = [_catalog.motivationen.position[m] for m in PRACTICAL_MOTIVATIONS]
+_THEORETICAL_MOTIVATION_IDX = [_catalog.motivationen.position[m] for m in THEORETICAL_MOTIVATIONS]
+_PRACTICAL_MOTIVATION_MASK = sum(1 << i for i in _PRACTICAL_MOTIVATION_IDX)
+_THEORETICAL_MOTIVATION_MASK = sum(1 << i for i in _THEORETICAL_MOTIVATION_IDX)
+_PRACTICAL_ENVIRONMENT_IDX = [_catalog.arbeitsumgebung.position[env] for env in PRACTICAL_ENVIRONMENTS]
+del _catalog
+
+_MAX_RATING = 5
+
+
+def decide(practical_score, theoretical_score, practical_motivation, theoretical_motivation,
+           practical_environment):
+    """Entscheidungslogik, gemeinsam für alle Eingabeformate"""
+    if (practical_score > theoretical_score + 0.5) or (practical_motivation and practical_environment):
+        return 'berufsausbildung'
+    elif (theoretical_score > practical_score + 0.5) or (theoretical_motivation and not practical_environment):
+        return 'weiterführende_schule'
+    else:
+        return 'beide_wege'
+
+
+def _decide_arrays(practical_score, theoretical_score, practical_motivation, theoretical_motivation,
+                   practical_environment):
+    """decide() für ganze Arrays; liefert Codes (Position in RECOMMENDATIONS) als int8"""
+    import numpy as np
+
+    return np.select(
+        [
+            (practical_score > theoretical_score + 0.5) | (practical_motivation & practical_environment),
+            (theoretical_score > practical_score + 0.5) | (theoretical_motivation & ~practical_environment),
+        ],
+        [0, 1],
+        default=2,
+    ).astype(np.int8)
+
+
+@functools.lru_cache(maxsize=None)
+def decision_table():
+    """Alle Empfehlungen vorab: table[praktische Summe, theoretische Summe, pm, tm, pe] → Code
+
+    Die Kompetenzen gehen nur über ihre Summen ein, statt 5^6 Bewertungen
+    genügen so 16 × 16 Summen × 8 Flag-Kombinationen (2 KB, schreibgeschützt).
+    Eine fehlende Bewertung zählt als 0, daher beginnen die Summen bei 0.
+    """
+    import numpy as np
+
+    flags = np.array([False, True])
+    ps, ts, pm, tm, pe = np.meshgrid(
+        np.arange(len(_PRACTICAL_IDX) * _MAX_RATING + 1),
+        np.arange(len(_THEORETICAL_IDX) * _MAX_RATING + 1),
+        flags, flags, flags,
+        indexing='ij',
+    )
+    table = _decide_arrays(ps / len(_PRACTICAL_IDX), ts / len(_THEORETICAL_IDX), pm, tm, pe)
+    table.flags.writeable = False
+    return table
+
+
+def decision_key(answers):
+    """Index in decision_table() für kompakte Antworten: (ps, ts, pm, tm, pe)"""
+    ratings = answers.kompetenzen or bytes(len(KOMP_COLUMNS))
+    return (
+        sum(ratings[i] for i in _PRACTICAL_IDX),
+        sum(ratings[i] for i in _THEORETICAL_IDX),
+        int(bool(answers.motivationen & _PRACTICAL_MOTIVATION_MASK)),
+        int(bool(answers.motivationen & _THEORETICAL_MOTIVATION_MASK)),
+        int(answers.arbeitsumgebung in _PRACTICAL_ENVIRONMENT_IDX),
+    )
+
+
+def boundary_distances(practical_sum, theoretical_sum, practical_motivation, theoretical_motivation,
+                       practical_environment):
+    """Wie viele Bewertungspunkte bis zu jeder Empfehlung fehlen, bei gleichen Flags
+
+    Ein Punkt ist ein Schritt auf einem der sechs Slider, verändert also eine
+    der beiden Summen um 1. Nur Summen mit allen Bewertungen zwischen 1 und 5
+    zählen. Empfehlungen, die mit diesen Flags nicht erreichbar sind, fehlen
+    im Ergebnis; die aktuelle hat Abstand 0.
+    """
+    import numpy as np
+
+    surface = decision_table()[:, :, practical_motivation, theoretical_motivation, practical_environment]
+    p, t = np.indices(surface.shape)
+    reachable = (p >= len(_PRACTICAL_IDX)) & (t >= len(_THEORETICAL_IDX))
+    cost = np.abs(p - practical_sum) + np.abs(t - theoretical_sum)
+    distances = {}
+    for code, name in enumerate(RECOMMENDATIONS):
+        mask = reachable & (surface == code)
+        if mask.any():
+            distances[name] = int(cost[mask].min())
+    return distances
+
+
+def recommend(data):
+    """Berechnet die Empfehlung für einen einzelnen Datensatz (player_data)"""
+    kompetenzen = data.get('kompetenzen', {})
+    labels = catalog.get().kompetenzen.labels
+
+    # Berechne Scores
+    practical_score = sum(kompetenzen.get(labels[i], 0) for i in _PRACTICAL_IDX) / len(_PRACTICAL_IDX)
+    theoretical_score = sum(kompetenzen.get(labels[i], 0) for i in _THEORETICAL_IDX) / len(_THEORETICAL_IDX)
+
+    # Motivationsanalyse
+    motivations = data.get('motivationen', [])
+    practical_motivation = any(mot in motivations for mot in PRACTICAL_MOTIVATIONS)
+    theoretical_motivation = any(mot in motivations for mot in THEORETICAL_MOTIVATIONS)
+
+    # Umgebungsanalyse
+    environment = data.get('arbeitsumgebung', '')
+    practical_environment = environment in PRACTICAL_ENVIRONMENTS
+
+    return decide(practical_score, theoretical_score, practical_motivation, theoretical_motivation,
+                  practical_environment)
+
+
+def recommend_answers(answers):
+    """Berechnet die Empfehlung direkt aus kompakten Antworten (answers.Answers)"""
+    key = decision_key(answers)
+    table = decision_table()
+    if key[0] < table.shape[0] and key[1] < table.shape[1]:
+        return RECOMMENDATIONS[table[key]]
+    # Bewertungen über 5 (z.B. aus einem fremden Export) liegen ausserhalb der Tabelle: wie recommend()
+    practical_sum, theoretical_sum, pm, tm, pe = key
+    return decide(practical_sum / len(_PRACTICAL_IDX), theoretical_sum / len(_THEORETICAL_IDX), pm, tm, pe)
+
+
+def strengths_improvements(kompetenzen):
+    """Liefert (Stärken, Entwicklungsfelder) wie auf der Ergebnisseite"""
+    strengths = [k for k, v in kompetenzen.items() if v >= STRENGTH_MIN]
+    improvements = [k for k, v in kompetenzen.items() if v <= IMPROVEMENT_MAX]
+    return strengths, improvements
+
+
+def strengths_improvements_answers(answers):
+    """Wie strengths_improvements(), aber für kompakte Antworten"""
+    pairs = list(zip(catalog.get().kompetenzen.labels, answers.kompetenzen))
+    strengths = [label for label, v in pairs if v >= STRENGTH_MIN]
+    improvements = [label for label, v in pairs if 0 < v <= IMPROVEMENT_MAX]
+    return strengths, improvements
+
+
+def record_to_row(data):
+    """Wandelt einen player_data-Datensatz in eine Zeile des Batch-Formats um"""
+    cat = catalog.get()
+    kompetenzen = data.get('kompetenzen', {})
+    motivations = data.get('motivationen', [])
+    row = {col: kompetenzen.get(label) for col, label in zip(KOMP_COLUMNS, cat.kompetenzen.labels)}
+    row.update({col: key in motivations for col, key in zip(MOT_COLUMNS, cat.motivationen.ids)})
+    row[ENV_COLUMN] = data.get('arbeitsumgebung', '')
+    return row
+
+
+def frame_from_records(records):
+    """Baut aus vielen player_data-Datensätzen ein DataFrame im Batch-Format"""
+    import pandas as pd
+
+    rows = [record_to_row(data) for data in records]
+    return pd.DataFrame(rows, columns=KOMP_COLUMNS + MOT_COLUMNS + [ENV_COLUMN])
+
+
+def frame_from_answers(answers_list):
+    """Wie frame_from_records(), aber direkt aus kompakten Antworten (answers.Answers)"""
+    import numpy as np
+    import pandas as pd
+
+    n, width = len(answers_list), len(KOMP_COLUMNS)
+    ratings = b''.join(a.kompetenzen[:width].ljust(width, b'\0') for a in answers_list)
+    komp = np.frombuffer(ratings, dtype=np.uint8).reshape(n, width).astype(float)
+    komp[komp == 0] = np.nan  # nicht beantwortet, wie ein fehlender Eintrag im Datensatz
+    masks = np.array([a.motivationen for a in answers_list], dtype=np.int64).reshape(n, 1)
+    env_ids = catalog.get().arbeitsumgebung.ids
+    df = pd.DataFrame(komp, columns=KOMP_COLUMNS)
+    df[MOT_COLUMNS] = (masks >> np.arange(len(MOT_COLUMNS)) & 1).astype(bool)
+    df[ENV_COLUMN] = [env_ids[a.arbeitsumgebung] if 0 <= a.arbeitsumgebung < len(env_ids) else ''
+                      for a in answers_list]
+    return df
+
+
+def score_frame(df):
+    """Bewertet alle Zeilen eines DataFrames im Batch-Format in einem Durchgang
+
+    Fehlende Kompetenzen zählen wie im interaktiven Pfad als 0 und erscheinen
+    weder bei den Stärken noch bei den Entwicklungsfeldern.
+    """
+    import numpy as np
+    import pandas as pd
+
+    komp = df.reindex(columns=KOMP_COLUMNS).to_numpy(dtype=float, na_value=np.nan)
+    filled = np.nan_to_num(komp, nan=0.0)
+    practical_sum = filled[:, _PRACTICAL_IDX].sum(axis=1)
+    theoretical_sum = filled[:, _THEORETICAL_IDX].sum(axis=1)
+
+    mot = df.reindex(columns=MOT_COLUMNS).fillna(False).to_numpy(dtype=bool)
+    practical_motivation = mot[:, _PRACTICAL_MOTIVATION_IDX].any(axis=1)
+    theoretical_motivation = mot[:, _THEORETICAL_MOTIVATION_IDX].any(axis=1)
+
+    if ENV_COLUMN in df:
+        practical_environment = df[ENV_COLUMN].isin(PRACTICAL_ENVIRONMENTS).to_numpy()
+    else:
+        practical_environment = np.zeros(len(df), dtype=bool)
+
+    # Ganzzahlige Bewertungen 0–5 (der Normalfall) über die Tabelle, alles andere nach der Regel
+    in_table = ((filled == np.rint(filled)) & (filled >= 0) & (filled <= _MAX_RATING)).all()
+    if in_table:
+        codes = decision_table()[
+            practical_sum.astype(np.intp), theoretical_sum.astype(np.intp),
+            practical_motivation.astype(np.intp), theoretical_motivation.astype(np.intp),
+            practical_environment.astype(np.intp),
+        ]
+    else:
+        codes = _decide_arrays(
+            practical_sum / len(_PRACTICAL_IDX), theoretical_sum / len(_THEORETICAL_IDX),
+            practical_motivation, theoretical_motivation, practical_environment,
+        )
+    recommendation = np.array(RECOMMENDATIONS)[codes]
+
+    labels = np.array(catalog.get().kompetenzen.labels, dtype=object)
+    with np.errstate(invalid='ignore'):
+        strong = komp >= STRENGTH_MIN
+        weak = komp <= IMPROVEMENT_MAX
+
+    return pd.DataFrame({
+        'empfehlung': recommendation,
+        'staerken': [labels[mask].tolist() for mask in strong],
+        'entwicklungsfelder': [labels[mask].tolist() for mask in weak],
+    }, index=df.index)
@@ -0,0 +1,96 @@
+"""Sitzungs-Schnappschüsse, damit ein Neustart oder ein anderer Worker den Stand nicht verliert
+
+Der Stand einer Session (Schritt + kompakte Antworten) liegt unter einem
+Token, das in der URL steht (?sitzung=...). Gespeichert wird in einem
+Key-Value-Store mit der Redis-Schnittstelle get/set(ex=)/delete: standardmässig
+eine lokale SQLite-Datei, mit einer redis://-URL ein echter Redis-Server.
+"""
+import json
+import secrets
+import sqlite3
+import threading
+import time
+
+from answers import Answers
+
+QUERY_PARAM = 'sitzung'
+TTL = 7 * 24 * 3600
+PURGE_EVERY = 500
+
+
+class SQLiteSessionStore:
+    """Minimaler Redis-Ersatz (get/set/delete mit Ablaufzeit) auf einer SQLite-Datei"""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sessions WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        expires = time.time() + ex if ex else None
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (key, value, expires))
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+        return True
+
+    def delete(self, *keys):
+        with self._lock, self._conn:
+            return self._conn.executemany("DELETE FROM sessions WHERE key = ?", [(k,) for k in keys]).rowcount
+
+
+def open_store(url):
+    """redis://… öffnet einen Redis-Client (Paket 'redis'), alles andere gilt als SQLite-Pfad"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return redis.Redis.from_url(url)
+    return SQLiteSessionStore(url)
+
+
+def new_token():
+    return secrets.token_urlsafe(16)
+
+
+def key(token):
+    return f"zukunftsnavigator:sitzung:{token}"
+
+
+def dumps(current_step, answers, quiz_completed, result_id=None):
+    return json.dumps({
+        'current_step': current_step,
+        'answers': answers.to_compact(),
+        'quiz_completed': quiz_completed,
+        'result_id': result_id,
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(raw):
+    """Schnappschuss → Werte für st.session_state; None, wenn er nicht lesbar ist"""
+    try:
+        data = json.loads(raw)
+        state = {
+            'current_step': int(data['current_step']),
+            'answers': Answers.from_compact(data['answers']),
+            'quiz_completed': bool(data['quiz_completed']),
+        }
+        if data.get('result_id'):
+            state['result_id'] = data['result_id']
+        return state
+    except (ValueError, KeyError, TypeError):
+        return None
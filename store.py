@@ -0,0 +1,339 @@
+"""Lokale Ablage für abgeschlossene Ergebnisse und Feedback (SQLite im WAL-Modus)
+
+Schreibzugriffe landen in einer Queue und werden von einem Hintergrund-Thread
+gebündelt in einer Transaktion geschrieben, damit ein Rerun nie auf die
+Festplatte wartet.
+
+Für Auswertungen pflegt derselbe Thread Rollup-Tabellen (Anzahl und Summe je
+Gruppe und Frage), die mit jedem Ergebnis in O(1) nachgeführt werden. Das
+Dashboard liest nur diese und muss nie alle Ergebnisse durchgehen.
+"""
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import catalog
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    erstellt TEXT NOT NULL,
+    name TEXT,
+    klasse TEXT,
+    schule TEXT,
+    "alter" INTEGER,
+    empfehlung TEXT,
+    daten TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_klasse ON results (schule, klasse);
+CREATE TABLE IF NOT EXISTS rollups (
+    dimension TEXT NOT NULL,
+    gruppe TEXT NOT NULL,
+    metrik TEXT NOT NULL,
+    anzahl INTEGER NOT NULL,
+    summe REAL NOT NULL,
+    PRIMARY KEY (dimension, gruppe, metrik)
+);
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result_id TEXT,
+    erstellt TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+"""
+
+# Gruppierungen der Rollups; 'gesamt' hat nur die Gruppe 'alle'
+DIMENSIONS = ('gesamt', 'schule', 'klasse', 'alter')
+
+_STOP = object()
+# Höchstzahl Platzhalter pro Abfrage (SQLite-Standard vor 3.32)
+_MAX_VARIABLES = 999
+
+
+def connect(path):
+    """Öffnet eine Verbindung mit den Einstellungen, die alle Leser und Schreiber teilen"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ResultStore:
+    """Ergebnis-Ablage mit gebündelten, nicht blockierenden Schreibzugriffen"""
+
+    def __init__(self, path, batch_size=100, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        with connect(path) as conn:
+            conn.executescript(SCHEMA)
+            # Bestehende Datenbank ohne Rollups: einmalig aus den Ergebnissen aufbauen
+            if (conn.execute("SELECT 1 FROM results LIMIT 1").fetchone()
+                    and not conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone()):
+                self._rebuild_rollups(conn)
+        conn.close()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="result-store-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add_result(self, result_data):
+        """Reiht ein Ergebnis zum Speichern ein und gibt dessen ID zurück"""
+        result_id = uuid.uuid4().hex
+        self._queue.put(('results', _result_row(result_id, result_data)))
+        return result_id
+
+    def add_results(self, results):
+        """Speichert viele (id, result_data) sofort in einer Transaktion (Import)
+
+        Gibt die IDs zurück, die noch nicht in der Ablage waren; bereits
+        vorhandene werden überschrieben, aber nicht nochmals in die Rollups
+        gezählt.
+        """
+        results = dict(results)
+        with connect(self.path) as conn:
+            new = self._write(conn, [('results', _result_row(rid, data)) for rid, data in results.items()], results)
+        conn.close()
+        return new
+
+    def add_feedback(self, result_id, text):
+        """Reiht ein Feedback zum Speichern ein"""
+        self._queue.put(('feedback', (result_id, datetime.now().isoformat(), text)))
+
+    def flush(self):
+        """Wartet, bis alle eingereihten Schreibzugriffe auf der Platte sind"""
+        self._queue.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _next_batch(self):
+        """Sammelt bis zu batch_size Einträge oder bis flush_interval abgelaufen ist"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while batch[-1] is not _STOP and len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def rollup(self, dimension):
+        """Rollups einer Dimension als {gruppe: {metrik: (anzahl, summe)}}"""
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT gruppe, metrik, anzahl, summe FROM rollups WHERE dimension = ?", (dimension,)
+            ).fetchall()
+        conn.close()
+        groups = {}
+        for gruppe, metrik, anzahl, summe in rows:
+            groups.setdefault(gruppe, {})[metrik] = (anzahl, summe)
+        return groups
+
+    def iter_results(self, chunk_size=1000):
+        """Alle gespeicherten Ergebnisse als result_data-Dicts, in Blöcken gelesen"""
+        with connect(self.path) as conn:
+            cursor = conn.execute("SELECT daten FROM results ORDER BY erstellt")
+            while rows := cursor.fetchmany(chunk_size):
+                for (daten,) in rows:
+                    yield json.loads(daten)
+        conn.close()
+
+    def iter_records(self, schule=None, klasse=None, chunk_size=1000):
+        """(id, erstellt, result_data) aller Ergebnisse, optional nur einer Schule bzw. Klasse
+
+        schule und klasse sind Gruppen wie in den Rollups ('–' = ohne Schule).
+        Geblättert wird über die rowid, pro (Schule, Klasse) ein Bereich im
+        Index: jeder Block ist eine eigene kurze Abfrage, ein langer Export
+        hält also weder Speicher noch den Schreib-Thread auf.
+        """
+        if schule is None:
+            yield from self._iter_range('', (), chunk_size)
+            return
+        where, params = _group_filter(schule, klasse)
+        with connect(self.path) as conn:
+            groups = conn.execute(f"SELECT DISTINCT schule, klasse FROM results WHERE 1{where}", params).fetchall()
+        conn.close()
+        for group in groups:
+            yield from self._iter_range(" AND schule IS ? AND klasse IS ?", group, chunk_size)
+
+    def _iter_range(self, where, params, chunk_size):
+        last = 0
+        while True:
+            with connect(self.path) as conn:
+                rows = conn.execute(
+                    f"SELECT rowid, id, erstellt, daten FROM results WHERE rowid > ?{where} ORDER BY rowid LIMIT ?",
+                    (last, *params, chunk_size),
+                ).fetchall()
+            conn.close()
+            for last, result_id, erstellt, daten in rows:
+                yield result_id, erstellt, json.loads(daten)
+            if len(rows) < chunk_size:
+                return
+
+    def _rebuild_rollups(self, conn):
+        deltas = rollup_deltas(json.loads(daten) for (daten,) in conn.execute("SELECT daten FROM results"))
+        conn.execute("DELETE FROM rollups")
+        _apply_rollups(conn, deltas)
+
+    def _write(self, conn, batch, parsed=None):
+        """Schreibt einen Block in einer Transaktion; gibt die IDs der neuen Ergebnisse zurück
+
+        parsed ({id: result_data}) erspart das erneute Einlesen des JSON für die Rollups.
+        """
+        results = [row for kind, row in batch if kind == 'results']
+        feedback = [row for kind, row in batch if kind == 'feedback']
+        new = []
+        with conn:
+            if results:
+                known = set()
+                for start in range(0, len(results), _MAX_VARIABLES):
+                    part = [row[0] for row in results[start:start + _MAX_VARIABLES]]
+                    known.update(row[0] for row in conn.execute(
+                        f"SELECT id FROM results WHERE id IN ({','.join('?' * len(part))})", part,
+                    ))
+                conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", results)
+                added = []
+                for row in results:
+                    if row[0] not in known:
+                        known.add(row[0])
+                        new.append(row[0])
+                        added.append(parsed[row[0]] if parsed else json.loads(row[-1]))
+                _apply_rollups(conn, rollup_deltas(added))
+            if feedback:
+                conn.executemany("INSERT INTO feedback (result_id, erstellt, text) VALUES (?, ?, ?)", feedback)
+        return new
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while True:
+                batch = self._next_batch()
+                stop = batch[-1] is _STOP
+                items = batch[:-1] if stop else batch
+                try:
+                    if items:
+                        self._write(conn, items)
+                except sqlite3.Error:
+                    logger.exception("Speichern von %d Einträgen fehlgeschlagen", len(items))
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+
+def _result_row(result_id, result_data):
+    return (
+        result_id,
+        datetime.now().isoformat(),
+        result_data.get('name'),
+        result_data.get('klasse'),
+        result_data.get('schule'),
+        result_data.get('alter'),
+        result_data.get('empfehlung'),
+        json.dumps(result_data, ensure_ascii=False),
+    )
+
+
+def fetch_results(path, ids):
+    """Gespeicherte Ergebnisse zu den IDs als {id: result_data}; unbekannte IDs fehlen"""
+    found = {}
+    with connect(path) as conn:
+        for start in range(0, len(ids), _MAX_VARIABLES):
+            part = ids[start:start + _MAX_VARIABLES]
+            found.update(
+                (result_id, json.loads(daten)) for result_id, daten in conn.execute(
+                    f"SELECT id, daten FROM results WHERE id IN ({','.join('?' * len(part))})", part,
+                )
+            )
+    conn.close()
+    return found
+
+
+def _group_filter(schule, klasse):
+    """SQL-Bedingung für eine Rollup-Gruppe (siehe rollup_groups) und ihre Parameter"""
+    if schule is None:
+        return '', ()
+    if schule == '–':
+        where, params = " AND (schule IS NULL OR schule IN ('', '–'))", ()
+    else:
+        where, params = " AND schule = ?", (schule,)
+    if klasse is not None:
+        where += " AND klasse = ?"
+        params += (klasse,)
+    return where, params
+
+
+def rollup_groups(result_data):
+    """(dimension, gruppe)-Paare, in die ein Ergebnis einfliesst"""
+    schule = result_data.get('schule') or '–'
+    groups = [('gesamt', 'alle'), ('schule', schule)]
+    if result_data.get('klasse'):
+        groups.append(('klasse', f"{schule} / {result_data['klasse']}"))
+    if result_data.get('alter') is not None:
+        groups.append(('alter', str(result_data['alter'])))
+    return groups
+
+
+def rollup_deltas(results):
+    """Beiträge von Ergebnissen zu den Rollups als {(dim, gruppe, metrik): [anzahl, summe]}
+
+    Ergebnisse mit denselben Gruppen (z.B. eine ganze Klasse) werden zuerst
+    zusammengezählt und erst am Schluss auf ihre Gruppen verteilt.
+    """
+    cat = catalog.get()
+    names = {}
+    for prefix, section, key in (('komp', cat.kompetenzen, 'kompetenzen'), ('wert', cat.zukunftswerte, 'zukunftswerte')):
+        names[key] = {label: f"{prefix}:{question_id}" for label, question_id in zip(section.labels, section.ids)}
+
+    combined = {}
+    for result_data in results:
+        sums = combined.setdefault(tuple(rollup_groups(result_data)), {})
+        metrics = [('ergebnisse', 0)]
+        if result_data.get('empfehlung'):
+            metrics.append((f"empfehlung:{result_data['empfehlung']}", 0))
+        for key, labels in names.items():
+            for label, value in (result_data.get(key) or {}).items():
+                if label in labels and isinstance(value, (int, float)):
+                    metrics.append((labels[label], value))
+        for metrik, value in metrics:
+            total = sums.get(metrik)
+            if total is None:
+                sums[metrik] = [1, value]
+            else:
+                total[0] += 1
+                total[1] += value
+
+    deltas = {}
+    for groups, sums in combined.items():
+        for dimension, gruppe in groups:
+            for metrik, (anzahl, summe) in sums.items():
+                delta = deltas.setdefault((dimension, gruppe, metrik), [0, 0.0])
+                delta[0] += anzahl
+                delta[1] += summe
+    return deltas
+
+
+def _apply_rollups(conn, deltas):
+    conn.executemany(
+        """INSERT INTO rollups VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (dimension, gruppe, metrik)
+           DO UPDATE SET anzahl = anzahl + excluded.anzahl, summe = summe + excluded.summe""",
+        [(dim, gruppe, metrik, anzahl, summe) for (dim, gruppe, metrik), (anzahl, summe) in deltas.items()],
+    )
@@ -0,0 +1,51 @@
+"""rescore.py mit kaputten und falsch aufgebauten Exporten"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import catalog  # noqa: E402
+import rescore  # noqa: E402
+import weights  # noqa: E402
+
+
+def write(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(data if isinstance(data, str) else json.dumps(data))
+    return path
+
+
+def test_malformed_exports_land_in_fehler_column(tmp_path, monkeypatch):
+    monkeypatch.setattr(weights, 'PATH', None)
+    good = write(tmp_path, 'a.json', {'name': 'Anna', 'kompetenzen': {}, 'motivationen': [],
+                                      'arbeitsumgebung': 'werkstatt'})
+    names = [
+        good,
+        write(tmp_path, 'b.json', {'kompetenzen': [1, 2]}),
+        write(tmp_path, 'c.json', {'motivationen': [['praktisch']]}),
+        write(tmp_path, 'd.json', {'kompetenzen': {'Mathematik': 'viel'}}),
+        write(tmp_path, 'e.json', '{"abgeschnitten'),
+        write(tmp_path, 'f.json', [1, 2]),
+    ]
+    rows = rescore.score_chunk(str(tmp_path), names)
+    fehler = {os.path.basename(row[0]): row[-1] for row in rows}
+    assert fehler['a.json'] == ''
+    assert rows[0][1] == 'Anna' and rows[0][7] in ('berufsausbildung', 'weiterführende_schule', 'beide_wege')
+    for name in ('b.json', 'c.json', 'd.json', 'e.json', 'f.json'):
+        assert fehler[name], name
+
+
+def test_weighted_model_skips_ratings_it_cannot_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(weights, 'PATH', os.path.join(ROOT, 'gewichte.json'))
+    monkeypatch.setattr(weights, '_current', None)
+    monkeypatch.setattr(weights, '_mtime', None)
+    names = [
+        write(tmp_path, 'a.json', {'kompetenzen': {}}),
+        write(tmp_path, 'b.json', {'kompetenzen': {catalog.get().kompetenzen.labels[0]: 3.5}}),
+    ]
+    rows = rescore.score_chunk(str(tmp_path), names)
+    assert rows[0][-1] == ''
+    assert rows[1][-1]
@@ -0,0 +1,109 @@
+"""Anonymisierte Antwort-Spuren des Wizards für die Wiedergabe (replay.py)
+
+Mit ZUKUNFTSNAVIGATOR_SPUREN=spuren.jsonl hält die App für jede Session,
+die bei Schritt 0 beginnt, die Schrittwechsel fest und zu jedem Schritt, der
+vorwärts verlassen wird, dessen Antworten. Beim Erreichen der Ergebnisse
+wird die Spur als eine JSON-Zeile angehängt:
+
+    {"v":1,"katalog":"3f2a9c1e","empfehlung":"beide_wege",
+     "schritte":[[0,1],[1,2,{"alter":15,"situation":2}],[2,3,{"kompetenzen":"34353333"}],[3,2],...]}
+
+Freitexte (Name, Klasse, Schule, Stärke, Entwicklungsfeld) werden nie
+aufgezeichnet; die Wiedergabe setzt Platzhalter ein. Bewertungen stehen als
+Ziffernfolge, Auswahlen als Index im Katalog, dessen IDs über "katalog"
+(Kurz-Hash) festgehalten sind. ZUKUNFTSNAVIGATOR_SPUREN_ANTEIL=0.1 zeichnet
+nur jede zehnte Session auf.
+"""
+import hashlib
+import json
+import random
+import threading
+
+import catalog
+
+VERSION = 1
+# Antwortfelder, die ein Schritt beim Weitergehen setzt (ohne Freitexte)
+STEP_FIELDS = {
+    1: ('alter', 'situation'),
+    2: ('kompetenzen',),
+    3: ('motivationen', 'weekend_choice'),
+    4: ('arbeitsumgebung',),
+    5: ('zukunftswerte',),
+    6: ('presentation_style', 'problem_solving'),
+}
+RESULT_STEP = 7
+
+
+def catalog_key(cat=None):
+    """Kurz-Hash der Katalog-IDs; Spuren mit anderem Hash passen nicht zum Katalog"""
+    ids = (cat or catalog.get()).ids()
+    raw = json.dumps(ids, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:8]
+
+
+def step_values(step, answers):
+    """Antworten eines Schritts in der Form der Spur (Bewertungen als Ziffernfolge)"""
+    values = {}
+    for field in STEP_FIELDS.get(step, ()):
+        value = getattr(answers, field)
+        values[field] = ''.join(map(str, value)) if isinstance(value, bytes) else value
+    return values
+
+
+class Trace:
+    """Schrittwechsel einer Session; step ist der zuletzt gesehene Schritt"""
+
+    __slots__ = ('step', 'events')
+
+    def __init__(self, step=0):
+        self.step = step
+        self.events = []
+
+    def transition(self, step, answers):
+        """Hält den Wechsel zu step fest; vorwärts mit den Antworten des verlassenen Schritts"""
+        event = [self.step, step]
+        if step > self.step and self.step in STEP_FIELDS:
+            event.append(step_values(self.step, answers))
+        self.events.append(event)
+        self.step = step
+
+    def to_json(self, empfehlung):
+        return json.dumps({'v': VERSION, 'katalog': catalog_key(), 'empfehlung': empfehlung,
+                           'schritte': self.events}, ensure_ascii=False, separators=(',', ':'))
+
+
+class Recorder:
+    """Hängt fertige Spuren an eine JSONL-Datei an (eine Zeile pro Session)"""
+
+    def __init__(self, path, share=1.0):
+        self.path = path
+        self.share = share
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """Soll eine neue Session aufgezeichnet werden?"""
+        return self.share >= 1 or random.random() < self.share
+
+    def write(self, trace, empfehlung):
+        line = trace.to_json(empfehlung) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def load(path):
+    """Liest die Spuren einer Datei; gibt (Spuren, Anzahl unlesbarer Zeilen) zurück"""
+    loaded, broken = [], 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                trace = json.loads(line)
+            except ValueError:
+                broken += 1
+                continue
+            if trace.get('v') != VERSION:
+                broken += 1
+                continue
+            loaded.append(trace)
+    return loaded, broken
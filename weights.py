@@ -0,0 +1,208 @@
+"""Gewichtetes Bewertungsmodell: jede Antwort fliesst über eine Gewichtsmatrix in die Empfehlung ein
+
+Die Antworten einer Session werden zu einem festen Merkmalsvektor x
+(Bewertungen als Zahl, Einzelauswahlen one-hot, Motivationen als 0/1, dazu
+eine Konstante). Die Punkte pro Weg sind W @ x, empfohlen wird der Weg mit
+den meisten Punkten; für ganze Jahrgänge ist es ein einziges X @ Wᵀ.
+
+Die Gewichte stehen in einer JSON-Datei (Pfad in ZUKUNFTSNAVIGATOR_GEWICHTE),
+pro Weg als {merkmal: gewicht}; nicht genannte Merkmale haben Gewicht 0.
+Ohne diese Variable bleibt die Regel aus scoring.py aktiv. Die Datei wird wie
+der Katalog bei Änderungen neu geladen; ist sie ungültig, bleibt die bisherige.
+
+NumPy wird erst beim Laden der Gewichte importiert.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import catalog
+import scoring
+
+logger = logging.getLogger(__name__)
+
+PATH = os.environ.get('ZUKUNFTSNAVIGATOR_GEWICHTE')
+RELOAD_INTERVAL = 2.0
+BIAS = 'konstante'
+SCORE_DECIMALS = 6
+
+# Einzelauswahl-Felder aus answers.Answers → Präfix der Merkmale
+_CHOICES = (
+    ('situation', 'situation'),
+    ('arbeitsumgebung', 'umgebung'),
+    ('weekend_choice', 'wochenende'),
+    ('presentation_style', 'praesentation'),
+    ('problem_solving', 'problem'),
+)
+
+
+def feature_names(cat=None):
+    """Namen der Merkmale in Vektorreihenfolge, z.B. 'komp:deutsch' oder 'wochenende:lesen'"""
+    cat = cat or catalog.get()
+    names = [f"komp:{key}" for key in cat.kompetenzen.ids]
+    names += [f"wert:{key}" for key in cat.zukunftswerte.ids]
+    names += [f"mot:{key}" for key in cat.motivationen.ids]
+    for field, prefix in _CHOICES:
+        names += [f"{prefix}:{key}" for key in getattr(cat, field).ids]
+    return names + [BIAS]
+
+
+def _feature_count(cat):
+    return (len(cat.kompetenzen) + len(cat.zukunftswerte) + len(cat.motivationen)
+            + sum(len(getattr(cat, field)) for field, _ in _CHOICES) + 1)
+
+
+def feature_labels(cat=None):
+    """Lesbare Bezeichnung zu jedem Merkmal (für die Erklärung der Punkte)"""
+    cat = cat or catalog.get()
+    labels = list(cat.kompetenzen.labels) + list(cat.zukunftswerte.labels) + list(cat.motivationen.labels)
+    for field, _ in _CHOICES:
+        labels += getattr(cat, field).labels
+    return labels + ["Grundwert"]
+
+
+def feature_matrix(answers_list):
+    """Merkmalsmatrix (n × Merkmale) für viele answers.Answers auf einmal"""
+    import numpy as np
+
+    cat = catalog.get()
+    n = len(answers_list)
+    X = np.zeros((n, _feature_count(cat)))
+    rows = np.arange(n)
+    col = 0
+    for field in ('kompetenzen', 'zukunftswerte'):
+        width = len(getattr(cat, field))
+        ratings = b''.join(getattr(a, field)[:width].ljust(width, b'\0') for a in answers_list)
+        X[:, col:col + width] = np.frombuffer(ratings, dtype=np.uint8).reshape(n, width)
+        col += width
+    width = len(cat.motivationen)
+    masks = np.array([a.motivationen for a in answers_list], dtype=np.int64).reshape(n, 1)
+    X[:, col:col + width] = masks >> np.arange(width) & 1
+    col += width
+    for field, _ in _CHOICES:
+        width = len(getattr(cat, field))
+        choice = np.array([getattr(a, field) for a in answers_list], dtype=np.int64)
+        answered = (choice >= 0) & (choice < width)
+        X[rows[answered], col + choice[answered]] = 1
+        col += width
+    X[:, col] = 1
+    return X
+
+
+@dataclass(frozen=True)
+class WeightModel:
+    version: str
+    paths: tuple
+    matrix: object  # np.ndarray, Wege × Merkmale, schreibgeschützt
+
+    def scores(self, answers):
+        """Punkte pro Weg für eine Session: W @ x"""
+        return self.scores_batch([answers])[0]
+
+    def scores_batch(self, answers_list):
+        """Punkte pro Weg für viele Sessions: X @ Wᵀ (n × Wege)
+
+        Auf 6 Stellen gerundet, damit Gleichstände nicht von der
+        Summationsreihenfolge abhängen; bei Gleichstand gewinnt der zuerst
+        genannte Weg.
+        """
+        return (feature_matrix(answers_list) @ self.matrix.T).round(SCORE_DECIMALS)
+
+    def recommend(self, answers):
+        return self.paths[int(self.scores(answers).argmax())]
+
+    def recommend_batch(self, answers_list):
+        if not answers_list:
+            return []
+        return [self.paths[i] for i in self.scores_batch(answers_list).argmax(axis=1)]
+
+    def breakdown(self, answers, top=5):
+        """Erklärung: Punkte pro Weg und die Antworten, die am meisten für den empfohlenen Weg sprechen
+
+        Gezählt wird der Vorsprung gegenüber dem zweitbesten Weg, pro Merkmal
+        (Gewicht beim Sieger − Gewicht beim Zweiten) × Antwort.
+        """
+        import numpy as np
+
+        x = feature_matrix([answers])[0]
+        contributions = self.matrix * x
+        totals = (self.matrix @ x).round(SCORE_DECIMALS)
+        winner, runner_up = np.argsort(-totals, kind='stable')[:2]
+        lead = contributions[winner] - contributions[runner_up]
+        labels = feature_labels()
+        factors = [(labels[i], float(lead[i])) for i in lead.argsort()[::-1][:top] if lead[i] > 0]
+        return {
+            'punkte': {self.paths[i]: float(totals[i]) for i in range(len(self.paths))},
+            'empfehlung': self.paths[winner],
+            'vergleich': self.paths[runner_up],
+            'faktoren': factors,
+        }
+
+
+def parse(raw):
+    """Validiert den Inhalt einer Gewichtsdatei und baut daraus ein WeightModel"""
+    import numpy as np
+
+    if not isinstance(raw, dict) or not isinstance(raw.get('gewichte'), dict):
+        raise ValueError("Gewichtsdatei braucht ein Objekt 'gewichte' mit einem Eintrag pro Weg")
+    names = feature_names()
+    position = {name: i for i, name in enumerate(names)}
+    paths = tuple(raw['gewichte'])
+    unknown_paths = [p for p in paths if p not in scoring.EMPFEHLUNGEN]
+    if unknown_paths or len(paths) < 2:
+        raise ValueError(f"Wege müssen aus {', '.join(scoring.EMPFEHLUNGEN)} stammen (mindestens zwei)")
+    matrix = np.zeros((len(paths), len(names)))
+    for row, path in enumerate(paths):
+        for name, value in raw['gewichte'][path].items():
+            if name not in position:
+                raise ValueError(f"Unbekanntes Merkmal '{name}' bei '{path}'")
+            if not isinstance(value, (int, float)):
+                raise ValueError(f"Gewicht für '{name}' bei '{path}' ist keine Zahl")
+            matrix[row, position[name]] = value
+    matrix.flags.writeable = False
+    return WeightModel(version=str(raw.get('version', '')), paths=paths, matrix=matrix)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return parse(json.load(f))
+
+
+_lock = threading.Lock()
+_current = None
+_mtime = None
+_checked = 0.0
+
+
+def get():
+    """Aktuelles Modell oder None, wenn keine Gewichtsdatei konfiguriert ist (dann gilt die Regel)"""
+    global _current, _mtime, _checked
+    if not PATH:
+        return None
+    now = time.monotonic()
+    if _current is not None and now - _checked < RELOAD_INTERVAL:
+        return _current
+    with _lock:
+        if _current is not None and now - _checked < RELOAD_INTERVAL:
+            return _current
+        _checked = now
+        try:
+            mtime = os.stat(PATH).st_mtime_ns
+            if mtime != _mtime:
+                _mtime = mtime
+                _current = load(PATH)
+                logger.info("Gewichte %s geladen (Version %s)", PATH, _current.version or "–")
+        except (OSError, ValueError) as exc:
+            logger.error("Gewichte %s nicht geladen: %s", PATH, exc)
+        return _current
+
+
+def recommend_answers(answers):
+    """Empfehlung nach dem gewichteten Modell, falls konfiguriert, sonst nach der Regel"""
+    model = get()
+    if model is None:
+        return scoring.recommend_answers(answers)
+    return model.recommend(answers)